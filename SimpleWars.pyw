@@ -1,8 +1,14 @@
+import sys
+import time
+
+STARTED = time.perf_counter()   #Taken before anything else is imported, to measure the time to the first window.
+
 import menu
 
 def main() -> None:
-    """Loads the program by calling the menu and starting its setup."""
-    simplewars = menu.Window()
+    """Loads the program by calling the menu and starting its setup. Reports the time to the first window if started with --timing."""
+    simplewars = menu.Window(started=STARTED, report_startup="--timing" in sys.argv)
     simplewars.game_start()
 
-main()
\ No newline at end of file
+if __name__ == "__main__":      #The worker processes of the computer players import this file again, without starting another menu.
+    main()
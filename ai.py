@@ -0,0 +1,563 @@
+import glob
+import math
+import multiprocessing
+import os
+import queue
+import random
+import struct
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import damagetable
+import engine
+import mapcache
+import terrains
+import units
+import zobrist
+from engine import Index
+
+CANCELLED = struct.Struct("<Q")    #Id of the last cancelled search, at the end of the shared memory of the workers.
+PRICES = {type: units.get_prices()[ind] for ind, type in enumerate(units.get_units())}     #Price of every unit type.
+CATALOG = sorted([(selection, price) for selection, price in units.get_prices().items() if price != 0], key=lambda item: item[1])    #Every unit that can be bought, from the cheapest.
+
+def turns_played(state: engine.GameState) -> int:
+    """Returns how many turns have been played in the match, counting the turn of every team separately."""
+    return (state.turn_count - 1) * len(state.TEAMS) + state.team_turn
+
+class Node:
+    """Class for a single node of the search tree: the match after an action, with the results of every rollout that went through it.
+        Only the snapshot of the match is kept, it is restored onto a single match whenever the node is searched from."""
+    def __init__(self, state: engine.GameState, action: tuple, parent: object, actions: list):
+        self.snapshot = state.snapshot()
+        self.action = action
+        self.parent = parent
+        self.side = state.current_team()
+        self.team = None if parent is None else parent.side     #Team that took the action leading to the node.
+        self.hash = state.zobrist()
+        self.actions = actions      #Actions looked at from the node, the ones of its children follow from them until the turn ends.
+        self.untried = list(actions)
+        self.children = []
+        self.visits = 0
+        self.wins = 0.0
+        self.seeded = (0, 0.0)      #Visits and wins the node started off with from the transposition table, which weren't played in this search.
+
+    def seed(self, table: zobrist.TranspositionTable, team: str) -> None:
+        """Starts the node off with the visits and wins stored in the table for the same match, which are stored from the view of the given team."""
+        stored = table.get(self.hash)
+        if stored is not None:
+            self.visits, self.wins = stored[0], stored[1] if self.team == team else stored[0] - stored[1]
+            self.seeded = (self.visits, self.wins)
+
+    def select(self, exploration: float) -> object:
+        """Returns the child with the best upper confidence bound."""
+        log_visits = math.log(self.visits)
+        return max(self.children, key=lambda child: child.wins / child.visits + exploration * math.sqrt(log_visits / child.visits))
+
+class Computer:
+    """Class for a computer player, which picks its actions with Monte Carlo tree search over the legal actions of the match, within a time budget for every turn.
+        Only the most promising moves and purchases are looked at in the search tree, the rest of the match is played out by a quick greedy policy and then evaluated.
+        With more than one worker, the other workers are processes that each grow their own tree from the same match, and the visits of the actions are added up."""
+    EXPLORATION = 0.7       #Weight of exploring less visited actions over the ones that did well so far.
+    EXPANSION = 4           #Rollouts played from a node below the root before the actions after it are looked at.
+    MOVES = 3               #Most destinations looked at for a unit in the search tree.
+    BRANCHING = 12          #Destinations looked at in the search tree for every unit of a turn together, shared out between the units that haven't moved yet.
+    PURCHASES = 3           #Units looked at for every workshop in the search tree.
+    ROLLOUT_TURNS = 2       #Turns played out from the start of the search, the current one included, before the match is evaluated. Ending on the enemy's turn lets it answer every action.
+    WANDER = 0.2            #Chance of a unit moving somewhere random while playing out, instead of towards its nearest goal.
+    ROLLOUT_WANDER = 0.0    #Chance of wandering in the rollouts of the search, which only differ in the rolls of the attacks without it.
+    SCALE = 100             #Difference in worth that makes a team e (about 2.7) times as likely to win as the other.
+    FUNDS = 0.8             #Worth of the funds compared to units, which can already fight for the team.
+    BUILDING = 5            #Days of income a building is worth.
+    HQ = 500                #Worth of the enemy HQ, finishing its capture wins the match.
+    GRACE = 1               #Seconds a turn can run over its budget, after that the rest of it is played by the greedy policy.
+
+    def __init__(self, team: str, budget: float = 3, seed: int = None, workers: int = 1, pool: object = None):
+        self.team = team
+        self.budget = budget
+        self.random = random.Random(seed)
+        self.workers = workers if pool is None else pool.count + 1
+        self.deadline = None
+        self.started = None
+        self.limit = math.inf       #Hard deadline of the turn, past it no action is searched for.
+        self.cancelled = threading.Event()
+        self.properties = None      #Location of every capturable terrain of the map.
+        self.rollouts = 0
+        self.thinking = 0.0         #Seconds spent searching, for working out the rollouts per second.
+        self.table = zobrist.TranspositionTable()      #Visits and wins of the matches searched, shared by every match reached through different orders of actions.
+        self.pool = pool            #Worker processes, shared with the other computers of the match if given, otherwise started with the first parallel search.
+        self.own_pool = pool is None
+
+    def start_turn(self) -> None:
+        """Starts the time budget of a new turn."""
+        self.started = time.perf_counter()
+        self.deadline = self.started + self.budget
+        self.limit = self.deadline + self.GRACE
+        self.cancelled = threading.Event()      #A new one every turn, so a search of an earlier turn still finishing can't be revived.
+        self.table.new_generation()
+
+    def cancel(self) -> None:
+        """Stops the search of the turn as soon as possible, on the worker processes too."""
+        self.cancelled.set()
+        if self.pool is not None:
+            self.pool.cancel()
+
+    def progress(self) -> float:
+        """Returns the part of the time budget of the turn that has been used up."""
+        if self.started is None or self.budget <= 0:
+            return 0.0
+        return min(1.0, (time.perf_counter() - self.started) / self.budget)
+
+    def choose(self, state: engine.GameState) -> tuple:
+        """Returns the action the computer takes next, in the same form as the actions of the game state.
+            The time left of the turn is shared out between the units that haven't moved yet. Once the hard deadline has passed, the rest of the turn is played
+            by the greedy policy, which takes no time to think but still moves every unit."""
+        if self.deadline is None:
+            self.start_turn()
+        if time.perf_counter() >= self.limit:
+            return self.greedy(state)
+        actions = self.candidates(state)
+        if len(actions) == 1:
+            return actions[0]
+        pending = sum(1 for unit in state.rosters[self.team].values() if unit.moved == 0 and not unit.attacked) + 1
+        return self.search(state, actions, time.perf_counter() + max(0, self.deadline - time.perf_counter()) / pending)
+
+    def search(self, state: engine.GameState, actions: list, deadline: float) -> tuple:
+        """Runs the tree search from the given match until the deadline, on every worker if there are more than one, then returns the most visited action.
+            If there wasn't time to try every action at least once, the most visited one means nothing, so the action of the greedy policy is taken instead."""
+        started = time.perf_counter()
+        if self.workers > 1:
+            totals = self.parallel_search(state, actions, deadline)
+        else:
+            totals = self.statistics(self.grow(state, actions, deadline))
+        self.thinking += time.perf_counter() - started
+        if not totals:
+            return ("end",)
+        if sum(visits for visits, wins in totals.values()) < len(actions):
+            return self.greedy(state)
+        return max(totals, key=lambda action: totals[action][0])
+
+    def parallel_search(self, state: engine.GameState, actions: list, deadline: float) -> dict:
+        """Has every worker process grow its own tree from the match while this one grows one too, then returns the added up statistics of the actions.
+            Only the snapshot of the match is sent to the workers, the deadlines are sent as wall clock time, so workers that start late don't run over them."""
+        cancelled = self.cancelled
+        if self.pool is None:
+            self.pool = WorkerPool(self.workers - 1)
+        self.pool.start(state)
+        snapshot, offset, search = state.snapshot(), time.time() - time.perf_counter(), self.pool.new_search()
+        tasks = [self.pool.executor.submit(worker_search, self.team, snapshot, actions, deadline + offset, self.limit + offset, self.random.randrange(2 ** 32), search)
+                for worker in range(self.pool.count)]
+        totals = self.statistics(self.grow(state, actions, deadline))
+        if cancelled.is_set():
+            self.pool.cancel()
+            for task in tasks:
+                task.cancel()
+            return totals
+        for task in tasks:
+            statistics, rollouts = task.result()
+            self.rollouts += rollouts
+            for action, (visits, wins) in statistics.items():
+                total = totals.get(action, (0, 0.0))
+                totals[action] = (total[0] + visits, total[1] + wins)
+        return totals
+
+    def close(self) -> None:
+        """Stops the worker processes and frees the shared memory, if the computer started them itself."""
+        if self.pool is not None and self.own_pool:
+            self.pool.close()
+            self.pool = None
+
+    def rate(self) -> float:
+        """Returns the number of rollouts played per second of searching, on every worker together."""
+        return self.rollouts / self.thinking if self.thinking > 0 else 0.0
+
+    def statistics(self, root: Node) -> dict:
+        """Returns the visits and wins of every action of the root of a tree played in its search, by the action.
+            The visits a child started off with from the transposition table are left out, since they were played for other orders of actions."""
+        return {child.action: (child.visits - child.seeded[0], child.wins - child.seeded[1]) for child in root.children}
+
+    def grow(self, state: engine.GameState, actions: list, deadline: float) -> Node:
+        """Grows a search tree from the given match until the deadline, but at least once for every action unless the hard deadline passes, then returns its root.
+            Every action of the root is tried right away, deeper nodes are only expanded once they have been played out from a few times,
+            so the value of an action is measured by the policy continuing from it before other actions after it are mixed in. Stops as soon as the search is cancelled."""
+        root = Node(state, None, None, actions)
+        horizon, cancelled = turns_played(state) + self.ROLLOUT_TURNS, self.cancelled
+        scratch = state.clone()
+        while not cancelled.is_set() and ((root.untried and time.perf_counter() < self.limit) or time.perf_counter() < deadline):
+            node = root
+            while not node.untried and node.children:
+                node = node.select(self.EXPLORATION)
+            scratch.restore(node.snapshot)
+            scratch.seed = self.random.getrandbits(64)     #Rolls of its own for every rollout, which the match can't foresee and repeated rollouts average over.
+            if node.untried and (node is root or node.visits >= self.EXPANSION):
+                action = node.untried.pop(self.random.randrange(len(node.untried)))
+                if not scratch.apply_action(action):
+                    continue
+                node.children.append(Node(scratch, action, node, self.follow_up(scratch, node, action)))
+                node = node.children[-1]
+                node.seed(self.table, self.team)
+            value = self.rollout(scratch, horizon)
+            while node is not None:
+                node.visits += 1
+                if node.team is not None:
+                    node.wins += value if node.team == self.team else 1 - value
+                    self.table.store(node.hash, node.visits, node.wins if node.team == self.team else node.visits - node.wins)
+                node = node.parent
+        return root
+
+    def candidates(self, state: engine.GameState) -> list:
+        """Returns the actions looked at in the search tree: every attack and capture, the destinations closest to the goals of each unit that hasn't moved yet,
+            and the most expensive units every workshop can produce. The more units are waiting to move, the fewer destinations each of them gets."""
+        if state.winner() is not None:
+            return []
+        team, actions, goals = state.current_team(), [], self.turn_goals(state)
+        waiting = sum(1 for unit in state.rosters[team].values() if unit.moved == 0)
+        moves = max(1, min(self.MOVES, self.BRANCHING // max(1, waiting)))
+        for (x, y), unit in list(state.rosters[team].items()):
+            actions += self.engagements(state, (x, y))
+            if unit.moved == 0:
+                goal = self.nearest((x, y), goals[unit.capture])
+                destinations = sorted(state.reachable(Index(x, y)), key=lambda position: self.distance(position, goal))
+                actions += [("move", (x, y), position) for position in destinations[:moves]]
+        for x, y in state.workshops:
+            actions += [("produce", (x, y), selection) for selection in self.purchases(state, Index(x, y))[-self.PURCHASES:]]
+        return self.closing(actions)
+
+    def closing(self, actions: list) -> list:
+        """Adds ending the turn to the actions once only purchases are left. Ending the turn earlier would leave every unit that could still act idle,
+            which the rollouts stopping at the same turn rate too well, since the enemy walks into range of the idle units."""
+        if all(action[0] == "produce" for action in actions) and ("end",) not in actions:
+            actions.append(("end",))
+        return actions
+
+    def engagements(self, state: engine.GameState, position: tuple) -> list:
+        """Returns every attack of the unit on the given location, and its capture if it can capture the terrain it is standing on."""
+        actions = [("attack", position, (on.x, on.y)) for on in state.attackable_targets(Index(*position))]
+        if state.can_capture(Index(*position)):
+            actions.append(("capture", position))
+        return actions
+
+    def follow_up(self, state: engine.GameState, node: Node, action: tuple) -> list:
+        """Returns the actions looked at after the given action of the node has been carried out on the match: the actions of the node that can still be taken,
+            and the attacks and capture of a unit that has just moved. Only a new turn looks for the candidates again, so the paths of the units are only searched once a turn."""
+        if action[0] == "end" or state.winner() is not None:
+            return self.candidates(state)
+        actions = [other for other in node.actions if other != action and self.possible(state, other)]
+        if action[0] == "move":
+            actions += self.engagements(state, action[2])
+        return self.closing(actions)
+
+    def possible(self, state: engine.GameState, action: tuple) -> bool:
+        """Checks if an action looked at earlier in the turn can still be taken. Moves are only checked for their destination, their path is checked once they are carried out."""
+        kind = action[0]
+        if kind == "move":
+            unit = state.unit_at(Index(*action[1]))
+            return unit is not None and unit.team == state.current_team() and unit.moved == 0 and state.unit_at(Index(*action[2])) is None
+        elif kind == "attack":
+            return state.can_attack(Index(*action[1]), Index(*action[2]))
+        elif kind == "capture":
+            return state.can_capture(Index(*action[1]))
+        elif kind == "produce":
+            return state.can_produce(Index(*action[1]), action[2])
+        return True
+
+    def purchases(self, state: engine.GameState, location: Index) -> list:
+        """Returns the units the current team can buy on the given workshop, from the cheapest to the most expensive."""
+        if state.winner() is not None or state.unit_at(location) is not None or not state.terrain_at(location).is_team_workshop(state.current_team()):
+            return []
+        return [selection for selection, price in CATALOG if price <= state.team_money[state.team_turn]]
+
+    def turn_goals(self, state: engine.GameState) -> dict:
+        """Returns the locations the units of the current team should head towards, by whether they can capture: every enemy unit and, for the ones that can capture,
+            every property the team doesn't own. These are worked out once for a turn of the team, the same goals are kept while its units move."""
+        if self.properties is None:
+            self.properties = [position for kind in terrains.KINDS if kind.capturable for position in state.terrainmap.locations(kind.identifier)]
+        team = state.current_team()
+        enemies = [position for other, roster in state.rosters.items() if other != team for position in roster]
+        return {False: enemies, True: enemies + [(x, y) for x, y in self.properties if state.terrainmap[x][y].team != team]}
+
+    def nearest(self, position: tuple, goals: list) -> tuple:
+        """Returns the goal closest to the given location, or the location itself if there are no goals."""
+        return min(goals, key=lambda goal: self.distance(position, goal), default=position)
+
+    def distance(self, position: tuple, goal: tuple) -> int:
+        """Returns the Manhattan distance between the given location and goal."""
+        return abs(position[0] - goal[0]) + abs(position[1] - goal[1])
+
+    def rollout(self, state: engine.GameState, horizon: int) -> float:
+        """Plays out the match with the greedy policy until the given number of turns have been played, then returns the chance of the computer's team winning it.
+            Every rollout of a search stops at the same turn, so ending the turn early isn't rewarded with looking further ahead."""
+        self.rollouts += 1
+        while state.winner() is None and turns_played(state) < horizon:
+            self.play_out(state, self.ROLLOUT_WANDER)
+        return self.evaluate(state)
+
+    def play_out(self, state: engine.GameState, wander: float = None) -> None:
+        """Plays the rest of the current team's turn: every unit attacks the most valuable target it can, captures, or heads towards its nearest goal,
+            then the workshops produce units while the funds last. Units move somewhere random with the given chance, WANDER by default,
+            and one of the most expensive units is bought at random, or the most expensive one if they never wander."""
+        wander = self.WANDER if wander is None else wander
+        team, goals = state.current_team(), self.turn_goals(state)
+        for x, y in list(state.rosters[team]):
+            on = Index(x, y)
+            unit = state.unit_at(on)
+            if state.winner() is not None:
+                return
+            if unit is None or unit.team != team or self.strike(state, on):
+                continue
+            if not state.can_capture(on) and unit.moved < unit.speed:
+                destination = self.approach(state, on, goals, wander)
+                if destination is not None:
+                    state.apply_path(on, Index(*destination))
+                    on = Index(*destination)
+            if not self.strike(state, on) and state.can_capture(on):
+                state.apply_capture(on)
+        for x, y in state.workshops:
+            purchases = self.purchases(state, Index(x, y))
+            if purchases:
+                state.apply_production(Index(x, y), self.random.choice(purchases[-self.PURCHASES:]) if wander else purchases[-1])
+        if state.winner() is None:
+            state.end_turn()
+
+    def greedy(self, state: engine.GameState) -> tuple:
+        """Returns the next action the policy of play_out would take, without moving anywhere random and buying the most expensive unit it can."""
+        team, goals = state.current_team(), self.turn_goals(state)
+        for (x, y), unit in state.rosters[team].items():
+            target = self.target(state, Index(x, y))
+            if target is not None:
+                return ("attack", (x, y), (target.x, target.y))
+            if state.can_capture(Index(x, y)):
+                return ("capture", (x, y))
+            if unit.moved == 0:
+                destination = self.approach(state, Index(x, y), goals, 0)
+                if destination is not None:
+                    return ("move", (x, y), destination)
+        for x, y in state.workshops:
+            purchases = self.purchases(state, Index(x, y))
+            if purchases:
+                return ("produce", (x, y), purchases[-1])
+        return ("end",)
+
+    def approach(self, state: engine.GameState, on: Index, goals: dict, wander: float) -> tuple:
+        """Returns where the unit on the given location moves: the reachable location closest to its nearest goal, or with the given chance a random one.
+            Returns None if it can't move anywhere."""
+        reach = list(state.reachable(on))
+        if not reach:
+            return None
+        if wander and self.random.random() < wander:
+            return self.random.choice(reach)
+        goal = self.nearest((on.x, on.y), goals[state.unit_at(on).capture])
+        return min(reach, key=lambda position: self.distance(position, goal))
+
+    def target(self, state: engine.GameState, on: Index) -> Index:
+        """Returns the target the unit on the given location is expected to destroy the most worth of, or None if it can't attack any."""
+        targets = state.attackable_targets(on)
+        if not targets:
+            return None
+        attacker = state.unit_at(on)
+        damages = damagetable.table().expected_batch([(attacker, state.unit_at(target), state.terrain_at(target)) for target in targets])
+        worths = [min(damage, state.unit_at(target).health) * PRICES[state.unit_at(target).type] for damage, target in zip(damages, targets)]
+        return targets[worths.index(max(worths))]
+
+    def strike(self, state: engine.GameState, on: Index) -> bool:
+        """Makes the unit on the given location attack its most valuable target, if it can attack any."""
+        target = self.target(state, on)
+        if target is None:
+            return False
+        state.apply_attack(on, target)
+        return True
+
+    def worth(self, state: engine.GameState, team: str) -> float:
+        """Returns what the given team has on the map: the price of its units by their health, its funds, the income of its buildings for a few days,
+            and the part of the buildings its units are capturing that is already captured."""
+        ind = state.TEAMS.index(team)
+        worth = self.FUNDS * state.team_money[ind]
+        worth += self.BUILDING * state.INCOME * state.team_buildings[ind]
+        for (x, y), unit in state.rosters[team].items():
+            worth += PRICES[unit.type] * unit.health / 100
+            terrain = state.terrainmap[x][y]
+            if terrain.capturable and terrain.team != team:
+                worth += (1 - terrain.health / terrain.default_health) * (self.HQ if terrain.is_a_hq() else self.BUILDING * state.INCOME)
+        return worth
+
+    def evaluate(self, state: engine.GameState) -> float:
+        """Returns the chance of the computer's team winning the match, based on the difference in worth between the teams."""
+        if state.winner() is not None:
+            return 1.0 if state.winner() == self.team else 0.0
+        difference = sum(self.worth(state, team) * (1 if team == self.team else -1) for team in state.TEAMS)
+        return 1 / (1 + math.exp(-max(-50, min(50, difference / self.SCALE))))
+
+class WorkerPool:
+    """Class for the worker processes of a match and the shared memory they read the terrain of the map from.
+        Only one computer thinks at a time, so the computers of a match share a single pool.
+        Every search handed to the workers gets an id, and the end of the shared memory holds the id of the last cancelled search, which the workers check after every rollout."""
+    def __init__(self, count: int):
+        self.count = count          #Number of worker processes.
+        self.executor = None        #Worker processes, started with the first parallel search.
+        self.memory = None
+        self.flag = 0               #Position of the id of the last cancelled search in the shared memory.
+        self.searches = 0           #Number of searches handed to the workers, the id of the last one.
+
+    def start(self, state: engine.GameState) -> None:
+        """Publishes the terrain kinds and original owners of the map in shared memory and starts the worker processes, if they aren't running yet.
+            The workers are spawned rather than forked on every platform, so they never inherit the display of the game."""
+        if self.executor is not None:
+            return
+        grid = state.terrainmap
+        tiles = grid.xrn * grid.yrn
+        self.memory = shared_memory.SharedMemory(create=True, size=2 * tiles + CANCELLED.size)
+        self.memory.buf[:tiles], self.memory.buf[tiles:2 * tiles] = bytes(grid.kinds), bytes(grid.owners)
+        self.flag = 2 * tiles
+        CANCELLED.pack_into(self.memory.buf, self.flag, self.searches)
+        self.executor = ProcessPoolExecutor(self.count, multiprocessing.get_context("spawn"), worker_setup, (self.memory.name, grid.xrn, grid.yrn))
+
+    def new_search(self) -> int:
+        """Returns the id of a new search of the workers."""
+        self.searches += 1
+        return self.searches
+
+    def cancel(self) -> None:
+        """Cancels every search handed to the workers so far."""
+        if self.memory is not None:
+            CANCELLED.pack_into(self.memory.buf, self.flag, self.searches)
+
+    def close(self) -> None:
+        """Stops the worker processes and frees the shared memory, if they were started."""
+        if self.executor is None:
+            return
+        self.executor.shutdown(cancel_futures=True)
+        self.memory.close()
+        self.memory.unlink()
+        self.executor, self.memory = None, None
+
+class Cancellation:
+    """Class that stands in for the cancelled event of a computer in a worker process, set once the id of the last cancelled search in shared memory reaches the id of its own."""
+    def __init__(self, memory: shared_memory.SharedMemory, offset: int, search: int):
+        self.memory = memory
+        self.offset = offset
+        self.search = search
+
+    def is_set(self) -> bool:
+        """Checks if the search has been cancelled."""
+        return CANCELLED.unpack_from(self.memory.buf, self.offset)[0] >= self.search
+
+class Thinking:
+    """Class for a turn of a computer player thought out on a background thread, so the game keeps responding meanwhile.
+        The thread searches on its own copy of the match and hands every chosen action to the notify function, then waits for the game to apply it
+        and send back the snapshot of the match, since attacks are random and only the outcome in the game counts."""
+    STOP_TIMEOUT = 0.5      #Seconds the game waits for the thread to finish after cancelling it, a search stops within a rollout.
+
+    def __init__(self, computer: Computer, state: engine.GameState, notify: object):
+        self.computer = computer
+        self.state = state.clone()
+        self.notify = notify
+        self.snapshots = queue.Queue()      #Snapshots of the match after the game applied the chosen actions, None if the turn is cancelled.
+        self.choosing = False               #Whether the thread is choosing an action, rather than waiting for the game to show the last one.
+        self.thread = threading.Thread(target=self.run, name="computer-thinking", daemon=True)
+        self.computer.start_turn()
+        self.cancelled = self.computer.cancelled
+        self.thread.start()
+
+    def run(self) -> None:
+        """Chooses the actions of the turn one by one, until the turn is over or cancelled."""
+        while not self.cancelled.is_set():
+            self.choosing = True
+            action = self.computer.choose(self.state)
+            self.choosing = False
+            self.notify(action)
+            snapshot = self.snapshots.get()
+            if snapshot is None:
+                return
+            self.state.restore(snapshot)
+            if self.state.winner() is not None or self.state.current_team() != self.computer.team:
+                return
+
+    def applied(self, snapshot: tuple) -> None:
+        """Hands the snapshot of the match after the last chosen action was applied over to the thread."""
+        self.snapshots.put(snapshot)
+
+    def cancel(self) -> None:
+        """Stops the search as soon as possible, on the worker processes too, and waits a little for the thread to finish.
+            A thread that is still running afterwards ends on its own, since it only ever acts on this turn."""
+        self.computer.cancel()
+        self.snapshots.put(None)
+        self.thread.join(self.STOP_TIMEOUT)
+
+    def overdue(self) -> bool:
+        """Checks if the thread is still choosing an action well after the hard deadline of the turn, when it should only be taking the actions of the greedy policy.
+            Time spent showing the actions in the game doesn't count."""
+        return self.choosing and time.perf_counter() > self.computer.limit + self.computer.GRACE
+
+__worker = {}       #Shared memory and match of a worker process, every task is restored onto the same match.
+
+def worker_setup(name: str, xrn: int, yrn: int) -> None:
+    """Attaches a worker process to the terrain of the map in shared memory, and sets up an empty match on it without copying the terrain."""
+    memory = shared_memory.SharedMemory(name=name)
+    tiles = xrn * yrn
+    grid = terrains.TerrainGrid(xrn, yrn, memory.buf[:tiles], memory.buf[tiles:2 * tiles])
+    __worker["memory"] = memory
+    __worker["cancelled"] = 2 * tiles
+    __worker["state"] = engine.GameState(grid, [[None] * yrn for x in range(xrn)], [0] * len(engine.GameState.TEAMS), xrn, yrn)
+    __worker["table"] = zobrist.TranspositionTable()
+    damagetable.table()
+
+def worker_search(team: str, snapshot: tuple, actions: list, deadline: float, limit: float, seed: int, search: int) -> tuple:
+    """Restores the snapshot in a worker process and grows a search tree from it until the given deadline and hard deadline, given as wall clock time, or until the search is cancelled.
+        Returns with the statistics of the root actions and the number of rollouts played."""
+    state = __worker["state"]
+    state.restore(snapshot)
+    computer = Computer(team, seed=seed)
+    computer.cancelled = Cancellation(__worker["memory"], __worker["cancelled"], search)
+    computer.table = __worker["table"]
+    computer.table.new_generation()
+    offset = time.perf_counter() - time.time()
+    computer.limit = limit + offset
+    root = computer.grow(state, actions, deadline + offset)
+    return computer.statistics(root), computer.rollouts
+
+def match(path: str, budget: float = 3, seed: int = 0, team: str = "Red", turns: int = 40) -> tuple:
+    """Plays a match on the given map without drawing anything, between a computer searching for the given seconds every turn for the given team
+        and the policy of play_out for the other one. Returns with the winner, None if neither team has won after the given number of turns,
+        and how much more the searching team is worth at the end."""
+    state = engine.load_game(mapcache.load(path), seed)
+    other = [name for name in state.TEAMS if name != team][0]
+    computer, policy = Computer(team, budget, seed), Computer(other, seed=seed + 1)
+    while state.winner() is None and turns_played(state) < turns:
+        if state.current_team() == team:
+            computer.start_turn()
+            while state.winner() is None and state.current_team() == team:
+                state.apply_action(computer.choose(state))
+        else:
+            policy.play_out(state)
+    return state.winner(), computer.worth(state, team) - computer.worth(state, other)
+
+def benchmark(path: str, workers: int, seconds: float = 5) -> float:
+    """Searches the first action on the given map with the given number of workers for the given seconds, and returns the rollouts played per second."""
+    state = engine.load_game(mapcache.load(path))
+    computer = Computer(state.current_team(), workers=workers)
+    try:
+        computer.search(state, computer.candidates(state), time.perf_counter() + 1)      #Starts the workers and builds their damage tables.
+        computer.rollouts, computer.thinking = 0, 0.0
+        computer.search(state, computer.candidates(state), time.perf_counter() + seconds)
+    finally:
+        computer.close()
+    return computer.rate()
+
+if __name__ == "__main__":
+    if sys.argv[1] == "--match":
+        #Plays the search against the policy of play_out on every bundled map, searching for each team once, e.g.: python ai.py --match 3
+        budget, results = float(sys.argv[2]) if len(sys.argv) > 2 else 3, []
+        for path in sorted(glob.glob(os.path.join("Maps", "*.txt"))):
+            for seed, team in enumerate(engine.GameState.TEAMS):
+                winner, lead = match(path, budget, seed, team)
+                results.append((winner, team, lead))
+                print("{} as {}: {}, {} worth ahead".format(os.path.basename(path), team, "won" if winner == team else "lost" if winner else "draw", round(lead)))
+        print("Search against play_out with {} s a turn: {} won, {} lost, {} drawn, ahead in {} of {} matches".format(budget,
+                sum(winner == team for winner, team, lead in results), sum(winner not in (None, team) for winner, team, lead in results),
+                sum(winner is None for winner, team, lead in results), sum(lead > 0 for winner, team, lead in results), len(results)))
+    else:
+        #Reports the rollouts per second on a map for every given number of workers, e.g.: python ai.py Maps/spann_island.txt 1 2 4
+        for count in [int(argument) for argument in sys.argv[2:]] or [1]:
+            print("{} worker(s): {} rollouts/s".format(count, round(benchmark(sys.argv[1], count), 1)))
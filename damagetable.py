@@ -0,0 +1,171 @@
+import math
+import sys
+from array import array
+
+import terrains
+import units
+
+BUCKET = 10                                                         #Width of the health buckets, the damages are stored for the healths on the edges of the buckets.
+BUCKETS = 100 // BUCKET                                             #Number of health buckets.
+POINTS = BUCKETS + 1                                                #Number of healths the damages are stored for: 0, BUCKET, 2 * BUCKET, ... 100.
+TYPES = units.get_units()                                           #Every unit type, the position is its id in the table.
+TYPE_IDS = {type: ind for ind, type in enumerate(TYPES)}            #Id of every unit type, by its name.
+GROUNDS = {kind.defense: kind for kind in terrains.KINDS}           #A kind of terrain for every defense value a terrain can have, to work out damages on.
+DEFENSES = sorted(GROUNDS)                                          #Every defense value a terrain can have, the position is its id in the table.
+DEFENSE_IDS = {defense: ind for ind, defense in enumerate(DEFENSES)}
+ROLLS = units.ROLL + 1                                              #Number of possible rolls of an attack.
+TOLERANCE = 1e-6                                                    #Largest difference from the live formula at the actual healths that validation lets through.
+
+def bucket(health: float) -> int:
+    """Returns the id of the health bucket the given health falls into."""
+    return min(BUCKETS, max(1, math.ceil(health / BUCKET))) - 1
+
+def point(health: float) -> tuple:
+    """Returns the id of the stored health at or below the given health and how far the health is towards the next stored one, from 0 to 1."""
+    position = min(max(health, 0), 100) / BUCKET
+    ind = min(int(position), BUCKETS - 1)
+    return ind, position - ind
+
+class DamageTable:
+    """Class for looking up the damage of attacks instead of working them out, with the damage of every attack stored in a single flat array.
+        It is indexed by attacker type, defender type, terrain defense, attacker health, defender health and roll, generated once from the stats of spawn_unit.
+        Damages are stored for the healths on the edges of the buckets and interpolated between them. The attack of a unit grows linearly with its health
+        and its defense shrinks linearly with it, so the interpolated damage matches the live formula at the actual healths.
+        In validation mode every lookup is checked against the live formula of the units at their actual healths, within the tolerance."""
+    def __init__(self, validate: bool = False):
+        self.validate = validate
+        self.lookups = 0            #Lookups measured in validation mode.
+        self.total_error = 0.0      #Sum of the differences of the measured lookups from the damage at the actual healths.
+        self.max_error = 0.0
+        self.damage = array('d')
+        self.expected = array('d')  #Average damage over every roll, indexed the same way without the roll.
+        for attacking in [units.spawn_unit(None, type) for type in TYPES]:
+            attack_values = [self.__attack_values(attacking, apoint) for apoint in range(POINTS)]
+            for defending in [units.spawn_unit(None, type) for type in TYPES]:
+                divisor = self.__divisor(attacking, defending)
+                for defense in DEFENSES:
+                    defense_values = [self.__defense_value(defending, dpoint, GROUNDS[defense]) for dpoint in range(POINTS)]
+                    for apoint in range(POINTS):
+                        for dpoint in range(POINTS):
+                            damages = [value * defense_values[dpoint] / divisor for value in attack_values[apoint]]
+                            self.damage.extend(damages)
+                            self.expected.append(sum(damages) / ROLLS)
+
+    def __attack_values(self, attacking: units.Unit, apoint: int) -> list:
+        """Returns the attack value of the unit for every roll, with the given stored health."""
+        attacking.health = apoint * BUCKET
+        return [attacking.attack_value(roll=roll) for roll in range(ROLLS)]
+
+    def __defense_value(self, defending: units.Unit, dpoint: int, terrain: object) -> float:
+        """Returns the defense value of the unit on the terrain, with the given stored health."""
+        defending.health = dpoint * BUCKET
+        return defending.defense_value(terrain)
+
+    def __divisor(self, attacking: units.Unit, defending: units.Unit) -> float:
+        """Returns what the damage is divided by, based on the ammunition of the attacker and the armor of the defender, the same way as in getting_attacked."""
+        if attacking.ammunition == "Bullets":
+            return defending.armor
+        elif attacking.ammunition == "Piercing":
+            return 1 + defending.armor / 10
+        elif attacking.ammunition == "Explosives":
+            return defending.armor / 2
+        return 1
+
+    def index(self, attacking: units.Unit, defending: units.Unit, terrain: object, apoint: int, dpoint: int) -> int:
+        """Returns the position of the attack with the given stored healths in the table of the expected damages, times the rolls it is the position of the first roll."""
+        ind = (TYPE_IDS[attacking.type] * len(TYPES) + TYPE_IDS[defending.type]) * len(DEFENSES) + DEFENSE_IDS[terrain.defense]
+        return (ind * POINTS + apoint) * POINTS + dpoint
+
+    def __interpolate(self, values: array, ind: int, stride: int, ashare: float, dshare: float) -> float:
+        """Interpolates between the values stored for the four stored healths around the actual ones, the first of them on the given position."""
+        row = POINTS * stride
+        low = values[ind] + (values[ind + stride] - values[ind]) * dshare
+        high = values[ind + row] + (values[ind + row + stride] - values[ind + row]) * dshare
+        return low + (high - low) * ashare
+
+    def lookup(self, attacking: units.Unit, defending: units.Unit, terrain: object, roll: int) -> float:
+        """Returns the damage the defending unit takes from the attacking one on the given terrain with the given roll."""
+        apoint, ashare = point(attacking.health)
+        dpoint, dshare = point(defending.health)
+        damage = self.__interpolate(self.damage, self.index(attacking, defending, terrain, apoint, dpoint) * ROLLS + roll, ROLLS, ashare, dshare)
+        if self.validate:
+            self.measure(damage, self.live(attacking, defending, terrain, roll), attacking, defending)
+        return damage
+
+    def live(self, attacking: units.Unit, defending: units.Unit, terrain: object, roll: int) -> float:
+        """Returns the damage of the attack from the live formula of the units, at their actual healths."""
+        return defending.damage_taken(attacking, terrain, roll)
+
+    def measure(self, damage: float, exact: float, attacking: units.Unit, defending: units.Unit) -> None:
+        """Adds the difference of a looked up damage from the damage at the actual healths to the measured errors, raising an AssertionError if it is over the tolerance."""
+        self.lookups += 1
+        self.total_error += abs(damage - exact)
+        self.max_error = max(self.max_error, abs(damage - exact))
+        assert abs(damage - exact) <= TOLERANCE, "Damage table differs from the live formula by {} for {} attacking {}.".format(abs(damage - exact), attacking.type, defending.type)
+
+    def error(self, step: float = 5) -> tuple:
+        """Returns the average and the largest difference of the table from the live formula at the actual healths, over every attack with both healths going up in the given steps."""
+        total, largest, count = 0.0, 0.0, 0
+        healths = [step * ind for ind in range(1, int(100 / step) + 1)]
+        for attacking_type in TYPES:
+            for defending_type in TYPES:
+                attacking, defending = units.spawn_unit(None, attacking_type), units.spawn_unit(None, defending_type)
+                for defense in DEFENSES:
+                    terrain = GROUNDS[defense]
+                    for attacking_health in healths:
+                        for defending_health in healths:
+                            attacking.health, defending.health = attacking_health, defending_health
+                            for roll in range(ROLLS):
+                                difference = abs(self.lookup(attacking, defending, terrain, roll) - self.live(attacking, defending, terrain, roll))
+                                total, largest, count = total + difference, max(largest, difference), count + 1
+        return total / count, largest
+
+    def report(self) -> str:
+        """Returns the differences of the lookups measured in validation mode from the damage at the actual healths in a readable form."""
+        return "Damage table: {} lookups, {} average and {} largest difference from the damage at the actual healths".format(
+                self.lookups, self.total_error / self.lookups if self.lookups else 0, self.max_error)
+
+    def batch(self, attacks: list) -> list:
+        """Takes a list of (attacking, defending, terrain, roll) attacks and returns with the damage of each of them."""
+        return [self.lookup(attacking, defending, terrain, roll) for attacking, defending, terrain, roll in attacks]
+
+    def expected_batch(self, attacks: list) -> list:
+        """Takes a list of (attacking, defending, terrain) attacks and returns with the average damage of each of them over every roll."""
+        expected = []
+        for attacking, defending, terrain in attacks:
+            apoint, ashare = point(attacking.health)
+            dpoint, dshare = point(defending.health)
+            expected.append(self.__interpolate(self.expected, self.index(attacking, defending, terrain, apoint, dpoint), 1, ashare, dshare))
+            if self.validate:
+                self.measure(expected[-1], sum(self.live(attacking, defending, terrain, roll) for roll in range(ROLLS)) / ROLLS, attacking, defending)
+        return expected
+
+    def check(self) -> None:
+        """Checks every damage of the table against the live formula of the units at its stored healths, raising an AssertionError on the first difference."""
+        for attacking_type in TYPES:
+            for defending_type in TYPES:
+                for defense in DEFENSES:
+                    terrain = GROUNDS[defense]
+                    for apoint in range(POINTS):
+                        for dpoint in range(POINTS):
+                            attacking, defending = units.spawn_unit(None, attacking_type), units.spawn_unit(None, defending_type)
+                            attacking.health, defending.health = apoint * BUCKET, dpoint * BUCKET
+                            for roll in range(ROLLS):
+                                assert self.damage[self.index(attacking, defending, terrain, apoint, dpoint) * ROLLS + roll] == defending.damage_taken(attacking, terrain, roll), \
+                                    "Damage table differs from the live formula for {} attacking {}.".format(attacking_type, defending_type)
+
+__tables = {}       #Tables that have been generated, by whether they validate their lookups.
+
+def table(validate: bool = False) -> DamageTable:
+    """Returns the damage table, generating it on the first call."""
+    if validate not in __tables:
+        __tables[validate] = DamageTable(validate)
+    return __tables[validate]
+
+if __name__ == "__main__":
+    #Checks how the table was generated, then reports how far it is from the live formula at the actual healths, e.g.: python damagetable.py 5
+    damages = table()
+    damages.check()
+    average, largest = damages.error(float(sys.argv[1]) if len(sys.argv) > 1 else 5)
+    print("The table matches the live formula at every stored health.")
+    print("Difference from the damage at the actual healths: {} on average, {} at most, tolerance {}".format(average, largest, TOLERANCE))
@@ -1,6 +1,53 @@
+from collections import OrderedDict
+
 import pygame as py
 import pygame.gfxdraw as pgfx
 
+class CachedFont:
+    """Class that stands in for a pygame font, handing every render call over to the text cache it belongs to."""
+    def __init__(self, cache: object, name: str, size: int):
+        self.cache = cache
+        self.key = (name, size)
+        self.font = py.font.SysFont(name, size)
+
+    def render(self, text: str, antialias: bool, color: py.Color) -> py.Surface:
+        """Returns the rendered text, only rendering it if it isn't cached yet."""
+        return self.cache.render(self, text, antialias, color)
+
+class TextCache:
+    """Class that stores the fonts of a session, so they are only looked up once, and the most recently rendered texts.
+        Texts are cached by font, text and color, and the least recently used one is dropped when the cache is full."""
+    def __init__(self, capacity: int = 256):
+        self.capacity = capacity
+        self.fonts = {}
+        self.rendered = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def font(self, name: str, size: int) -> CachedFont:
+        """Returns the font with the given name and size, looking it up on the system only the first time it's asked for."""
+        if (name, size) not in self.fonts:
+            self.fonts[(name, size)] = CachedFont(self, name, size)
+        return self.fonts[(name, size)]
+
+    def render(self, font: CachedFont, text: str, antialias: bool, color: py.Color) -> py.Surface:
+        """Returns the text rendered with the font and color, from the cache if it was rendered recently."""
+        key = (font.key, text, antialias, tuple(py.Color(color)))
+        if key in self.rendered:
+            self.hits += 1
+            self.rendered.move_to_end(key)
+            return self.rendered[key]
+        self.misses += 1
+        surface = self.rendered[key] = font.font.render(text, antialias, color)
+        if len(self.rendered) > self.capacity:
+            self.rendered.popitem(last=False)
+        return surface
+
+    def stats(self) -> str:
+        """Returns the hit and miss counters of the cache in a readable form."""
+        total = self.hits + self.misses
+        return "Text cache: {} hits, {} misses ({}% hit rate), {} fonts".format(self.hits, self.misses, round(100 * self.hits / total, 1) if total else 0, len(self.fonts))
+
 def __history_dimensions(list: list, letter_size: int) -> tuple:
     """Takes the history list and sizes of letters and returns the needed size for the history window."""
     width = 0
@@ -32,11 +79,12 @@ def matchhistory(list: list) -> None:
             quit = True
     py.quit()
 
-def draw_info(window: object, title: str, list: list, starting: int) -> None:
+def draw_info(window: object, title: str, list: list, starting: int, text_cache: TextCache = None) -> None:
     """Draws a string list's elements onto the given window based on height."""
-    title_font = py.font.SysFont('Arial Bold', 30)
+    text_cache = TextCache() if text_cache is None else text_cache
+    title_font = text_cache.font('Arial Bold', 30)
     title_fgcolor = py.Color('SkyBlue')
-    text_font = py.font.SysFont('Arial', 16)
+    text_font = text_cache.font('Arial', 16)
     text_fgcolor = py.Color('Yellow')
     text = title_font.render(title, True, title_fgcolor)
     window.blit(text, (40, starting))
@@ -47,22 +95,27 @@ def draw_info(window: object, title: str, list: list, starting: int) -> None:
 def info() -> None:
     """Displays the control information in a new window."""
     py.init()
-    window = py.display.set_mode((420, 280))
+    window = py.display.set_mode((420, 350))
     py.display.set_caption("Controls")
     window.fill(py.Color("DimGray"))
     mousecontrols = ["Unit/terrain selection: left-click on a tile."
             , "  - Left-click on the tile again to unselect the unit."
             , "  - For factory: left-click again to list units."
             , "      - Left-click on a purchasable unit to have it spawn."
-            , "Unit movement: left-click on a valid adjacent tile."
+            , "Unit movement: left-click on any tile the unit can reach."
             , "Unit attack: right-click on a unit in range."
+            , "  - Hover over a unit in range to see the attack forecast."
             , "Unit capture: right-click on the tile the unit is on."
             , "End turn: left-click on the \"End Turn\" button."
-            , "Exit: left-click on the \"Exit\" button."]
+            , "Exit: left-click on the \"Exit\" button."
+            , "Scrolling: rest the mouse on an edge of the map."]
     keyboardcontrols = ["Movement: W/^ - Up, A/< - Left, S/ˇ - Down, D/> - Right"
+            , "Scrolling: the same keys while no unit is selected,"
+            , "  or while holding Shift"
             , "Capture: Space, End turn: Enter, Exit: Escape"]
-    draw_info(window, "Mouse", mousecontrols, 4)
-    draw_info(window, "Keyboard", keyboardcontrols, 210)
+    text_cache = TextCache()
+    draw_info(window, "Mouse", mousecontrols, 4, text_cache)
+    draw_info(window, "Keyboard", keyboardcontrols, 246, text_cache)
     py.display.update()
     quit = False
     while not quit:
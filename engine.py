@@ -0,0 +1,377 @@
+import copy
+import hashlib
+
+import damagetable
+import pathing
+import terrains
+import units
+import zobrist
+
+class Index:
+    """Class for storing coordinate/location data of anything on the map and easily doing operations on them."""
+    __slots__ = ("x", "y")
+
+    def __init__(self, x: int, y: int):
+        self.x = x
+        self.y = y
+
+    def __eq__(self, other: object) -> bool:
+        """Default equals function override, checks if Indexes have the same location data."""
+        return self.x == other.x and self.y == other.y
+
+    def __sub__(self, other: object) -> object:
+        """Default subtract function override, takes the two indexes and subtracts the values of the smaller from the larger one, then returns the result in a new Index."""
+        return Index(max(self.x, other.x) - min(self.x, other.x), max(self.y, other.y) - min(self.y, other.y))
+
+    def __abs__(self):
+        """Default absolute function override, only adds up the values of the index, since the location data won't give negatives."""
+        return self.x + self.y
+
+class GameState:
+    """Class that stores everything about a running match and applies the rules of the game on it, without ever drawing anything.
+        Every apply function returns a boolean telling if the action was valid and has been carried out."""
+    TEAMS = ["Red", "Blue"]         #List for storing all playable teams.
+    INCOME = 10                     #Funds a team gets for each of its buildings at the start of a new day.
+
+    def __init__(self, terrainmap: list[list], unitmap: list[list], team_buildings: list, xrn: int, yrn: int, seed: int = 0):
+        self.xrn = xrn
+        self.yrn = yrn
+        self.terrainmap = terrainmap
+        self.unitmap = unitmap
+        self.team_buildings = team_buildings
+        self.team_money = [0] * len(self.TEAMS)
+        self.team_turn = 0
+        self.turn_count = 1
+        self.victor = None
+        self.seed = seed            #Seed of the rolls of the attacks, together with the number of rolls so far it decides every roll.
+        self.rolls = 0
+        self.log = None             #Every action carried out through apply_action, if the match is being recorded.
+        self.reach_cache = {}
+        self.workshops = terrainmap.locations('W')
+        self.rosters = {team: {} for team in self.TEAMS}
+        self.units_hash = 0         #Zobrist hash of every unit, updated by every change to them.
+        for x in range(xrn):
+            for y in range(yrn):
+                if unitmap[x][y] is not None:
+                    self.rosters[unitmap[x][y].team][(x, y)] = unitmap[x][y]
+                    self.toggle_unit(Index(x, y))
+        for team in self.TEAMS:
+            self.start_day(team)
+
+    def clone(self) -> object:
+        """Returns an independent copy of the match for looking ahead without changing it. Only what never changes is shared between the two."""
+        clone = copy.copy(self)
+        clone.terrainmap = self.terrainmap.copy()
+        clone.unitmap = [column[:] for column in self.unitmap]
+        clone.team_buildings, clone.team_money = self.team_buildings[:], self.team_money[:]
+        clone.reach_cache, clone.log = {}, None
+        clone.rosters = {team: {} for team in self.TEAMS}
+        for team, roster in self.rosters.items():
+            for (x, y), unit in roster.items():
+                clone.unitmap[x][y] = clone.rosters[team][(x, y)] = unit.copy()
+        return clone
+
+    def snapshot(self) -> tuple:
+        """Returns everything about the match that can change, in a compact form that can be sent to other processes.
+            Units are kept as (x, y, type, team, health, moved, attacked) tuples, the terrain only as the tiles that differ from how the map started."""
+        pieces = tuple((x, y, unit.type, unit.team, unit.health, unit.moved, unit.attacked) for roster in self.rosters.values() for (x, y), unit in roster.items())
+        return (self.team_turn, self.turn_count, self.victor, tuple(self.team_money), tuple(self.team_buildings), pieces, self.terrainmap.changes(), self.units_hash, self.rolls)
+
+    def restore(self, snapshot: tuple) -> None:
+        """Sets the match to the given snapshot, which has to be taken from a match on the same map. The seed of the rolls is kept.
+            Only the units and the changed tiles are written, units of the same type and team already on the same location are reused."""
+        self.team_turn, self.turn_count, self.victor, team_money, team_buildings, pieces, changes, self.units_hash, self.rolls = snapshot
+        self.team_money, self.team_buildings = list(team_money), list(team_buildings)
+        self.terrainmap.restore(changes)
+        previous = {}
+        for roster in self.rosters.values():
+            for x, y in roster:
+                previous[(x, y)], self.unitmap[x][y] = self.unitmap[x][y], None
+        self.rosters = {team: {} for team in self.TEAMS}
+        self.reach_cache = {}
+        for x, y, type, team, health, moved, attacked in pieces:
+            unit = previous.get((x, y))
+            if unit is None or unit.type != type or unit.team != team:
+                unit = units.spawn_unit(team, type)
+            unit.health, unit.moved, unit.attacked = health, moved, attacked
+            self.unitmap[x][y] = self.rosters[team][(x, y)] = unit
+
+    def zobrist(self) -> int:
+        """Returns the Zobrist hash of the match, made up of its units, the tiles that differ from how the map started, the funds and the team to move."""
+        hash = self.units_hash ^ self.terrainmap.hash ^ zobrist.key("side", self.team_turn, self.victor)
+        for ind, money in enumerate(self.team_money):
+            hash ^= zobrist.key("funds", ind, money)
+        return hash
+
+    def toggle_unit(self, on: Index) -> None:
+        """Adds the unit on the given location to the hash of the units, or takes it out if it is already in. Units are taken out before they change and added back after."""
+        unit = self.unitmap[on.x][on.y]
+        self.units_hash ^= zobrist.key("unit", on.x, on.y, unit.type, unit.team, damagetable.bucket(unit.health), unit.moved > 0, unit.attacked)
+
+    def roll(self) -> int:
+        """Returns the random bonus of the next attack. It is worked out from the seed and the number of rolls so far, so the same actions always have the same outcome."""
+        digest = hashlib.blake2b(self.rolls.to_bytes(8, "little"), digest_size=8, key=self.seed.to_bytes(8, "little")).digest()
+        self.rolls += 1
+        return int.from_bytes(digest, "little") % (units.ROLL + 1)
+
+    def current_team(self) -> str:
+        """Returns the name of the team whose turn it currently is."""
+        return self.TEAMS[self.team_turn]
+
+    def in_map(self, on: Index) -> bool:
+        """Checks if the given location is inside the map."""
+        return 0 <= on.x < self.xrn and 0 <= on.y < self.yrn
+
+    def unit_at(self, on: Index) -> units.Unit:
+        """Returns the unit on the given location, or None if there is none."""
+        return self.unitmap[on.x][on.y]
+
+    def terrain_at(self, on: Index) -> terrains.Terrain:
+        """Returns the terrain on the given location."""
+        return self.terrainmap[on.x][on.y]
+
+    def winner(self) -> str:
+        """Returns the name of the winning team, or None if the match is still going."""
+        return self.victor
+
+    def reachable(self, selected: Index) -> dict:
+        """Returns every location the selected unit can still move to with the cost and cheapest path of getting there.
+            Results are cached per unit and only recalculated if the unit has moved since or a unit appeared or vanished in the searched area."""
+        unit = self.unitmap[selected.x][selected.y]
+        if unit is None:
+            return {}
+        cached = self.reach_cache.get((selected.x, selected.y))
+        if cached is None or cached[0] is not unit or cached[1] != unit.moved:
+            reach, explored = pathing.reachable_tiles(self.unitmap, self.terrainmap, (selected.x, selected.y))
+            cached = self.reach_cache[(selected.x, selected.y)] = (unit, unit.moved, reach, explored)
+        return cached[2]
+
+    def invalidate_reach(self, on: Index) -> None:
+        """Drops every cached reachability result that looked at the given location, since a unit has appeared or vanished there."""
+        for position in [position for position, cached in self.reach_cache.items() if (on.x, on.y) in cached[3]]:
+            del self.reach_cache[position]
+
+    def place_unit(self, on: Index, unit: units.Unit) -> None:
+        """Puts the unit on the given location, keeping the unit map, the team rosters and the reachability cache in sync."""
+        self.unitmap[on.x][on.y] = unit
+        self.rosters[unit.team][(on.x, on.y)] = unit
+        self.toggle_unit(on)
+        self.invalidate_reach(on)
+
+    def remove_unit(self, on: Index) -> units.Unit:
+        """Takes the unit off the given location, keeping the unit map, the team rosters and the reachability cache in sync. Returns with the removed unit."""
+        self.toggle_unit(on)
+        unit = self.unitmap[on.x][on.y]
+        self.unitmap[on.x][on.y] = None
+        del self.rosters[unit.team][(on.x, on.y)]
+        self.invalidate_reach(on)
+        return unit
+
+    def can_move(self, selected: Index, on: Index) -> bool:
+        """Checks if the selected unit can take a single step onto the given location."""
+        if self.victor is not None or not self.in_map(on) or abs(on - selected) != 1:
+            return False
+        unit = self.unitmap[selected.x][selected.y]
+        is_team_turn = unit is not None and unit.team == self.current_team()
+        is_empty = self.unitmap[on.x][on.y] is None
+        return is_team_turn and is_empty and unit.enough_moves_left(self.terrainmap[on.x][on.y])
+
+    def apply_move(self, selected: Index, on: Index) -> bool:
+        """Makes the selected unit take a step onto the given location."""
+        if not self.can_move(selected, on):
+            return False
+        self.terrainmap[selected.x][selected.y].health = self.terrainmap[selected.x][selected.y].default_health
+        unit = self.remove_unit(selected)
+        unit.has_moved(self.terrainmap[on.x][on.y])
+        self.place_unit(on, unit)
+        return True
+
+    def apply_path(self, selected: Index, on: Index) -> bool:
+        """Moves the selected unit along the cheapest legal path to the given location, as a single action.
+            The path is taken from the reachable locations of the unit if they are cached, otherwise it is searched for."""
+        if self.victor is not None or not self.in_map(on) or self.unitmap[selected.x][selected.y] is None:
+            return False
+        unit = self.unitmap[selected.x][selected.y]
+        if unit.team != self.current_team():
+            return False
+        cached = self.reach_cache.get((selected.x, selected.y))
+        if cached is not None and cached[0] is unit and cached[1] == unit.moved:
+            path = cached[2][(on.x, on.y)][1] if (on.x, on.y) in cached[2] else None
+        else:
+            path = pathing.find_path(self.unitmap, self.terrainmap, (selected.x, selected.y), (on.x, on.y))
+        if path is None:
+            return False
+        self.terrainmap[selected.x][selected.y].health = self.terrainmap[selected.x][selected.y].default_health
+        self.remove_unit(selected)
+        for x, y in path:
+            unit.has_moved(self.terrainmap[x][y])
+        self.place_unit(on, unit)
+        return True
+
+    def can_target(self, selected: Index, on: Index) -> bool:
+        """Checks if the selected unit could act on the given location this turn, regardless of its attack range."""
+        if self.victor is not None or not self.in_map(on) or self.unitmap[selected.x][selected.y] is None:
+            return False
+        return self.unitmap[selected.x][selected.y].can_attack(self.current_team(), self.unitmap[on.x][on.y], self.terrainmap[on.x][on.y])
+
+    def can_attack(self, selected: Index, on: Index) -> bool:
+        """Checks if the selected unit can attack the unit on the given location."""
+        return self.can_target(selected, on) and self.unitmap[selected.x][selected.y].in_attack_range(abs(on - selected))
+
+    def attackable_targets(self, selected: Index) -> list:
+        """Returns the location of every enemy unit the selected unit can attack, only looking at the locations in its attack range."""
+        unit = self.unitmap[selected.x][selected.y]
+        if unit is None:
+            return []
+        targets = [Index(x, y) for x, y in pathing.in_range((selected.x, selected.y), unit.minrange, unit.maxrange, self.xrn, self.yrn)]
+        return [on for on in targets if self.unitmap[on.x][on.y] is not None and self.unitmap[on.x][on.y].team != unit.team and self.can_target(selected, on)]
+
+    def forecast_attack(self, selected: Index, on: Index) -> units.AttackForecast:
+        """Returns the exact outcome of the selected unit attacking the unit on the given location, or None if it can't attack it."""
+        if not self.can_attack(selected, on):
+            return None
+        attacker, defender = self.unitmap[selected.x][selected.y], self.unitmap[on.x][on.y]
+        counters = abs(on - selected) == 1 and defender.minrange == 1
+        return units.forecast(attacker, defender, self.terrainmap[selected.x][selected.y], self.terrainmap[on.x][on.y], counters)
+
+    def apply_attack(self, selected: Index, on: Index) -> bool:
+        """Handles attacks between two units. If the attacked unit lived and can counterattack, then the attacker takes damage as well.
+            Removes every unit that died in the fight."""
+        if not self.can_attack(selected, on):
+            return False
+        distance = abs(on - selected)
+        attacker, defender = self.unitmap[selected.x][selected.y], self.unitmap[on.x][on.y]
+        self.toggle_unit(selected)
+        self.toggle_unit(on)
+        defender.getting_attacked(attacker, self.terrainmap[on.x][on.y], self.roll())
+        if distance == 1 and defender.minrange == 1 and defender.health > 0:
+            attacker.getting_attacked(defender, self.terrainmap[selected.x][selected.y], self.roll())
+        attacker.has_attacked()
+        self.toggle_unit(selected)
+        self.toggle_unit(on)
+        if defender.health <= 0:
+            self.unit_died(on, selected)
+        elif attacker.health <= 0:
+            self.unit_died(selected, on)
+        return True
+
+    def can_capture(self, selected: Index) -> bool:
+        """Checks if the selected unit can capture the terrain it is standing on."""
+        unit = self.unitmap[selected.x][selected.y]
+        is_team_turn = unit is not None and unit.team == self.current_team()
+        return self.victor is None and is_team_turn and unit.can_capture(self.terrainmap[selected.x][selected.y])
+
+    def apply_capture(self, selected: Index) -> bool:
+        """Advances the capture of the terrain the selected unit is standing on, and hands the building over if the capture is finished."""
+        if not self.can_capture(selected):
+            return False
+        terrain, unit = self.terrainmap[selected.x][selected.y], self.unitmap[selected.x][selected.y]
+        previous_team = terrain.team
+        self.toggle_unit(selected)
+        unit.has_attacked()
+        self.toggle_unit(selected)
+        if terrain.getting_captured(unit):
+            if previous_team is not None:
+                self.team_buildings[self.TEAMS.index(previous_team)] -= 1
+            self.team_buildings[self.TEAMS.index(unit.team)] += 1
+            if terrain.is_a_hq():
+                self.victor = unit.team
+        return True
+
+    def can_produce(self, location: Index, unit_selection: int) -> bool:
+        """Checks if the current team can buy the selected unit on the given workshop."""
+        price = units.get_prices().get(unit_selection, 0)
+        is_workshop = self.terrainmap[location.x][location.y].is_team_workshop(self.current_team())
+        is_empty = self.unitmap[location.x][location.y] is None
+        return self.victor is None and is_workshop and is_empty and price != 0 and self.team_money[self.team_turn] >= price
+
+    def apply_production(self, location: Index, unit_selection: int) -> bool:
+        """Produces the selected unit for the current team on the given workshop."""
+        if not self.can_produce(location, unit_selection):
+            return False
+        self.team_money[self.team_turn] -= units.get_prices()[unit_selection]
+        self.place_unit(location, units.spawn_unit(self.current_team(), units.get_units()[unit_selection]))
+        return True
+
+    def actions(self) -> list:
+        """Returns every legal action of the current team. Actions are tuples starting with their kind:
+            ("move", from, to), ("attack", from, to), ("capture", at), ("produce", at, unit selection) and ("end",), with locations as (x, y) tuples."""
+        if self.victor is not None:
+            return []
+        actions = []
+        for (x, y), unit in self.rosters[self.current_team()].items():
+            actions += [("move", (x, y), position) for position in self.reachable(Index(x, y))]
+            actions += [("attack", (x, y), (on.x, on.y)) for on in self.attackable_targets(Index(x, y))]
+            if self.can_capture(Index(x, y)):
+                actions.append(("capture", (x, y)))
+        for x, y in self.workshops:
+            actions += [("produce", (x, y), selection) for selection in units.get_prices() if self.can_produce(Index(x, y), selection)]
+        actions.append(("end",))
+        return actions
+
+    def apply_action(self, action: tuple) -> bool:
+        """Carries out an action given in the same form as the ones of the actions function, or ("step", from, to) for a single step
+            and ("select", at) for a selection, which changes nothing but is worth keeping in a recording. Carried out actions are added to the log, if there is one."""
+        kind = action[0]
+        if kind == "move":
+            done = self.apply_path(Index(*action[1]), Index(*action[2]))
+        elif kind == "step":
+            done = self.apply_move(Index(*action[1]), Index(*action[2]))
+        elif kind == "attack":
+            done = self.apply_attack(Index(*action[1]), Index(*action[2]))
+        elif kind == "capture":
+            done = self.apply_capture(Index(*action[1]))
+        elif kind == "produce":
+            done = self.apply_production(Index(*action[1]), action[2])
+        elif kind == "select":
+            done = self.in_map(Index(*action[1]))
+        elif kind == "end" and self.victor is None:
+            self.end_turn()
+            done = True
+        else:
+            done = False
+        if done and self.log is not None:
+            self.log.append(action)
+        return done
+
+    def end_turn(self) -> None:
+        """Hands the turn over to the next team, starting a new day and paying out the funds when every team has played."""
+        if self.team_turn == len(self.TEAMS) - 1:
+            for i in range(len(self.TEAMS)):
+                self.team_money[i] += self.team_buildings[i] * self.INCOME
+            self.team_turn, self.turn_count = 0, self.turn_count + 1
+        else:
+            self.team_turn += 1
+        self.start_day(self.current_team())
+
+    def unit_died(self, killed: Index, killer: Index) -> None:
+        """Removes the killed unit and declares the killer's team the winner if it was the last unit of its team."""
+        team = self.remove_unit(killed).team
+        self.terrainmap[killed.x][killed.y].health = self.terrainmap[killed.x][killed.y].default_health
+        if self.last_unit_killed(team):
+            self.victor = self.unitmap[killer.x][killer.y].team
+
+    def last_unit_killed(self, team: str) -> bool:
+        """Checks to see if there are any other units remaining of the faction."""
+        return len(self.rosters[team]) == 0
+
+    def start_day(self, team: str) -> None:
+        """Does all actions for starting the given teams turn, by reseting actions and healing if valid. Only walks through the roster of the team."""
+        for (x, y), unit in self.rosters[team].items():
+            self.toggle_unit(Index(x, y))
+            unit.reset_actions()
+            if unit.team == self.terrainmap[x][y].team:
+                unit.heal_up()
+            self.toggle_unit(Index(x, y))
+
+def new_game(rawmap: list[list], xrn: int, yrn: int, seed: int = 0) -> GameState:
+    """Takes the raw map data and returns with a freshly set up match on it, rolling attacks from the given seed."""
+    team_buildings, terrainmap = terrains.construct(rawmap, xrn, yrn)
+    unitmap = units.construct(terrainmap, xrn, yrn)
+    return GameState(terrainmap, unitmap, team_buildings, xrn, yrn, seed)
+
+def load_game(compiled: object, seed: int = 0) -> GameState:
+    """Takes a compiled map and returns with a freshly set up match on it, rolling attacks from the given seed."""
+    team_buildings, terrainmap = terrains.from_compiled(compiled)
+    unitmap = units.construct(terrainmap, compiled.xrn, compiled.yrn)
+    return GameState(terrainmap, unitmap, team_buildings, compiled.xrn, compiled.yrn, seed)
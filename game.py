@@ -1,150 +1,255 @@
+import random
+import time
+
 import pygame as py
 import pygame.gfxdraw as pgfx
 
+import ai
+import display
+import engine
+import history
+import mapcache
+import replay
+import sprites
 import terrains
 import units
-
-class Index:
-    """Class for storing coordinate/location data of anything on the map and easily doing operations on them."""
-    def __init__(self, x: int, y: int):
-        self.x = x
-        self.y = y
-
-    def __eq__(self, other: object) -> bool:
-        """Default equals function override, checks if Indexes have the same location data."""
-        return self.x == other.x and self.y == other.y
-
-    def __sub__(self, other: object) -> object:
-        """Default subtract function override, takes the two indexes and subtracts the values of the smaller from the larger one, then returns the result in a new Index."""
-        return Index(max(self.x, other.x) - min(self.x, other.x), max(self.y, other.y) - min(self.y, other.y))
-
-    def __abs__(self):
-        """Default absolute function override, only adds up the values of the index, since the location data won't give negatives."""
-        return self.x + self.y
+from engine import Index
 
 class Start:
     """Class that takes the width and height of the game map, then prepares and starts the game."""
     BLOCK = 32                      #WIDTH AND HEIGHT OF A BLOCK IN PIXELS
-    TEAMS = ["Red", "Blue"]         #List for storin all playable teams.
-    team_buildings = []             #List for storing the number of buildings a team has.
-    team_money = [0] * len(TEAMS)   #List for storing the amount of money each team has.
+    TOOLBAR = 6                     #Width of the toolbar in blocks.
+    VIEW = (40, 24)                 #Largest number of blocks shown of the map, if the size of the screen can't be known.
+    MARGIN = 4                      #Blocks rendered around the shown part of the map, so short scrolls don't need any terrain drawn.
+    EDGE = 16                       #Distance from the edge of the shown map in pixels, where resting the mouse scrolls the map.
+    KEY_SCROLL = 4                  #Blocks the map scrolls by with one key press.
+    SCROLL_KEYS = {py.K_UP: (0, -1), py.K_w: (0, -1), py.K_RIGHT: (1, 0), py.K_d: (1, 0), py.K_DOWN: (0, 1), py.K_s: (0, 1), py.K_LEFT: (-1, 0), py.K_a: (-1, 0)}    #Direction of scrolling for each key.
+    SCROLL_DELAY = 60               #Milliseconds between two scrolls while the mouse rests on an edge.
+    SEEK_KEYS = {py.K_LEFT: -1, py.K_RIGHT: 1}     #Turns a replay jumps by for each key.
+    SCROLL = py.USEREVENT           #Event posted repeatedly while the mouse rests on an edge.
+    ACTION = py.USEREVENT + 1       #Event posted by the thinking computer with the action it chose.
+    PROGRESS = py.USEREVENT + 2     #Event posted repeatedly while the computer is thinking, to update the thinking indicator.
+    PROGRESS_DELAY = 100            #Milliseconds between two updates of the thinking indicator.
+    STEP_DELAY = 60                 #Milliseconds a unit of the computer takes for a step of its path.
+    FLASH_DELAY = 150               #Milliseconds a unit attacked by the computer is highlighted for.
+    REPLAY_DELAY = 250              #Milliseconds between two actions of a replay.
+    TEAMS = engine.GameState.TEAMS  #List for storin all playable teams.
     #Colors of playing field elements:
     default_color = py.Color("#ffff80")
     toolbar_bgcolor = py.Color("DimGray")
     toolbar_fgcolor = py.Color("#ffff80")
     color_red = py.Color("#d32f2f")
     color_blue = py.Color("#0d48a1")
-    #Essential data types for storing lots of similar data:
-    toolbar = []
-    workshop = []
-    unit_types = []
-    unit_prices = {}
-    terrainmap = []
-    unitmap = []
-    victor = ""
-
-    def __init__(self, xrn: int, yrn: int):
+    target_color = py.Color(211, 47, 47, 110)
+
+    def __init__(self, xrn: int, yrn: int, view: tuple = None, computers: tuple = (), budget: float = 3, workers: int = 1, seed: int = None, report: bool = False):
         self.xrn = xrn
         self.yrn = yrn
-
-    def play(self, rawmap: list[list], mapname: str, *playernames) -> None:
+        self.view = None if view is None else Index(min(view[0], xrn), min(view[1], yrn))   #Number of blocks shown of the map.
+        self.camera = Index(0, 0)   #Location of the top left block shown of the map.
+        self.origin = Index(0, 0)   #Location of the top left block rendered on the background.
+        self.edge = (0, 0)          #Direction the map is scrolled in while the mouse rests on an edge.
+        self.state = None
+        #Essential data types for storing lots of similar data, set up with the window:
+        self.toolbar = []
+        self.workshop = []
+        self.unit_types = []
+        self.unit_prices = {}
+        self.background = None      #Surface with the terrain around the shown part of the map pre-rendered on it, units are drawn over it.
+        self.dirty = []             #Areas of the window that have changed since it was last updated.
+        self.panels = {}            #Content last drawn on each toolbar panel, so unchanged panels aren't redrawn.
+        self.text = None            #Fonts and rendered texts of the current session.
+        self.hover = None           #Location of the map the mouse is over, or None if it is over the toolbar.
+        self.targets = set()        #Locations highlighted as attackable by the selected unit.
+        self.previews = {}          #Last worked out attack preview of every target of the selected unit, with the displayed values of both units and terrains it was worked out for.
+        self.previewed = None       #Location of the selected unit the previews were worked out for, they are dropped when another unit is selected.
+        self.pool = ai.WorkerPool(workers - 1) if workers > 1 and computers else None     #Worker processes shared by the computer players of the match.
+        self.computers = {team: ai.Computer(team, budget, pool=self.pool) for team in computers}  #Computer player of every team that isn't played by a person, thinking for the given seconds every turn on the worker processes too.
+        self.thinking = None        #Turn of the computer being thought out on a background thread.
+        self.seed = random.getrandbits(64) if seed is None else seed     #Seed of the rolls of the match.
+        self.replay = None          #Recording of the match, saved when the game is closed.
+        self.speed = 1              #Multiplier of the speed of animations.
+        self.started = None         #Time the match started at, for its duration in the history.
+        self.report = report        #Whether the hits and misses of the text cache are printed when the game is closed.
+
+    def play(self, rawmap: object, mapname: str, *playernames) -> None:
         """Most important function of the program. 
-        Takes the raw map data, the map's name and the names of players, processes all the information and then starts the main gamplay loop."""
+        Takes the raw or compiled map data, the map's name and the names of players, processes all the information and then starts the main gamplay loop.
+        Every rule is handled by the display-free game state, this loop only translates the inputs and draws the results."""
         py.init()
-        team_turn, turn_count = 0, 1
+        self.text = display.TextCache()
         window = self.window_setup(rawmap, mapname, playernames)
-        spawner_selected, has_won, quit = False, False, False
+        self.replay = replay.from_game(self.state, mapname, playernames)
+        self.started = time.monotonic()
+        spawner_selected, quit = False, False
         spawner_position, on, selected = None, None, None
         #MAIN GAMEPLAY LOOP
         while not quit:
+            if self.thinking is None and self.state.current_team() in self.computers and self.state.winner() is None:
+                on, selected, spawner_selected = None, None, False
+                self.thinking_start(window)
             event = py.event.wait()
-            if event.type == py.MOUSEBUTTONDOWN:
+            has_won = self.state.winner() is not None
+            if event.type == py.MOUSEMOTION:
+                self.edge_scrolling(event.pos)
+                self.hover = self.window_location(event.pos) if event.pos[0] < self.view.x * self.BLOCK else None
+            elif event.type == py.WINDOWLEAVE:
+                self.edge_scrolling(None)
+                self.hover = None
+            elif event.type == self.SCROLL:
+                self.scroll(window, *self.edge)
+            elif event.type == self.ACTION and self.thinking is not None and event.turn == ai.turns_played(self.state):
+                self.computer_action(window, event.action)
+            elif event.type == self.PROGRESS and self.thinking is not None and self.thinking.overdue():
+                self.thinking_stop()
+                self.state.apply_action(("end",))
+            if event.type == py.MOUSEBUTTONDOWN and self.thinking is not None and event.button == 1 and self.exit_clicked(event.pos):
+                #QUIT GAME WHILE THE COMPUTER IS THINKING
+                quit = True
+            if event.type == py.MOUSEBUTTONDOWN and self.thinking is None:
                 x, y = event.pos
-                on = Index(x // self.BLOCK, y // self.BLOCK)
+                on = self.window_location(event.pos)
                 on_in_map = on.x < self.xrn
                 spawner_selected = False if on_in_map else spawner_selected
                 if has_won:
-                    selected, quit = self.win_view(on_in_map, on, mapname, playernames, turn_count)
+                    selected, quit = self.win_view(on_in_map, on, mapname, playernames)
                 elif event.button == 1:
                     if on_in_map:
                         if selected is not None and selected == on:
                             #SELECTED CLICKED
                             selected = None
-                        elif self.unitmap[on.x][on.y] is not None:
+                        elif self.state.unit_at(on) is not None:
                             #UNIT SELECTED
                             selected = Index(on.x, on.y)
-                        elif selected is not None and self.unitmap[on.x][on.y] is None:
+                            self.state.apply_action(("select", (on.x, on.y)))
+                        elif selected is not None and self.state.unit_at(on) is None:
                             #SELECTED MOVEMENT
-                            if self.move_on_terrain(on, selected, team_turn):
-                                on, selected = self.unit_step_on(window, on, selected)
-                            else:
-                                selected = None
-                        elif self.unitmap[on.x][on.y] is None and self.terrainmap[on.x][on.y].is_team_workshop(self.TEAMS[team_turn]):
+                            on, selected = self.unit_move_to(window, on, selected)
+                        elif self.state.terrain_at(on).is_team_workshop(self.state.current_team()):
                             #WORKSHOP SELECTED
                             spawner_selected = True
                             spawner_position, selected = Index(on.x, on.y), None
+                            self.state.apply_action(("select", (on.x, on.y)))
                             self.workshopselected_draw(window)
                     elif not on_in_map and self.toolbar[on.x-self.xrn][on.y] == 1:
                         #END TURN
                         on, selected, spawner_selected = None, None, False
-                        team_turn, turn_count = self.end_turn(team_turn, turn_count)
+                        self.state.apply_action(("end",))
                     elif not on_in_map and self.toolbar[on.x-self.xrn][on.y] == 2:
                         #QUIT GAME
                         quit = True
                     elif not on_in_map and spawner_selected:
                         #UNIT PRODUCTION
-                        on, selected, spawner_selected = self.workshop_production(window, team_turn, spawner_position, Index(x // self.BLOCK - self.xrn, y // (self.BLOCK // 2)))
+                        on, selected, spawner_selected = self.workshop_production(window, spawner_position, Index(x // self.BLOCK - self.view.x, y // (self.BLOCK // 2)))
                     else:
                         selected = None
                 elif event.button == 3 and selected is not None:
-                    if on_in_map and self.unitmap[selected.x][selected.y].can_attack(self.TEAMS[team_turn], self.unitmap[on.x][on.y], self.terrainmap[on.x][on.y]):
-                        distance = abs(on - selected)
-                        if self.unitmap[selected.x][selected.y].in_attack_range(distance):
-                            #SELECTED ATTACKING
-                            self.unit_attacking_on(on, selected, distance)
-                            selected, has_won = self.check_casualties(window, on, selected)
-                        elif distance == 0 and self.unitmap[selected.x][selected.y].can_capture(self.terrainmap[on.x][on.y]):
-                            #SELECTED CAPTURING
-                            has_won = self.unit_capturing_on(window, on, selected)
-                    else:
+                    if on_in_map and self.state.can_attack(selected, on):
+                        #SELECTED ATTACKING
+                        selected = self.unit_attacking_on(window, on, selected)
+                    elif on_in_map and selected == on and self.state.can_capture(selected):
+                        #SELECTED CAPTURING
+                        self.unit_capturing_on(window, selected)
+                    elif not on_in_map or not self.state.can_target(selected, on):
                         selected = None
             if event.type == py.KEYDOWN and not has_won:
-                #ACTIONS WITH KEYBOARD: QUIT, END TURN, SELECTED CAPTURING, MOVE SELECTED
+                #ACTIONS WITH KEYBOARD: QUIT, END TURN, SCROLLING, SELECTED CAPTURING, MOVE SELECTED
+                scrolling = selected is None or event.mod & py.KMOD_SHIFT
                 if event.key == py.K_ESCAPE:
                     quit = True
-                elif event.key == py.K_RETURN:
+                elif event.key == py.K_RETURN and self.thinking is None:
                     on, selected, spawner_selected = None, None, False
-                    team_turn, turn_count = self.end_turn(team_turn, turn_count)
-                elif selected is not None and event.key == py.K_SPACE and self.unitmap[selected.x][selected.y].can_capture(self.terrainmap[selected.x][selected.y]):
-                    has_won = self.unit_capturing_on(window, selected, selected)
-                elif selected is not None and (event.key == py.K_UP or event.key == py.K_w) and selected.y - 1 >= 0 and self.keyboard_movement(selected, team_turn, ymod=-1):
-                    on, selected = self.unit_step_on(window, None, selected, ymod=-1)
-                elif selected is not None and (event.key == py.K_RIGHT or event.key == py.K_d) and selected.x + 1 < self.xrn and self.keyboard_movement(selected, team_turn, xmod=1):
-                    on, selected = self.unit_step_on(window, None, selected, xmod=1)
-                elif selected is not None and (event.key == py.K_DOWN or event.key == py.K_s) and selected.y + 1 < self.yrn and self.keyboard_movement(selected, team_turn, ymod=1):
-                    on, selected = self.unit_step_on(window, None, selected, ymod=1)
-                elif selected is not None and (event.key == py.K_LEFT or event.key == py.K_a) and selected.x - 1 >= 0 and self.keyboard_movement(selected, team_turn, xmod=-1):
-                    on, selected = self.unit_step_on(window, None, selected, xmod=-1)
-            self.update_toolbar(window, team_turn, turn_count, selected, on, spawner_selected)
+                    self.state.apply_action(("end",))
+                elif scrolling and event.key in self.SCROLL_KEYS:
+                    self.scroll(window, *(self.KEY_SCROLL * direction for direction in self.SCROLL_KEYS[event.key]))
+                elif selected is not None and event.key == py.K_SPACE and self.state.can_capture(selected):
+                    self.unit_capturing_on(window, selected)
+                elif selected is not None and (event.key == py.K_UP or event.key == py.K_w) and self.state.can_move(selected, Index(selected.x, selected.y - 1)):
+                    on, selected = self.unit_step_on(window, Index(selected.x, selected.y - 1), selected)
+                    self.follow(window, on)
+                elif selected is not None and (event.key == py.K_RIGHT or event.key == py.K_d) and self.state.can_move(selected, Index(selected.x + 1, selected.y)):
+                    on, selected = self.unit_step_on(window, Index(selected.x + 1, selected.y), selected)
+                    self.follow(window, on)
+                elif selected is not None and (event.key == py.K_DOWN or event.key == py.K_s) and self.state.can_move(selected, Index(selected.x, selected.y + 1)):
+                    on, selected = self.unit_step_on(window, Index(selected.x, selected.y + 1), selected)
+                    self.follow(window, on)
+                elif selected is not None and (event.key == py.K_LEFT or event.key == py.K_a) and self.state.can_move(selected, Index(selected.x - 1, selected.y)):
+                    on, selected = self.unit_step_on(window, Index(selected.x - 1, selected.y), selected)
+                    self.follow(window, on)
+            self.targets_draw(window, selected)
+            self.update_toolbar(window, selected, on, spawner_selected)
             if event.type == py.QUIT:
-                if has_won:
-                    self.write_statistics("matchhistory.txt", playernames, turn_count, mapname)
+                if self.state.winner() is not None:
+                    self.write_statistics(playernames, self.state.turn_count, mapname)
                 quit = True
+        if self.thinking is not None:
+            self.thinking_stop()
+        if self.pool is not None:
+            self.pool.close()
+        self.replay_save()
+        if self.report:
+            print(self.text.stats())
         py.quit()
 
+    def watch(self, recording: replay.Replay, speed: float = 1) -> None:
+        """Plays a recorded match back on the window, animating every action the same way as the actions of the computer.
+            The speed multiplies the pace of the playback. Left and right jump a turn back or forward, Home and End to the start or the end of the match,
+            Space pauses the playback, closing the window or pressing Escape stops it."""
+        py.init()
+        self.text = display.TextCache()
+        self.seed, self.speed = recording.seed, speed
+        window = self.window_setup(recording.compiled, recording.mapname, recording.players)
+        turn, position, paused, last = 0, 0, False, recording.turns()
+        while True:
+            events = py.event.get() if not paused and position < len(recording.actions) else [py.event.wait()]
+            target = turn
+            for event in events:
+                if event.type == py.QUIT or (event.type == py.KEYDOWN and event.key == py.K_ESCAPE):
+                    py.quit()
+                    return
+                elif event.type == py.KEYDOWN and event.key == py.K_SPACE:
+                    paused = not paused
+                elif event.type == py.KEYDOWN and event.key in self.SEEK_KEYS:
+                    target = max(0, min(last, target + self.SEEK_KEYS[event.key]))
+                elif event.type == py.KEYDOWN and (event.key == py.K_HOME or event.key == py.K_END):
+                    target = 0 if event.key == py.K_HOME else last
+            if target != turn:
+                turn = target
+                self.state, position = recording.seek(turn, self.state)
+                self.map_drawadd(window)
+                self.panels = {}
+            elif not paused and position < len(recording.actions):
+                action = recording.actions[position]
+                self.action_animate(window, action)
+                position, turn = position + 1, turn + (action[0] == "end")
+                py.time.wait(round(self.REPLAY_DELAY / self.speed))
+            if position >= len(recording.actions) and self.state.winner() is not None:
+                self.winner_draw(window)
+            self.update_toolbar(window, None, None, False)
+
+    def replay_save(self) -> None:
+        """Saves the recording of the match into the replays folder, if anything happened in it."""
+        if self.replay is None or not self.replay.actions:
+            return
+        self.replay.winner = self.state.winner()
+        try:
+            replay.save(self.replay, replay.replay_path(self.replay.mapname))
+        except OSError:
+            pass
+
     def toolbar_setup(self, xtlb: int) -> list[list]:
         """Prepares the toolbar interface location for use."""
-        toolbar = [[0 for i in range(self.yrn)] for j in range(xtlb)]
+        toolbar = [[0 for i in range(self.view.y)] for j in range(xtlb)]
         for x in range(1, xtlb-1):
-            for y in range(self.yrn - 4, self.yrn - 2):
+            for y in range(self.view.y - 4, self.view.y - 2):
                 toolbar[x][y] = 1
-            for y in range(self.yrn - 1, self.yrn):
+            for y in range(self.view.y - 1, self.view.y):
                 toolbar[x][y] = 2
         return toolbar
 
     def workshop_setup(self, xtlb: int) -> list[list]:
         """Prepares the workshop interface location for use."""
-        workshop = [[None for i in range(self.yrn * 2)] for j in range(xtlb)]
+        workshop = [[None for i in range(self.view.y * 2)] for j in range(xtlb)]
         counter = 0
         for y in range(4, 12):
             for x in range(0, xtlb // 2):
@@ -155,53 +260,75 @@ class Start:
             counter += 1
         return workshop
 
-    def window_setup(self, rawmap: list[list], mapname: str, playernames: list) -> object:
-        """Sets up the complete window of the game and prepares its grid locations for use."""
-        self.toolbar, self.workshop = self.toolbar_setup(6), self.workshop_setup(6)
+    def window_setup(self, rawmap: object, mapname: str, playernames: list) -> object:
+        """Sets up the complete window of the game and prepares its grid locations for use.
+            Only as much of the map is shown as fits on the screen next to the toolbar, the rest can be scrolled to."""
+        if self.view is None:
+            self.view = self.view_fitting()
+        self.toolbar, self.workshop = self.toolbar_setup(self.TOOLBAR), self.workshop_setup(self.TOOLBAR)
         self.unit_types, self.unit_prices = units.get_units(), units.get_prices()
-        window = py.display.set_mode((self.xrn * self.BLOCK + len(self.toolbar) * self.BLOCK, self.yrn * self.BLOCK))
+        window = py.display.set_mode(((self.view.x + len(self.toolbar)) * self.BLOCK, self.view.y * self.BLOCK))
         py.display.set_caption("{} - {}".format(mapname, " versus ".join(playernames)))
+        sprites.prepare()
         window.fill(self.default_color)
-        self.map_drawadd(window, rawmap)
+        self.state = engine.load_game(rawmap, self.seed) if isinstance(rawmap, mapcache.CompiledMap) else engine.new_game(rawmap, self.xrn, self.yrn, self.seed)
+        first = next(iter(self.state.rosters[self.state.current_team()]), None)
+        if first is not None:
+            self.camera = self.camera_clamped(Index(first[0] - self.view.x // 2, first[1] - self.view.y // 2))
+        self.map_drawadd(window)
         return window
 
+    def view_fitting(self) -> Index:
+        """Returns with the number of blocks of the map that fit on the screen next to the toolbar, but at least as many as the toolbar needs."""
+        info = py.display.Info()
+        width, height = self.VIEW
+        if info.current_w > 0 and info.current_h > 0:
+            width, height = info.current_w // self.BLOCK - self.TOOLBAR - 1, info.current_h // self.BLOCK - 2
+        return Index(min(self.xrn, max(width, 10)), min(self.yrn, max(height, 10)))
+
     def currentteam_draw(self, window: object, team: str) -> None:
         """Changes the toolbar's grid to display the team that is currently active."""
-        xon = self.xrn * self.BLOCK
+        xon = self.view.x * self.BLOCK
         yon = 0
-        font = py.font.SysFont("Arial Bold", 32)
-        pgfx.box(window, py.Rect(xon, yon, 3 * self.BLOCK, self.BLOCK), self.toolbar_bgcolor)
+        font = self.text.font("Arial Bold", 32)
+        rect = py.Rect(xon, yon, 3 * self.BLOCK, self.BLOCK)
+        pgfx.box(window, rect, self.toolbar_bgcolor)
+        self.dirty.append(rect)
         text = font.render('{}'.format(team), True,  self.color_red if team == "Red" else self.color_blue)
         window.blit(text, (xon + 2, yon + 4))
 
     def currentturn_draw(self, window: object, turns: int) -> None:
         """Changes turn related data on the toolbar's grid."""
-        xon = self.xrn * self.BLOCK + 3 * self.BLOCK
+        xon = self.view.x * self.BLOCK + 3 * self.BLOCK
         yon = 0
-        font = py.font.SysFont("Arial Bold", 32)
-        pgfx.box(window, py.Rect(xon, yon, 3 * self.BLOCK, self.BLOCK), self.toolbar_bgcolor)
+        font = self.text.font("Arial Bold", 32)
+        rect = py.Rect(xon, yon, 3 * self.BLOCK, self.BLOCK)
+        pgfx.box(window, rect, self.toolbar_bgcolor)
+        self.dirty.append(rect)
         text = font.render('{}. day'.format(turns), True, self.toolbar_fgcolor)
         window.blit(text, (xon + 2, yon + 4))
 
     def currentmoney_draw(self, window: object, team: str) -> None:
         """Changes the money display on the toolbar, to show the funds of the currently active team."""
-        xon = self.xrn * self.BLOCK
+        xon = self.view.x * self.BLOCK
         yon = self.BLOCK
-        font = py.font.SysFont("Arial Bold", 22)
-        pgfx.box(window, py.Rect(xon, yon, 6 * self.BLOCK, self.BLOCK), self.toolbar_bgcolor)
-        buildings = font.render('Buildings: {}'.format(self.team_buildings[team]), True, self.toolbar_fgcolor)
-        money = font.render('Funds: {}'.format(self.team_money[team]), True, self.toolbar_fgcolor)
+        font = self.text.font("Arial Bold", 22)
+        rect = py.Rect(xon, yon, 6 * self.BLOCK, self.BLOCK)
+        pgfx.box(window, rect, self.toolbar_bgcolor)
+        self.dirty.append(rect)
+        buildings = font.render('Buildings: {}'.format(self.state.team_buildings[team]), True, self.toolbar_fgcolor)
+        money = font.render('Funds: {}'.format(self.state.team_money[team]), True, self.toolbar_fgcolor)
         window.blit(buildings, (xon + 4, yon + 8))
         window.blit(money, (xon + 4 + (3 * self.BLOCK), yon + 8))
 
     def terraininfo_draw(self, window: object, terrain: terrains.Terrain) -> None:
         """Displays all information of the given terrain."""
-        xon = self.xrn * self.BLOCK
+        xon = self.view.x * self.BLOCK
         yon = 2 * self.BLOCK
-        font = py.font.SysFont("Arial Bold", 22)
+        font = self.text.font("Arial Bold", 22)
         teamcolor = self.color_red if terrain.team == "Red" else self.color_blue
         terrain_title = font.render("{}{}".format("" if terrain.team is None else terrain.team + " ", terrain.type), True, self.toolbar_fgcolor if terrain.team is None else teamcolor)
-        font = py.font.SysFont("Arial Bold", 16)
+        font = self.text.font("Arial Bold", 16)
         capture_info = "Capture: {}%".format(terrain.remaining_health()) if terrain.capturable else ""
         terrain_info1 = font.render("Defense: {}    {}".format(terrain.defense, capture_info), True, self.toolbar_fgcolor)
         valid_transports = ""
@@ -217,9 +344,9 @@ class Start:
 
     def unitinfo_draw(self, window: object, unit: units.Unit) -> None:
         """Displays all information of the given unit."""
-        xon = self.xrn * self.BLOCK
+        xon = self.view.x * self.BLOCK
         yon = 4 * self.BLOCK
-        font = py.font.SysFont("Arial Bold", 16)
+        font = self.text.font("Arial Bold", 16)
         unit_title = font.render("{} unit:  {}%".format(unit.type, round(unit.health, 2)), True, self.color_red if unit.team == "Red" else self.color_blue)
         attack_range = "{}".format(unit.maxrange) if unit.minrange == 1 else "{}-{}".format(unit.minrange, unit.maxrange)
         unit_info1 = font.render("Can attack?  {}    Range:  {}".format("Yes" if not unit.attacked else "No", attack_range), True, self.toolbar_fgcolor)
@@ -233,51 +360,210 @@ class Start:
 
     def endturn_draw(self, window: object, message: str, fgcolor: py.Color) -> None:
         """Displays the end turn button, based on given parameters."""
-        xon = self.xrn * self.BLOCK + self.BLOCK
-        yon = self.yrn * self.BLOCK - 4 * self.BLOCK
-        font = py.font.SysFont("Arial Bold", 40)
-        pgfx.box(window, py.Rect(xon, yon, 4 * self.BLOCK, 2 * self.BLOCK), self.toolbar_bgcolor)
+        xon = self.view.x * self.BLOCK + self.BLOCK
+        yon = self.view.y * self.BLOCK - 4 * self.BLOCK
+        font = self.text.font("Arial Bold", 40)
+        rect = py.Rect(xon, yon, 4 * self.BLOCK, 2 * self.BLOCK)
+        pgfx.box(window, rect, self.toolbar_bgcolor)
+        self.dirty.append(rect)
         text = font.render(message, True, fgcolor)
         window.blit(text, (xon + 2, yon + 20))
 
     def exit_draw(self, window: object, message: str, fgcolor: py.Color) -> None:
         """Displays the exit button, based on given parameters."""
-        xon = self.xrn * self.BLOCK + self.BLOCK
-        yon = self.yrn * self.BLOCK - self.BLOCK
-        font = py.font.SysFont("Arial Bold", 36)
-        pgfx.box(window, py.Rect(xon, yon, 4 * self.BLOCK, self.BLOCK), self.toolbar_bgcolor)
+        xon = self.view.x * self.BLOCK + self.BLOCK
+        yon = self.view.y * self.BLOCK - self.BLOCK
+        font = self.text.font("Arial Bold", 36)
+        rect = py.Rect(xon, yon, 4 * self.BLOCK, self.BLOCK)
+        pgfx.box(window, rect, self.toolbar_bgcolor)
+        self.dirty.append(rect)
         text = font.render(message, True, fgcolor)
         window.blit(text, (xon + 20, yon + 4))
 
-    def map_drawadd(self, window: object, rawmap: list[list]) -> None:
-        """Prepares every element of the display window and draws them according to the grid data."""
-        self.team_buildings, self.terrainmap = terrains.drawadd(window, self.BLOCK, rawmap, self.xrn, self.yrn)
-        self.unitmap = units.drawadd(window, self.BLOCK, self.terrainmap, self.xrn, self.yrn)
-        for team in self.TEAMS:
-            self.start_day(team)
+    def map_drawadd(self, window: object) -> None:
+        """Renders the terrain around the shown part of the map onto the background, then draws every element of the display window according to the grid data of the game state."""
+        self.background = py.Surface(((self.view.x + 2 * self.MARGIN) * self.BLOCK, (self.view.y + 2 * self.MARGIN) * self.BLOCK)).convert()
+        self.origin = Index(self.camera.x - self.MARGIN, self.camera.y - self.MARGIN)
+        self.background_draw(py.Rect(0, 0, self.view.x + 2 * self.MARGIN, self.view.y + 2 * self.MARGIN))
+        self.view_draw(window)
         self.endturn_draw(window, 'End Turn', self.toolbar_fgcolor)
         self.exit_draw(window, 'Exit', self.toolbar_fgcolor)
         py.display.update()
 
-    def update_toolbar(self, window: object, turn: int, turns: int, selected: Index, on: Index, spawner_selected: bool) -> None:
-        """Updates the toolbar based on currently active team, turn and selection data."""
-        self.currentteam_draw(window, self.TEAMS[turn])
-        self.currentturn_draw(window, turns)
-        self.currentmoney_draw(window, turn)
-        if not spawner_selected:
-            pgfx.box(window, py.Rect(self.xrn * self.BLOCK, 2 * self.BLOCK, 6 * self.BLOCK, 4 * self.BLOCK), self.toolbar_bgcolor)
-            if on is not None and on.x < self.xrn:
-                self.terraininfo_draw(window, self.terrainmap[on.x][on.y])
-            if selected is not None:
-                self.unitinfo_draw(window, self.unitmap[selected.x][selected.y])
-        py.display.update()
+    def update_toolbar(self, window: object, selected: Index, on: Index, spawner_selected: bool) -> None:
+        """Updates the toolbar based on currently active team, turn and selection data.
+            Only the panels whose content has changed are redrawn, then only the changed areas of the window are updated."""
+        team, turn = self.state.current_team(), self.state.team_turn
+        if self.panel_changed("team", team):
+            self.currentteam_draw(window, team)
+        if self.panel_changed("turn", self.state.turn_count):
+            self.currentturn_draw(window, self.state.turn_count)
+        if self.panel_changed("money", (turn, self.state.team_buildings[turn], self.state.team_money[turn])):
+            self.currentmoney_draw(window, turn)
+        terrain = self.state.terrain_at(on) if on is not None and on.x < self.xrn else None
+        unit = self.state.unit_at(selected) if selected is not None else None
+        preview = self.attack_preview(selected, self.hover) if not spawner_selected else None
+        if self.thinking is not None:
+            computer = self.thinking.computer
+            if self.panel_changed("info", ("thinking", round(computer.progress(), 2), computer.rollouts)):
+                self.thinking_draw(window, computer.progress(), computer.rollouts)
+        elif not spawner_selected and self.panel_changed("info", (self.terrain_key(terrain), self.unit_key(unit), preview)):
+            rect = py.Rect(self.view.x * self.BLOCK, 2 * self.BLOCK, 6 * self.BLOCK, 4 * self.BLOCK)
+            pgfx.box(window, rect, self.toolbar_bgcolor)
+            self.dirty.append(rect)
+            if preview is not None:
+                self.attackpreview_draw(window, preview)
+            elif terrain is not None:
+                self.terraininfo_draw(window, terrain)
+            if unit is not None:
+                self.unitinfo_draw(window, unit)
+        self.present()
+
+    def panel_changed(self, panel: str, content: object) -> bool:
+        """Checks if the content of the toolbar panel differs from what was last drawn on it, and remembers the new content."""
+        if self.panels.get(panel, None) == content:
+            return False
+        self.panels[panel] = content
+        return True
+
+    def terrain_key(self, terrain: terrains.Terrain) -> tuple:
+        """Returns with every displayed value of the terrain, for detecting changes on the toolbar."""
+        return None if terrain is None else (terrain.identifier, terrain.team, terrain.health)
+
+    def unit_key(self, unit: units.Unit) -> tuple:
+        """Returns with every displayed value of the unit, for detecting changes on the toolbar."""
+        return None if unit is None else (unit.type, unit.team, unit.health, unit.moved, unit.attacked)
+
+    def attack_preview(self, selected: Index, target: Index) -> units.AttackForecast:
+        """Returns the exact outcome of the selected unit attacking the target, or None if it can't attack it.
+            The outcome is only worked out again if either unit or terrain has changed since it was last worked out for the same pair.
+            Only the previews of the selected unit are kept, so they never outgrow the targets in its range."""
+        if selected is None or target is None or not self.state.in_map(target) or not self.state.can_attack(selected, target):
+            return None
+        if self.previewed != (selected.x, selected.y):
+            self.previews, self.previewed = {}, (selected.x, selected.y)
+        pair = (target.x, target.y)
+        key = (self.unit_key(self.state.unit_at(selected)), self.unit_key(self.state.unit_at(target)),
+                self.terrain_key(self.state.terrain_at(selected)), self.terrain_key(self.state.terrain_at(target)))
+        cached = self.previews.get(pair)
+        if cached is None or cached[0] != key:
+            cached = self.previews[pair] = (key, self.state.forecast_attack(selected, target))
+        return cached[1]
+
+    def attackpreview_draw(self, window: object, forecast: units.AttackForecast) -> None:
+        """Displays the expected outcome of an attack in place of the terrain information."""
+        xon = self.view.x * self.BLOCK
+        yon = 2 * self.BLOCK
+        font = self.text.font("Arial Bold", 22)
+        damage_title = font.render("Attack:  {}%  ({}-{}%)".format(round(forecast.expected_damage()), round(min(forecast.damage)), round(max(forecast.damage))), True, self.toolbar_fgcolor)
+        font = self.text.font("Arial Bold", 16)
+        kill_info = font.render("Kill chance:  {}%    Counter kill:  {}%".format(round(forecast.kill_chance * 100), round(forecast.counter_kill_chance * 100)), True, self.toolbar_fgcolor)
+        if max(forecast.counter) == 0:
+            counter = "Counter:  none"
+        else:
+            counter = "Counter:  {}%  ({}-{}%)".format(round(forecast.expected_counter()), round(min(forecast.counter)), round(max(forecast.counter)))
+        counter_info = font.render(counter, True, self.toolbar_fgcolor)
+        window.blit(damage_title, (xon + 4, yon + 12))
+        window.blit(kill_info, (xon + 4, yon + self.BLOCK + 4))
+        window.blit(counter_info, (xon + 2, yon + self.BLOCK + self.BLOCK // 2 + 4))
+
+    def present(self) -> None:
+        """Updates only the changed areas of the window on the display."""
+        if self.dirty:
+            py.display.update(self.dirty)
+            self.dirty = []
+
+    def thinking_start(self, window: object) -> None:
+        """Starts thinking out the turn of the current team's computer on a background thread, while the game keeps handling events.
+            Every chosen action is posted as an event, tagged with the turn it was chosen for."""
+        turn = ai.turns_played(self.state)
+        self.targets_draw(window, None)
+        self.thinking = ai.Thinking(self.computers[self.state.current_team()], self.state, lambda action: py.event.post(py.event.Event(self.ACTION, action=action, turn=turn)))
+        py.time.set_timer(self.PROGRESS, self.PROGRESS_DELAY)
+
+    def thinking_stop(self) -> None:
+        """Cancels the thinking of the computer and throws away the clicks and key presses made meanwhile, except for the ones exiting the game."""
+        self.thinking.cancel()
+        self.thinking = None
+        py.time.set_timer(self.PROGRESS, 0)
+        for event in py.event.get((py.MOUSEBUTTONDOWN, py.KEYDOWN)):
+            if (event.type == py.KEYDOWN and event.key == py.K_ESCAPE) or (event.type == py.MOUSEBUTTONDOWN and event.button == 1 and self.exit_clicked(event.pos)):
+                py.event.post(event)
+
+    def exit_clicked(self, position: tuple) -> bool:
+        """Checks if the given position of the window is on the exit button of the toolbar."""
+        on = self.window_location(position)
+        return on.x >= self.xrn and self.toolbar[on.x - self.xrn][on.y] == 2
+
+    def computer_action(self, window: object, action: tuple) -> None:
+        """Applies and animates the action the computer chose, then hands the match back to the computer, or finishes its thinking if its turn is over."""
+        self.action_animate(window, action)
+        self.thinking.applied(self.state.snapshot())
+        if self.state.winner() is not None or self.state.current_team() != self.thinking.computer.team:
+            self.thinking_stop()
+        if self.state.winner() is not None:
+            self.winner_draw(window)
+
+    def action_animate(self, window: object, action: tuple) -> None:
+        """Applies an action of the game state and shows it happening: moving units walk along their path and attacked units flash before the attack.
+            The map is scrolled to wherever the action happens, the animations are sped up by the speed multiplier."""
+        kind = action[0]
+        if kind == "move" or kind == "step":
+            start = Index(*action[1])
+            path = [action[2]] if kind == "step" else self.state.reachable(start).get(action[2], (0, []))[1]
+            self.state.apply_action(action)
+            unit, previous = self.state.unit_at(Index(*action[2])), start
+            for x, y in path:
+                self.follow(window, Index(x, y))
+                self.tile_draw(window, previous)
+                units.block_draw(unit, window, self.view_rect(Index(x, y)).topleft)
+                self.dirty.append(self.view_rect(Index(x, y)))
+                self.present()
+                py.time.wait(round(self.STEP_DELAY / self.speed))
+                previous = Index(x, y)
+            self.tile_draw(window, start)
+            self.tile_draw(window, Index(*action[2]))
+        elif kind == "attack":
+            self.follow(window, Index(*action[2]))
+            pgfx.box(window, self.view_rect(Index(*action[2])), self.target_color)
+            self.dirty.append(self.view_rect(Index(*action[2])))
+            self.present()
+            py.time.wait(round(self.FLASH_DELAY / self.speed))
+            self.state.apply_action(action)
+            self.tile_draw(window, Index(*action[1]))
+            self.tile_draw(window, Index(*action[2]))
+        elif kind == "capture" or kind == "produce":
+            self.follow(window, Index(*action[1]))
+            self.state.apply_action(action)
+            self.terrain_redraw(window, Index(*action[1]))
+        elif kind == "select":
+            self.follow(window, Index(*action[1]))
+            self.state.apply_action(action)
+        else:
+            self.state.apply_action(action)
+
+    def thinking_draw(self, window: object, progress: float, rollouts: int) -> None:
+        """Displays that the computer is thinking in place of the terrain and unit information, with a bar showing how much of its time it has used up."""
+        xon = self.view.x * self.BLOCK
+        yon = 2 * self.BLOCK
+        rect = py.Rect(xon, yon, 6 * self.BLOCK, 4 * self.BLOCK)
+        pgfx.box(window, rect, self.toolbar_bgcolor)
+        self.dirty.append(rect)
+        font = self.text.font("Arial Bold", 22)
+        window.blit(font.render("Thinking...", True, self.toolbar_fgcolor), (xon + 4, yon + 12))
+        pgfx.rectangle(window, py.Rect(xon + 4, yon + self.BLOCK + 8, 6 * self.BLOCK - 8, self.BLOCK // 2), self.toolbar_fgcolor)
+        pgfx.box(window, py.Rect(xon + 6, yon + self.BLOCK + 10, round((6 * self.BLOCK - 12) * progress), self.BLOCK // 2 - 4), self.toolbar_fgcolor)
+        font = self.text.font("Arial Bold", 16)
+        window.blit(font.render("Matches played out:  {}".format(rollouts), True, self.toolbar_fgcolor), (xon + 4, yon + 2 * self.BLOCK + 4))
 
     def workshopselected_draw(self, window: object) -> None:
         """Displays all units in the workshop grid space for buying."""
-        xon = self.xrn * self.BLOCK
+        xon = self.view.x * self.BLOCK
         yon = 2 * self.BLOCK
-        font = py.font.SysFont("Arial Bold", 16)
-        pgfx.box(window, py.Rect(xon, yon, 6 * self.BLOCK, 4 * self.BLOCK), self.toolbar_bgcolor)
+        font = self.text.font("Arial Bold", 16)
+        rect = py.Rect(xon, yon, 6 * self.BLOCK, 4 * self.BLOCK)
+        pgfx.box(window, rect, self.toolbar_bgcolor)
+        self.dirty.append(rect)
         counter = 0
         for i in range(0, len(self.unit_types), 2):
             textone = font.render("{}: {}".format(self.unit_types[i], self.unit_prices[i]), True, self.toolbar_fgcolor)
@@ -285,146 +571,180 @@ class Start:
             window.blit(textone, (xon + 2, yon + 2 + counter * (self.BLOCK // 2)))
             window.blit(texttwo, (xon + 2 + 3 * self.BLOCK, yon + 2 + counter * (self.BLOCK // 2)))
             counter += 1
+        self.panels["info"] = "workshop"
 
-    def winner_draw(self, window: object, winner: Index, teamcolor: str) -> None:
-        """Displays winner on window based on given data."""
-        self.victor = self.unitmap[winner.x][winner.y].team
+    def winner_draw(self, window: object) -> None:
+        """Displays the winner of the game state on the window."""
+        teamcolor = self.color_red if self.state.winner() == "Red" else self.color_blue
         self.endturn_draw(window, "Winner:", teamcolor)
-        self.exit_draw(window, "{}".format(self.victor), teamcolor)
+        self.exit_draw(window, "{}".format(self.state.winner()), teamcolor)
 
-    def win_view(self, in_map: bool, on: Index, mapname: str, playernames: tuple, turns: int) -> tuple:
+    def win_view(self, in_map: bool, on: Index, mapname: str, playernames: tuple) -> tuple:
         """Takes in all data regarding the winning side and handles all victory related possibilites that could occur.
             Returns with a tuple containing the Index of the last selection and if the player(s) quit while winning."""
         if not in_map and self.toolbar[on.x-self.xrn][on.y] != 0:
-            self.write_statistics("matchhistory.txt", playernames, turns, mapname)
+            self.write_statistics(playernames, self.state.turn_count, mapname)
             return None, True
-        elif in_map and self.unitmap[on.x][on.y] is not None:
+        elif in_map and self.state.unit_at(on) is not None:
             return Index(on.x, on.y), False
         return None, False
 
-    def write_statistics(self, location: str, playernames: tuple, turns: int, mapname: str) -> None:
-        """Takes all data regarding the match and writes it in a text file for storage."""
-        matchhistory = []
-        victor = playernames[0] if self.victor == "Red" else playernames[1]
-        loser = playernames[1] if self.victor == "Red" else playernames[0]
-        matchhistory.append("{} took {} turns to defeat {} on the {} map.".format(victor, turns, loser, mapname))
+    def write_statistics(self, playernames: tuple, turns: int, mapname: str) -> None:
+        """Takes all data regarding the finished match and adds it to the match history."""
+        store = history.History()
         try:
-            with open(location, "rt", encoding="utf-8") as fr:
-                matchhistory = [line.rstrip('\n') for line in fr]
-            while len(matchhistory) > 10:
-                matchhistory.pop()
-        except FileNotFoundError:
-            pass
-        with open(location, "wt", encoding="utf-8") as fw:
-            for line in matchhistory:
-                fw.write(line + '\n')
-
-    def end_turn(self, team: str, count: int) -> tuple:
-        """Handles all data for ending the turn. Returns with a tuple containing the appropriate turn datas."""
-        if team == len(self.TEAMS) - 1:
-            for i in range(len(self.TEAMS)):
-                self.team_money[i] += self.team_buildings[i] * 10
-            self.start_day(self.TEAMS[0])
-            return 0, count + 1
-        self.start_day(self.TEAMS[team + 1])
-        return team + 1, count
-
-    def unit_step_on(self, window: object, on: Index, selected: Index, xmod: int = 0, ymod: int = 0) -> tuple:
-        """Function that makes selected unit take a step towards the choosen direction and returns with a tuple containing the new two new Index objects."""
-        if on is None:
-            on = Index(selected.x + xmod, selected.y + ymod)
-        self.terrainmap[selected.x][selected.y].health = self.unit_movement(window, selected, on)
-        self.unitmap[on.x][on.y], self.unitmap[selected.x][selected.y] = self.unitmap[selected.x][selected.y], None
-        self.unitmap[on.x][on.y].has_moved(self.terrainmap[on.x][on.y])
-        return Index(on.x, on.y), Index(on.x, on.y)
-
-    def unit_attacking_on(self, on: Index, selected: Index, distance: int) -> None:
-        """Handles attacks between two untis, that are found witht the given Index objects. 
-            If the attacked unit lived and can counterattack, then the attacker takes damage as well"""
-        self.unitmap[on.x][on.y].getting_attacked(self.unitmap[selected.x][selected.y], self.terrainmap[on.x][on.y])
-        if distance == 1 and self.unitmap[on.x][on.y].minrange == 1 and self.unitmap[on.x][on.y].health > 0:
-            self.unitmap[selected.x][selected.y].getting_attacked(self.unitmap[on.x][on.y], self.terrainmap[selected.x][selected.y])
-        self.unitmap[selected.x][selected.y].has_attacked()
-
-    def unit_capturing_on(self, window: object, on: Index, selected: Index) -> bool:
-        """Function that handles property capture based on locations and returns a boolean with the result."""
-        team = self.terrainmap[selected.x][selected.y].team
-        self.unitmap[selected.x][selected.y].has_attacked()
-        if self.terrainmap[selected.x][selected.y].getting_captured(self.unitmap[selected.x][selected.y]):
-            return self.unit_finished_capture(window, on, team)
-        return False
-
-    def unit_finished_capture(self, window: object, on: Index, team: Index) -> bool:
-        """Function that checks to see if unit has finished capture of building. If an opposing HQ was captured returns True, otherwise False."""
-        team_id = 0 if self.unitmap[on.x][on.y].team == "Red" else 1
-        if team == 'Red':
-            self.team_buildings[0] -= 1
-        elif team == 'Blue':
-            self.team_buildings[1] -= 1
-        self.team_buildings[team_id] += 1
-        terrains.block_draw(self.terrainmap[on.x][on.y], window, (on.x * self.BLOCK, on.y * self.BLOCK))
-        units.block_draw(self.unitmap[on.x][on.y], window, (on.x * self.BLOCK, on.y * self.BLOCK))
-        if self.terrainmap[on.x][on.y].is_a_hq():
-            self.winner_draw(window, on, self.color_red if self.unitmap[on.x][on.y].team == "Red" else self.color_blue)
-            return True
-        return False
-
-    def move_on_terrain(self, on: Index, selected: Index, turn: int) -> bool:
-        """Checks if the selected unit can do a valid move on the mouse-selected terrain('s location)."""
-        is_team_turn = self.unitmap[selected.x][selected.y].team == self.TEAMS[turn]
-        return is_team_turn and abs(on - selected) == 1 and self.unitmap[selected.x][selected.y].enough_moves_left(self.terrainmap[on.x][on.y])
-
-    def keyboard_movement(self, selected: Index, turn: int, xmod: int = 0, ymod: int = 0) -> bool:
-        """Checks if selected unit can do a valid move on the given terrain('s location), based on keyboard movement."""
-        is_team_turn = self.unitmap[selected.x][selected.y].team == self.TEAMS[turn]
-        is_empty = self.unitmap[selected.x + xmod][selected.y + ymod] is None
-        return is_team_turn and self.unitmap[selected.x][selected.y].enough_moves_left(self.terrainmap[selected.x + xmod][selected.y + ymod]) and is_empty
-
-    def unit_movement(self, window: object, selected: Index, on: Index) -> int:
-        """Redraws the terrain and unit on the grid after movement and returns with the full health value of the terrain."""
-        terrains.block_draw(self.terrainmap[selected.x][selected.y], window, (selected.x * self.BLOCK, selected.y * self.BLOCK))
-        units.block_draw(self.unitmap[selected.x][selected.y], window, (on.x * self.BLOCK, on.y * self.BLOCK))
-        return self.terrainmap[selected.x][selected.y].default_health
-
-    def workshop_production(self, window: object, turn: int, location: Index, on: Index) -> tuple:
+            store.record(mapname, list(zip(self.TEAMS, playernames)), self.state.winner(), turns, time.monotonic() - self.started, self.replay.units_built())
+        finally:
+            store.close()
+
+    def window_location(self, position: tuple) -> Index:
+        """Translates a position on the window into a location. The shown map is translated through the camera onto the map,
+            while the toolbar is treated as if it stood right after the last column of the map."""
+        x, y = position[0] // self.BLOCK, position[1] // self.BLOCK
+        if x < self.view.x:
+            return Index(x + self.camera.x, y + self.camera.y)
+        return Index(x - self.view.x + self.xrn, y)
+
+    def is_shown(self, on: Index) -> bool:
+        """Checks if the given location of the map is currently shown on the window."""
+        return 0 <= on.x - self.camera.x < self.view.x and 0 <= on.y - self.camera.y < self.view.y
+
+    def camera_clamped(self, camera: Index) -> Index:
+        """Returns with the given camera location moved back inside the map, if the shown part of the map would reach outside of it."""
+        return Index(max(0, min(camera.x, self.xrn - self.view.x)), max(0, min(camera.y, self.yrn - self.view.y)))
+
+    def background_draw(self, area: py.Rect) -> None:
+        """Renders the terrain onto the given area of the background, which is measured in blocks from the top left block rendered on it."""
+        target = self.background.subsurface(py.Rect(area.x * self.BLOCK, area.y * self.BLOCK, area.width * self.BLOCK, area.height * self.BLOCK))
+        target.fill(self.default_color)
+        terrains.map_draw(target, self.BLOCK, self.state.terrainmap, (self.origin.x + area.x, self.origin.y + area.y, area.width, area.height))
+
+    def background_follow(self) -> None:
+        """Moves the rendered area of the background, if the shown part of the map is no longer inside of it.
+            What is still rendered is shifted in place, so only the newly uncovered rows and columns of terrains are drawn."""
+        width, height = self.view.x + 2 * self.MARGIN, self.view.y + 2 * self.MARGIN
+        xmod, ymod = self.camera.x - self.origin.x, self.camera.y - self.origin.y
+        if 0 <= xmod <= 2 * self.MARGIN and 0 <= ymod <= 2 * self.MARGIN:
+            return
+        xshift, yshift = xmod - self.MARGIN, ymod - self.MARGIN
+        self.origin = Index(self.camera.x - self.MARGIN, self.camera.y - self.MARGIN)
+        if abs(xshift) >= width or abs(yshift) >= height:
+            self.background_draw(py.Rect(0, 0, width, height))
+            return
+        self.background.scroll(-xshift * self.BLOCK, -yshift * self.BLOCK)
+        if xshift != 0:
+            self.background_draw(py.Rect(width - xshift if xshift > 0 else 0, 0, abs(xshift), height))
+        if yshift != 0:
+            self.background_draw(py.Rect(0, height - yshift if yshift > 0 else 0, width, abs(yshift)))
+
+    def view_draw(self, window: object) -> None:
+        """Draws the shown part of the map from the background and the units standing on it."""
+        rect = py.Rect(0, 0, self.view.x * self.BLOCK, self.view.y * self.BLOCK)
+        window.blit(self.background, rect, rect.move((self.camera.x - self.origin.x) * self.BLOCK, (self.camera.y - self.origin.y) * self.BLOCK))
+        units.map_draw(window.subsurface(rect), self.BLOCK, self.state.unitmap, (self.camera.x, self.camera.y, self.view.x, self.view.y))
+        for x, y in self.targets:
+            if self.is_shown(Index(x, y)):
+                pgfx.box(window, py.Rect((x - self.camera.x) * self.BLOCK, (y - self.camera.y) * self.BLOCK, self.BLOCK, self.BLOCK), self.target_color)
+        self.dirty.append(rect)
+
+    def scroll(self, window: object, xmod: int, ymod: int) -> None:
+        """Moves the camera by the given number of blocks, as far as the map allows it, then redraws the shown part of the map."""
+        camera = self.camera_clamped(Index(self.camera.x + xmod, self.camera.y + ymod))
+        if camera == self.camera:
+            return
+        self.camera = camera
+        self.background_follow()
+        self.view_draw(window)
+
+    def follow(self, window: object, on: Index) -> None:
+        """Scrolls the map just enough for the given location to be shown."""
+        xmod = min(0, on.x - self.camera.x) + max(0, on.x - self.camera.x - self.view.x + 1)
+        ymod = min(0, on.y - self.camera.y) + max(0, on.y - self.camera.y - self.view.y + 1)
+        self.scroll(window, xmod, ymod)
+
+    def edge_scrolling(self, position: tuple) -> None:
+        """Starts or stops scrolling the map, depending on which edge of the shown map the mouse rests on, if any.
+            While it is scrolling, a scroll event is posted again and again after a short delay."""
+        edge = (0, 0)
+        if position is not None and position[0] < self.view.x * self.BLOCK:
+            x, y = position
+            xmod = -1 if x < self.EDGE else 1 if x >= self.view.x * self.BLOCK - self.EDGE else 0
+            ymod = -1 if y < self.EDGE else 1 if y >= self.view.y * self.BLOCK - self.EDGE else 0
+            edge = (xmod if self.view.x < self.xrn else 0, ymod if self.view.y < self.yrn else 0)
+        if edge != self.edge:
+            self.edge = edge
+            py.time.set_timer(self.SCROLL, 0 if edge == (0, 0) else self.SCROLL_DELAY)
+
+    def view_rect(self, on: Index) -> py.Rect:
+        """Returns the area of the window the given location of the map is shown on."""
+        return py.Rect((on.x - self.camera.x) * self.BLOCK, (on.y - self.camera.y) * self.BLOCK, self.BLOCK, self.BLOCK)
+
+    def tile_draw(self, window: object, on: Index) -> None:
+        """Redraws the given location from the pre-rendered background and the unit standing on it, if there is one. Locations that aren't shown are skipped."""
+        if not self.is_shown(on):
+            return
+        rect = self.view_rect(on)
+        window.blit(self.background, rect, py.Rect((on.x - self.origin.x) * self.BLOCK, (on.y - self.origin.y) * self.BLOCK, self.BLOCK, self.BLOCK))
+        if self.state.unit_at(on) is not None:
+            units.block_draw(self.state.unit_at(on), window, rect.topleft)
+        if (on.x, on.y) in self.targets:
+            pgfx.box(window, rect, self.target_color)
+        self.dirty.append(rect)
+
+    def targets_draw(self, window: object, selected: Index) -> None:
+        """Highlights every unit the selected unit can attack, and redraws the locations that are no longer highlighted."""
+        targets = set() if selected is None else {(on.x, on.y) for on in self.state.attackable_targets(selected)}
+        if targets == self.targets:
+            return
+        changed = targets ^ self.targets
+        self.targets = targets
+        for x, y in changed:
+            self.tile_draw(window, Index(x, y))
+
+    def terrain_redraw(self, window: object, on: Index) -> None:
+        """Renders the changed terrain of the given location onto the background, if it is rendered there, then redraws the location."""
+        if 0 <= on.x - self.origin.x < self.view.x + 2 * self.MARGIN and 0 <= on.y - self.origin.y < self.view.y + 2 * self.MARGIN:
+            terrains.block_draw(self.state.terrain_at(on), self.background, ((on.x - self.origin.x) * self.BLOCK, (on.y - self.origin.y) * self.BLOCK))
+        self.tile_draw(window, on)
+
+    def unit_step_on(self, window: object, on: Index, selected: Index) -> tuple:
+        """Makes the selected unit take a step onto the given location and returns with a tuple containing the new two new Index objects.
+            If the step is not valid the selection is dropped."""
+        if self.state.apply_action(("step", (selected.x, selected.y), (on.x, on.y))):
+            self.tile_draw(window, selected)
+            self.tile_draw(window, on)
+            return Index(on.x, on.y), Index(on.x, on.y)
+        return on, None
+
+    def unit_move_to(self, window: object, on: Index, selected: Index) -> tuple:
+        """Moves the selected unit along its cheapest path to the given location in a single action, then only redraws the vacated and the new location.
+            Returns with a tuple containing the new two new Index objects, dropping the selection if the location can't be reached."""
+        if self.state.apply_action(("move", (selected.x, selected.y), (on.x, on.y))):
+            self.tile_draw(window, selected)
+            self.tile_draw(window, on)
+            return Index(on.x, on.y), Index(on.x, on.y)
+        return on, None
+
+    def unit_attacking_on(self, window: object, on: Index, selected: Index) -> Index:
+        """Handles the attack of the selected unit on the given location, redraws both places and returns with the remaining selection."""
+        self.state.apply_action(("attack", (selected.x, selected.y), (on.x, on.y)))
+        self.tile_draw(window, on)
+        self.tile_draw(window, selected)
+        if self.state.winner() is not None:
+            self.winner_draw(window)
+        return selected if self.state.unit_at(selected) is not None else None
+
+    def unit_capturing_on(self, window: object, selected: Index) -> None:
+        """Handles property capture with the selected unit and redraws the location."""
+        self.state.apply_action(("capture", (selected.x, selected.y)))
+        self.terrain_redraw(window, selected)
+        if self.state.winner() is not None:
+            self.winner_draw(window)
+
+    def workshop_production(self, window: object, location: Index, on: Index) -> tuple:
         """Produces the selected unit for the appropriate team, then returns with a tuple containing the location data. Does nothing if purchase was not valid."""
-        unit_selection = self.workshop[on.x][on.y]
-        if self.team_money[turn] >= self.unit_prices[unit_selection] and self.unit_prices[unit_selection] != 0:
-            self.team_money[turn] -= self.unit_prices[unit_selection]
-            self.unitmap[location.x][location.y] = units.spawn_unit(self.TEAMS[turn], self.unit_types[unit_selection])
-            units.block_draw(self.unitmap[location.x][location.y], window, (location.x * self.BLOCK, location.y * self.BLOCK))
+        unit_selection = self.workshop[on.x][on.y] if 0 <= on.x < len(self.workshop) and 0 <= on.y < len(self.workshop[0]) else None
+        if unit_selection is not None and self.state.apply_action(("produce", (location.x, location.y), unit_selection)):
+            self.tile_draw(window, location)
             return location, location, False
         return None, None, True
-
-    def check_casualties(self, window: object, on: Index, selected: Index) -> tuple:
-        """Checks to see if any new units have died, then returns the selection data."""
-        if self.unitmap[on.x][on.y].health <= 0:
-            return selected, self.unit_died(window, on, selected)
-        elif self.unitmap[selected.x][selected.y].health <= 0:
-            return None, self.unit_died(window, selected, on)
-        return selected, False
-
-    def unit_died(self, window: object, killed: Index, killer: Index) -> None:
-        """Checks for unit death circumstances and returns true if the killed unit was the last of its team (leading to a win condition)."""
-        terrains.block_draw(self.terrainmap[killed.x][killed.y], window, (killed.x * self.BLOCK, killed.y * self.BLOCK))
-        team = self.unitmap[killed.x][killed.y].team
-        self.terrainmap[killed.x][killed.y].health = self.terrainmap[killed.x][killed.y].default_health
-        self.unitmap[killed.x][killed.y] = None
-        if self.last_unit_killed(team):
-            self.winner_draw(window, killer, self.color_red if self.unitmap[killer.x][killer.y].team == "Red" else self.color_blue)
-            return True
-        return False
-
-    def last_unit_killed(self, team: str) -> bool:
-        """Checks to see if there are any other units remaining of the faction."""
-        #While not the most optimal solution, I'm really proud of managing to put this much functionality in a single line.
-        return all([all([unit.team != team for unit in line if unit is not None]) for line in self.unitmap])
-
-    def start_day(self, team: str) -> None:
-        """Function that does all actions for starting the given teams turn, by reseting actions and healing if valid."""
-        for x in range(len(self.unitmap)):
-            for y in range(len(self.unitmap[0])):
-                if self.unitmap[x][y] is not None and self.unitmap[x][y].team == team:
-                    self.unitmap[x][y].reset_actions()
-                    if team == self.unitmap[x][y].team and self.unitmap[x][y].team == self.terrainmap[x][y].team:
-                        self.unitmap[x][y].heal_up()
\ No newline at end of file
@@ -0,0 +1,93 @@
+import os
+import re
+import sqlite3
+import time
+
+LOCATION = "matchhistory.db"
+LEGACY_LOCATION = "matchhistory.txt"
+RETENTION = 1000            #Number of matches kept, the oldest ones are deleted past it. None keeps every match.
+SHOWN = 10                  #Number of recent matches shown in the history window.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS matches (
+    id INTEGER PRIMARY KEY,
+    finished REAL NOT NULL,
+    map TEXT NOT NULL,
+    turns INTEGER NOT NULL,
+    winner TEXT NOT NULL,
+    duration REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS players (
+    match INTEGER NOT NULL REFERENCES matches(id),
+    team TEXT NOT NULL,
+    name TEXT NOT NULL,
+    built INTEGER NOT NULL,
+    won INTEGER NOT NULL,
+    PRIMARY KEY (match, team)
+);
+CREATE INDEX IF NOT EXISTS players_name ON players(name);
+CREATE INDEX IF NOT EXISTS matches_map ON matches(map);
+"""
+
+class History:
+    """Class for the store of finished matches, an SQLite database with a row for every match and a row for every player of it.
+        Matches are only ever added, except for the oldest ones past the retention. Win rates are counted by the database."""
+    def __init__(self, location: str = LOCATION, retention: int = RETENTION):
+        self.location = location
+        self.retention = retention
+        new = not os.path.exists(location)
+        self.connection = sqlite3.connect(location)
+        with self.connection:
+            self.connection.executescript(SCHEMA)
+        if new and location == LOCATION and os.path.exists(LEGACY_LOCATION):
+            self.import_text(LEGACY_LOCATION)
+
+    def close(self) -> None:
+        """Closes the database."""
+        self.connection.close()
+
+    def record(self, mapname: str, players: list, winner: str, turns: int, duration: float, built: list, finished: float = None) -> int:
+        """Adds a finished match, with the (team, name) of every player, the team that won and the number of units every player built. Returns with the id of the match."""
+        with self.connection:
+            match = self.connection.execute("INSERT INTO matches (finished, map, turns, winner, duration) VALUES (?, ?, ?, ?, ?)",
+                    (time.time() if finished is None else finished, mapname, turns, winner, duration)).lastrowid
+            self.connection.executemany("INSERT INTO players (match, team, name, built, won) VALUES (?, ?, ?, ?, ?)",
+                    [(match, team, name, count, team == winner) for (team, name), count in zip(players, built)])
+            if self.retention is not None:
+                self.connection.execute("DELETE FROM players WHERE match <= ?", (match - self.retention,))
+                self.connection.execute("DELETE FROM matches WHERE id <= ?", (match - self.retention,))
+        return match
+
+    def recent(self, count: int = SHOWN) -> list:
+        """Returns with the (winner name, loser name, turns, map) of the given number of most recent matches, the newest first."""
+        return self.connection.execute("""
+            SELECT victor.name, loser.name, matches.turns, matches.map FROM matches
+            JOIN players AS victor ON victor.match = matches.id AND victor.won
+            JOIN players AS loser ON loser.match = matches.id AND NOT loser.won
+            ORDER BY matches.id DESC LIMIT ?""", (count,)).fetchall()
+
+    def win_rates(self, name: str = None) -> list:
+        """Returns with the (name, matches, wins, win rate) of every player, or only of the given one, the most matches first."""
+        return self.connection.execute("""
+            SELECT name, COUNT(*), SUM(won), AVG(won) FROM players
+            WHERE ? IS NULL OR name = ? GROUP BY name ORDER BY COUNT(*) DESC, name""", (name, name)).fetchall()
+
+    def map_win_rates(self, mapname: str = None) -> list:
+        """Returns with the (map, name, matches, wins, win rate) of every player on every map, or only on the given one."""
+        return self.connection.execute("""
+            SELECT matches.map, players.name, COUNT(*), SUM(players.won), AVG(players.won) FROM players
+            JOIN matches ON matches.id = players.match
+            WHERE ? IS NULL OR matches.map = ? GROUP BY matches.map, players.name ORDER BY matches.map, COUNT(*) DESC, players.name""", (mapname, mapname)).fetchall()
+
+    def lines(self, count: int = SHOWN) -> list:
+        """Returns with the lines of the history window: the most recent matches, then the win rate of every player."""
+        lines = ["{} took {} turns to defeat {} on the {} map.".format(victor, turns, loser, mapname) for victor, loser, turns, mapname in self.recent(count)]
+        lines += ["{}: won {} of {} matches ({}%)".format(name, wins, matches, round(100 * rate)) for name, matches, wins, rate in self.win_rates()]
+        return lines
+
+    def import_text(self, location: str) -> None:
+        """Adds the matches of a text history of the earlier versions, which only kept the names, the turns and the map of every match."""
+        with open(location, "rt", encoding="utf-8") as file:
+            found = [re.fullmatch(r"(.*) took (\d+) turns to defeat (.*) on the (.*) map\.", line.rstrip('\n')) for line in file]
+        for match in reversed([match for match in found if match is not None]):
+            victor, turns, loser, mapname = match.groups()
+            self.record(mapname, [("Winner", victor), ("Loser", loser)], "Winner", int(turns), 0, [0, 0], finished=0)
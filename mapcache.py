@@ -0,0 +1,134 @@
+import hashlib
+import mmap
+import os
+import struct
+from array import array
+
+import terrains
+
+class CompiledMap:
+    """Class for the fully processed data of a map: terrain kind and owner ids column by column, HQ and factory locations and building counts.
+        The terrain kinds and owners can be read straight out of a memory mapped cache file."""
+    def __init__(self, xrn: int, yrn: int, kinds: object, owners: object, team_buildings: list, hqs: list, workshops: list, raw_hqs: int, raw_workshops: int):
+        self.xrn = xrn
+        self.yrn = yrn
+        self.kinds = kinds
+        self.owners = owners
+        self.team_buildings = team_buildings
+        self.hqs = hqs
+        self.workshops = workshops
+        self.raw_hqs = raw_hqs
+        self.raw_workshops = raw_workshops
+        self.mapping = None         #Memory mapped cache file and the view of it the kinds and owners are read from, if they come from a cache file.
+
+    def close(self) -> None:
+        """Copies the terrain kinds and owners out of the memory mapped cache file and closes it, so the file can be replaced even where mapped files are locked."""
+        if self.mapping is None:
+            return
+        mapped, view = self.mapping
+        kinds, owners = bytes(self.kinds), bytes(self.owners)
+        self.kinds.release()
+        self.owners.release()
+        view.release()
+        mapped.close()
+        self.kinds, self.owners, self.mapping = kinds, owners, None
+
+    def fits_needs(self) -> bool:
+        """Checks if the map is valid and can be played on: exactly two HQs, at least two factories and at least 10 tiles in both directions."""
+        return self.raw_hqs == 2 and self.raw_workshops >= 2 and self.xrn >= 10 and self.yrn >= 10
+
+MAGIC = b"SWMAP"
+VERSION = 1
+HEADER = struct.Struct("<5sHQq32sIIIIII")   #Magic, version, source size, source mtime, source hash, width, height, building counts, HQ and factory counts.
+CACHE_LOCATION = os.path.join("Cache", "Maps")
+
+def read_rawmap(path: str) -> tuple:
+    """Gets the path to a map and reads it, padding every line with saltwater to the same length. Returns with the lines, width and height in a tuple."""
+    rawmap = []
+    with open(path, "rt", encoding="utf-8") as file:
+        for line in file:
+            rawmap.append(line.rstrip('\n'))
+    x = 0
+    for l in rawmap:
+        if len(l) > x:
+            x = len(l)
+    y = len(rawmap)
+    for i in range(y):
+        rawmap[i] += 'O' * (x - len(rawmap[i]))
+    return rawmap, x, y
+
+def compile_rawmap(rawmap: list[list], xrn: int, yrn: int) -> CompiledMap:
+    """Processes the raw map data, including road inference, and returns with the compiled map."""
+    team_buildings, grid = terrains.construct(rawmap, xrn, yrn)
+    raw_hqs = sum(line.count('H') for line in rawmap)
+    raw_workshops = sum(line.count('W') for line in rawmap)
+    return CompiledMap(xrn, yrn, grid.kinds, grid.owners, team_buildings, grid.locations('H'), grid.locations('W'), raw_hqs, raw_workshops)
+
+def cache_path(path: str) -> str:
+    """Returns where the compiled version of the given map is cached."""
+    return os.path.join(CACHE_LOCATION, os.path.basename(path) + ".swm")
+
+def write(location: str, compiled: CompiledMap, stat: os.stat_result, digest: bytes) -> None:
+    """Writes the compiled map into a cache file, along with the size, modification time and hash of the map it was made from."""
+    os.makedirs(os.path.dirname(location), exist_ok=True)
+    positions = array('I', [value for position in compiled.hqs + compiled.workshops for value in position])
+    with open(location + ".tmp", "wb") as file:
+        file.write(HEADER.pack(MAGIC, VERSION, stat.st_size, stat.st_mtime_ns, digest, compiled.xrn, compiled.yrn, compiled.team_buildings[0], compiled.team_buildings[1], compiled.raw_hqs, compiled.raw_workshops))
+        file.write(struct.pack("<II", len(compiled.hqs), len(compiled.workshops)))
+        file.write(bytes(compiled.kinds))
+        file.write(bytes(compiled.owners))
+        file.write(positions.tobytes())
+    os.replace(location + ".tmp", location)
+
+def read(location: str) -> tuple:
+    """Memory maps a cache file and returns with its header values and the compiled map, whose terrain kinds and owners are read straight from the mapping."""
+    with open(location, "rb") as file:
+        mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        magic, version, size, mtime, digest, xrn, yrn, red, blue, raw_hqs, raw_workshops = HEADER.unpack_from(mapped, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("Not a compiled map of this version.")
+        hqnum, wsnum = struct.unpack_from("<II", mapped, HEADER.size)
+        start, tiles = HEADER.size + 8, xrn * yrn
+        if hqnum + wsnum > tiles or len(mapped) != start + 2 * tiles + 8 * (hqnum + wsnum):
+            raise ValueError("Compiled map is truncated or damaged.")
+    except (ValueError, struct.error):
+        mapped.close()
+        raise
+    view = memoryview(mapped)
+    positions = array('I')
+    positions.frombytes(view[start + 2 * tiles:start + 2 * tiles + 8 * (hqnum + wsnum)])
+    locations = [(positions[i], positions[i + 1]) for i in range(0, len(positions), 2)]
+    compiled = CompiledMap(xrn, yrn, view[start:start + tiles], view[start + tiles:start + 2 * tiles], [red, blue], locations[:hqnum], locations[hqnum:], raw_hqs, raw_workshops)
+    compiled.mapping = (mapped, view)
+    return (size, mtime, digest), compiled
+
+def load(path: str) -> CompiledMap:
+    """Returns with the compiled version of the map on the given path, or None if it is empty.
+        The cache file is used if the map's size and modification time, or failing that its hash, still match. Otherwise the map is processed again and cached.
+        The stale cache file is closed before it is written again, a map with the same hash keeps its data copied out of it."""
+    stat = os.stat(path)
+    location = cache_path(path)
+    cached = None
+    try:
+        cached = read(location)
+        if cached[0][:2] == (stat.st_size, stat.st_mtime_ns):
+            return cached[1]
+    except (OSError, ValueError, struct.error):
+        cached = None
+    with open(path, "rb") as file:
+        digest = hashlib.sha256(file.read()).digest()
+    if cached is not None:
+        cached[1].close()
+    if cached is not None and cached[0][2] == digest:
+        compiled = cached[1]
+    else:
+        rawmap, x, y = read_rawmap(path)
+        if len(rawmap) == 0:
+            return None
+        compiled = compile_rawmap(rawmap, x, y)
+    try:
+        write(location, compiled, stat, digest)
+    except OSError:
+        pass
+    return compiled
@@ -1,27 +1,42 @@
 import os
+import time
 import tkinter as tk
 from tkinter import ttk
 from tkinter.messagebox import showinfo
 
 import game
 import display
+import history
+import mapcache
+import sprites
 
 class Window:
     """Class used to display the setup screen before the game."""
 
     location = 'Maps'
-    filelist = os.listdir(location)
-    window = tk.Tk()
     bgcolor = 'LimeGreen'
     
-    def __init__(self, width=420, height=280):
+    def __init__(self, width=420, height=330, started: float = None, report_startup: bool = False):
+        self.started = time.perf_counter() if started is None else started
+        self.report_startup = report_startup
+        self.startup_time = None
+        self.filelist = os.listdir(self.location)
+        self.window = tk.Tk()
         self.__window_setup(width, height)
         self.__window_elements()
+        self.window.after_idle(self.__window_shown)
+        sprites.warm()
 
     def game_start(self) -> None: 
         """Starts the setup window."""
         self.window.mainloop()
 
+    def __window_shown(self) -> None:
+        """Measures the time it took from starting the program to showing the setup window."""
+        self.startup_time = time.perf_counter() - self.started
+        if self.report_startup:
+            print("Time to first window: {} ms".format(round(self.startup_time * 1000, 1)))
+
     def __window_setup(self, width: int, height: int) -> None:
         """Opens the setup window."""
         x = (self.window.winfo_screenwidth() // 2) - (width // 2)
@@ -36,6 +51,7 @@ class Window:
         tk.Label(self.window, text="Simple Wars", font=("Broadway", 46), bg=self.bgcolor).pack()
         self.__display_teams()
         self.__playernames_entry()
+        self.__computers_select()
         self.__mapselect_combobox()
         self.__extras_info()
 
@@ -57,6 +73,19 @@ class Window:
         self.player2 = tk.Entry(playernames)
         self.player2.pack(side=tk.RIGHT)
 
+    def __computers_select(self) -> None:
+        """Places the checkboxes for letting the computer play either team, and the time it can think for every turn."""
+        computers = tk.Frame(self.window, bg=self.bgcolor)
+        computers.pack()
+        self.computer1, self.computer2 = tk.BooleanVar(), tk.BooleanVar()
+        tk.Checkbutton(computers, text="Computer", variable=self.computer1, bg=self.bgcolor).pack(side=tk.LEFT)
+        tk.Label(computers, text="  Thinking time (s):", bg=self.bgcolor).pack(side=tk.LEFT)
+        self.budget = tk.Spinbox(computers, from_=1, to=30, width=3)
+        self.budget.delete(0, tk.END)
+        self.budget.insert(0, "3")
+        self.budget.pack(side=tk.LEFT)
+        tk.Checkbutton(computers, text="Computer", variable=self.computer2, bg=self.bgcolor).pack(side=tk.RIGHT)
+
     def __mapselect_combobox(self) -> None:
         """Places the map selector in a combobox."""
         mapselect = tk.Frame(self.window, bg=self.bgcolor)
@@ -95,71 +124,54 @@ class Window:
         return ' '.join(name)
 
     def __get_gamemap(self) -> None:
-        """Starts a new game, if the given setup and map passes all checks."""
-        if self.player1.get() == "" or self.player2.get() == "":
+        """Starts a new game, if the given setup and map passes all checks. Teams played by the computer are called Computer if they aren't given a name."""
+        if (self.player1.get() == "" and not self.computer1.get()) or (self.player2.get() == "" and not self.computer2.get()):
             showinfo("Error!", "Both players are required to have a name!")
+        elif not self.budget.get().isdigit() or int(self.budget.get()) == 0:
+            showinfo("Error!", "The thinking time has to be a whole number of seconds!")
         elif self.mapcbox.current() == -1:
             showinfo("Error!", "The selected map doesn't exist!")
         else:
             mapname = self.filelist[self.mapcbox.current()]
             path = os.path.join(self.location, self.filelist[self.mapcbox.current()])
             if path.endswith(".txt"):
-                rawmap, x, y = self.__map_reader(path)
-                if len(rawmap) == 0:
+                compiled = self.__map_reader(path)
+                if compiled is None:
                     showinfo("Error!", "The selected map is an invalid type or is empty!")
                 else:
-                    if self.__map_fits_needs(rawmap, x, y):
+                    if self.__map_fits_needs(compiled):
                         showinfo("Error!", "The selected map doesn't conform to the basic requirements!")
                     else:
-                        team1 = self.player1.get()
-                        team2 = self.player2.get()
+                        team1 = self.player1.get() or "Computer"
+                        team2 = self.player2.get() or "Computer"
+                        computers = [team for team, computer in zip(game.Start.TEAMS, (self.computer1, self.computer2)) if computer.get()]
+                        budget = int(self.budget.get())
                         self.window.destroy()
                         mapname = self.__to_show(mapname.split('_')) if '_' in mapname else self.__to_show(mapname.split(' '))
-                        SimpleWars = game.Start(x, y)
-                        SimpleWars.play(rawmap, mapname, team1, team2)
+                        SimpleWars = game.Start(compiled.xrn, compiled.yrn, computers=computers, budget=budget, workers=os.cpu_count() or 1, report=self.report_startup)
+                        SimpleWars.play(compiled, mapname, team1, team2)
             else:
                 showinfo("Error!", "The selected item is not a text file!")
 
-    def __map_reader(self, path: str) -> tuple:
-        """Gets the path to the selected map and processes it. Returns with all the needed data in a tuple."""
-        rawmap = []
+    def __map_reader(self, path: str) -> mapcache.CompiledMap:
+        """Gets the path to the selected map and returns with its compiled version, which is only processed again if the map has changed since it was cached."""
         try:
-            with open(path, "rt", encoding="utf-8") as file:
-                for line in file:
-                    rawmap.append(line.rstrip('\n'))
-            x = 0
-            for l in rawmap:
-                if len(l) > x:
-                    x = len(l)
-            y = len(rawmap)
-            for i in range(y):
-                rawmap[i] += 'O' * (x - len(rawmap[i]))
-            return rawmap, x, y
+            return mapcache.load(path)
         except PermissionError:
-            return [], 0, 0
+            return None
 
-    def __map_fits_needs(self, rawmap: list[list], x: int, y: int) -> bool:
+    def __map_fits_needs(self, compiled: mapcache.CompiledMap) -> bool:
         """Checks if the selected map is valid and can be played on."""
-        hqnum = 0
-        wsnum = 0
-        for line in rawmap:
-            for char in line:
-                if char == 'H':
-                    hqnum += 1
-                elif char == 'W':
-                    wsnum += 1
-        return hqnum != 2 or wsnum < 2 or x < 10 or y < 10
+        return not compiled.fits_needs()
 
     def __get_history(self) -> None:
-        """Displays history in a new window."""
+        """Displays the most recent matches and the win rate of every player in a new window."""
+        store = history.History()
         try:
-            matchhistory = []
-            with open("matchhistory.txt", "rt", encoding="utf-8") as f:
-                for line in f:
-                    matchhistory.append(line.rstrip('\n'))
-            display.matchhistory(matchhistory)
-        except FileNotFoundError:
-            display.matchhistory(["No game history data stored."])
+            matchhistory = store.lines()
+        finally:
+            store.close()
+        display.matchhistory(matchhistory if matchhistory else ["No game history data stored."])
 
     def __get_controls(self) -> None:
         """Displays controls in a new window."""
@@ -0,0 +1,88 @@
+import heapq
+
+DIRECTIONS = [(0, -1), (1, 0), (0, 1), (-1, 0)]     #North, east, south and west steps on the map.
+
+def neighbours(position: tuple, xrn: int, yrn: int) -> list:
+    """Returns the locations next to the given one that are still inside the map."""
+    x, y = position
+    return [(x + xmod, y + ymod) for xmod, ymod in DIRECTIONS if 0 <= x + xmod < xrn and 0 <= y + ymod < yrn]
+
+def step_cost(unit: object, terrain: object) -> int:
+    """Returns how many moves it takes the unit to step on the terrain or kind of terrain, or 0 if it can't step on it at all."""
+    return terrain.transports[unit.movement]
+
+def build_path(came_from: dict, position: tuple) -> list:
+    """Walks back on the predecessor data from the given location and returns every step leading to it, without the starting location."""
+    path = []
+    while came_from[position] is not None:
+        path.append(position)
+        position = came_from[position]
+    path.reverse()
+    return path
+
+def reachable_tiles(unitmap: list[list], terrainmap: list[list], start: tuple) -> tuple:
+    """Runs Dijkstra's algorithm from the unit at the start location over the movement costs of the terrains.
+        Every unit body-blocks, so occupied tiles can neither be entered nor passed through.
+        Returns with a dictionary of every reachable location containing its cost and cheapest path, and with the set of every location that was looked at."""
+    xrn, yrn = len(terrainmap), len(terrainmap[0])
+    unit = unitmap[start[0]][start[1]]
+    moves_left = unit.speed - unit.moved
+    costs, came_from = {start: 0}, {start: None}
+    explored = {start}
+    queue = [(0, start)]
+    while queue:
+        cost, position = heapq.heappop(queue)
+        if cost > costs[position]:
+            continue
+        for step in neighbours(position, xrn, yrn):
+            explored.add(step)
+            price = step_cost(unit, terrainmap.kind_at(*step))
+            if price == 0 or unitmap[step[0]][step[1]] is not None or cost + price > moves_left:
+                continue
+            if step not in costs or cost + price < costs[step]:
+                costs[step], came_from[step] = cost + price, position
+                heapq.heappush(queue, (cost + price, step))
+    return {position: (costs[position], build_path(came_from, position)) for position in costs if position != start}, explored
+
+def manhattan(position: tuple, goal: tuple) -> int:
+    """Returns the Manhattan distance between two locations, which never overestimates the cost since every step costs at least 1."""
+    return abs(position[0] - goal[0]) + abs(position[1] - goal[1])
+
+def find_path(unitmap: list[list], terrainmap: list[list], start: tuple, goal: tuple) -> list:
+    """Runs A* search with a Manhattan heuristic to find the cheapest path the unit at the start location can still take to the goal.
+        Every unit body-blocks, the same way as with reachable tiles. Returns with the steps of the path without the start, or None if the goal can't be reached."""
+    xrn, yrn = len(terrainmap), len(terrainmap[0])
+    unit = unitmap[start[0]][start[1]]
+    moves_left = unit.speed - unit.moved
+    if start == goal or manhattan(start, goal) > moves_left:
+        return None
+    costs, came_from = {start: 0}, {start: None}
+    queue = [(manhattan(start, goal), 0, start)]
+    while queue:
+        estimate, cost, position = heapq.heappop(queue)
+        if position == goal:
+            return build_path(came_from, goal)
+        if cost > costs[position]:
+            continue
+        for step in neighbours(position, xrn, yrn):
+            price = step_cost(unit, terrainmap.kind_at(*step))
+            if price == 0 or unitmap[step[0]][step[1]] is not None or cost + price + manhattan(step, goal) > moves_left:
+                continue
+            if step not in costs or cost + price < costs[step]:
+                costs[step], came_from[step] = cost + price, position
+                heapq.heappush(queue, (cost + price + manhattan(step, goal), cost + price, step))
+    return None
+
+__rings = {}        #Offsets of every ring that has been asked for, by (minrange, maxrange).
+
+def ring_offsets(minrange: int, maxrange: int) -> tuple:
+    """Returns every step whose Manhattan distance is between the minimum and maximum range, both included. Each ring is only worked out once."""
+    if (minrange, maxrange) not in __rings:
+        __rings[(minrange, maxrange)] = tuple((xmod, ymod) for xmod in range(-maxrange, maxrange + 1)
+                                                for ymod in range(abs(xmod) - maxrange, maxrange - abs(xmod) + 1) if abs(xmod) + abs(ymod) >= minrange)
+    return __rings[(minrange, maxrange)]
+
+def in_range(position: tuple, minrange: int, maxrange: int, xrn: int, yrn: int) -> list:
+    """Returns every location inside the map whose distance from the given one is between the minimum and maximum range, only looking at the ring around it."""
+    x, y = position
+    return [(x + xmod, y + ymod) for xmod, ymod in ring_offsets(minrange, maxrange) if 0 <= x + xmod < xrn and 0 <= y + ymod < yrn]
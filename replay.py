@@ -0,0 +1,226 @@
+import base64
+import bisect
+import json
+import os
+import re
+import struct
+import sys
+import time
+import zlib
+
+import engine
+import mapcache
+
+LOCATION = "Replays"
+MAGIC = b"SWREP"
+VERSION = 2
+INTERVAL = 10                               #Turns between two keyframes, counting the turn of every team separately.
+HEADER = struct.Struct("<5sHII")            #Magic, version, length of the compressed match data, number of blocks.
+BLOCK = struct.Struct("<IIQI")              #Turn and first action of the keyframe of a block, offset and length of the compressed block.
+KINDS = ["move", "step", "attack", "capture", "produce", "select", "end"]      #Every kind of action, the position is its id in the file.
+KIND_IDS = {kind: ind for ind, kind in enumerate(KINDS)}
+LOCATIONS = {"move": 2, "step": 2, "attack": 2, "capture": 1, "produce": 1, "select": 1, "end": 0}     #Number of locations every kind of action has.
+
+class Replay:
+    """Class for a recorded match: the map it was played on, the seed of its rolls, the players and every action taken in it.
+        Since every roll follows from the seed, carrying out the actions again on the same map plays out the exact same match.
+        Keyframes hold the snapshot of the match at the start of every few turns, so any turn can be reached without playing out the match from the start."""
+    def __init__(self, compiled: mapcache.CompiledMap, mapname: str, seed: int, players: list, actions: list, winner: str = None):
+        self.compiled = compiled
+        self.mapname = mapname
+        self.seed = seed
+        self.players = players
+        self.actions = actions
+        self.winner = winner
+        self.keyframes = []         #Turn, first action and snapshot of every keyframe, from the first turn on.
+
+    def new_game(self) -> engine.GameState:
+        """Returns with the match as it was before the first action."""
+        return engine.load_game(self.compiled, self.seed)
+
+    def run(self) -> engine.GameState:
+        """Carries out every action of the replay without drawing anything and returns with the finished match.
+            Raises a ValueError if an action can't be carried out, which means the replay doesn't match the rules of the game."""
+        state = self.new_game()
+        for ind, action in enumerate(self.actions):
+            if not state.apply_action(action):
+                raise ValueError("Action {} of the replay can't be carried out: {}".format(ind, action))
+        return state
+
+    def index(self, interval: int = INTERVAL) -> None:
+        """Plays out the replay and takes a keyframe at the start of the match and of every given number of turns."""
+        state = self.new_game()
+        self.keyframes, turn = [(0, 0, state.snapshot())], 0
+        for ind, action in enumerate(self.actions):
+            state.apply_action(action)
+            if action[0] == "end":
+                turn += 1
+                if turn % interval == 0:
+                    self.keyframes.append((turn, ind + 1, state.snapshot()))
+
+    def turns(self) -> int:
+        """Returns the number of turns of the replay, counting the turn of every team separately."""
+        return sum(1 for action in self.actions if action[0] == "end")
+
+    def units_built(self) -> list:
+        """Returns with the number of units every team bought in the replay, counting whose turn it was from the ends of the turns."""
+        built, turn = [0] * len(engine.GameState.TEAMS), 0
+        for action in self.actions:
+            if action[0] == "produce":
+                built[turn % len(built)] += 1
+            turn += action[0] == "end"
+        return built
+
+    def seek(self, turn: int, state: engine.GameState = None) -> tuple:
+        """Returns with the match at the start of the given turn and the position of its first action. The given match is set to it if there is one.
+            The match is restored from the last keyframe before the turn, so only the actions since the keyframe are carried out."""
+        if not self.keyframes:
+            self.index()
+        turn = max(0, min(turn, self.turns()))
+        current, position, snapshot = self.keyframes[bisect.bisect_right([keyframe[0] for keyframe in self.keyframes], turn) - 1]
+        if state is None:
+            state = self.new_game()
+        state.restore(snapshot)
+        while current < turn:
+            state.apply_action(self.actions[position])
+            current += self.actions[position][0] == "end"
+            position += 1
+        return state, position
+
+def from_game(state: engine.GameState, mapname: str, players: list) -> Replay:
+    """Returns with the start of a replay of the given match, which has to be freshly set up. The actions logged on the match are added to the replay as they happen."""
+    compiled = mapcache.CompiledMap(state.xrn, state.yrn, bytes(state.terrainmap.kinds), bytes(state.terrainmap.owners), list(state.team_buildings), [], [], 0, 0)
+    state.log = []
+    return Replay(compiled, mapname, state.seed, list(players), state.log)
+
+def __write_number(out: bytearray, value: int) -> None:
+    """Writes a whole number as a variable length integer, with the sign folded into the lowest bit so small numbers of both signs take a single byte."""
+    value = value * 2 if value >= 0 else -value * 2 - 1
+    while value >= 0x80:
+        out.append(value & 0x7f | 0x80)
+        value >>= 7
+    out.append(value)
+
+def __read_number(data: bytes, pos: int) -> tuple:
+    """Reads a whole number written by __write_number, returns with it and the position after it."""
+    value, shift = 0, 0
+    while True:
+        byte = data[pos]
+        value |= (byte & 0x7f) << shift
+        pos, shift = pos + 1, shift + 7
+        if byte < 0x80:
+            break
+    return (value >> 1 if value % 2 == 0 else -(value + 1 >> 1)), pos
+
+def __encode_actions(actions: list) -> bytes:
+    """Encodes the actions of a block: the id of the kind, then every location as the difference from the previous location, then the unit selection of purchases.
+        Consecutive actions mostly happen close to each other, so most actions take only a few bytes."""
+    out, cursor = bytearray(), (0, 0)
+    __write_number(out, len(actions))
+    for action in actions:
+        out.append(KIND_IDS[action[0]])
+        for x, y in action[1:1 + LOCATIONS[action[0]]]:
+            __write_number(out, x - cursor[0])
+            __write_number(out, y - cursor[1])
+            cursor = (x, y)
+        if action[0] == "produce":
+            __write_number(out, action[2])
+    return bytes(out)
+
+def __decode_actions(data: bytes, pos: int) -> list:
+    """Decodes the actions of a block written by __encode_actions, starting from the given position."""
+    actions, cursor = [], (0, 0)
+    count, pos = __read_number(data, pos)
+    for ind in range(count):
+        kind, pos = KINDS[data[pos]], pos + 1
+        action = [kind]
+        for location in range(LOCATIONS[kind]):
+            x, pos = __read_number(data, pos)
+            y, pos = __read_number(data, pos)
+            cursor = (cursor[0] + x, cursor[1] + y)
+            action.append(cursor)
+        if kind == "produce":
+            selection, pos = __read_number(data, pos)
+            action.append(selection)
+        actions.append(tuple(action))
+    return actions
+
+def __encode_block(snapshot: tuple, actions: list) -> bytes:
+    """Returns with the compressed block of a keyframe and the actions up to the next keyframe."""
+    keyframe = json.dumps(snapshot, separators=(",", ":")).encode()
+    out = bytearray()
+    __write_number(out, len(keyframe))
+    return zlib.compress(bytes(out) + keyframe + __encode_actions(actions))
+
+def __decode_block(block: bytes) -> tuple:
+    """Returns with the snapshot of the keyframe and the actions of a compressed block."""
+    data = zlib.decompress(block)
+    length, pos = __read_number(data, 0)
+    snapshot = json.loads(data[pos:pos + length])
+    pieces, changes = tuple(tuple(piece) for piece in snapshot[5]), tuple(tuple(change) for change in snapshot[6])
+    return tuple(snapshot[:5]) + (pieces, changes) + tuple(snapshot[7:]), __decode_actions(data, pos + length)
+
+def replay_path(mapname: str) -> str:
+    """Returns where a replay of a match starting now on the given map is saved."""
+    return os.path.join(LOCATION, "{}-{}.swr".format(time.strftime("%Y%m%d-%H%M%S"), re.sub(r"[^\w-]+", "_", mapname)))
+
+def save(replay: Replay, path: str, interval: int = INTERVAL) -> None:
+    """Writes the replay into the given file: the header, the compressed data of the match, the index of the blocks, then a compressed block for every keyframe."""
+    replay.index(interval)
+    compiled = replay.compiled
+    data = zlib.compress(json.dumps({"map": replay.mapname, "seed": replay.seed, "players": replay.players, "winner": replay.winner, "interval": interval,
+            "xrn": compiled.xrn, "yrn": compiled.yrn, "team_buildings": compiled.team_buildings,
+            "kinds": base64.b64encode(bytes(compiled.kinds)).decode(), "owners": base64.b64encode(bytes(compiled.owners)).decode()}).encode())
+    ends = [first for turn, first, snapshot in replay.keyframes[1:]] + [len(replay.actions)]
+    blocks = [__encode_block(snapshot, replay.actions[first:end]) for (turn, first, snapshot), end in zip(replay.keyframes, ends)]
+    index, offset = bytearray(), 0
+    for (turn, first, snapshot), block in zip(replay.keyframes, blocks):
+        index += BLOCK.pack(turn, first, offset, len(block))
+        offset += len(block)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path + ".tmp", "wb") as file:
+        file.write(HEADER.pack(MAGIC, VERSION, len(data), len(blocks)))
+        file.write(data)
+        file.write(index)
+        file.write(b"".join(blocks))
+    os.replace(path + ".tmp", path)
+
+def load(path: str) -> Replay:
+    """Reads the replay from the given file, with its keyframes."""
+    with open(path, "rb") as file:
+        content = file.read()
+    magic, version, length, count = HEADER.unpack_from(content, 0)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("Not a replay of this version.")
+    data = json.loads(zlib.decompress(content[HEADER.size:HEADER.size + length]))
+    compiled = mapcache.CompiledMap(data["xrn"], data["yrn"], base64.b64decode(data["kinds"]), base64.b64decode(data["owners"]), data["team_buildings"], [], [], 0, 0)
+    replay = Replay(compiled, data["map"], data["seed"], data["players"], [], data["winner"])
+    start = HEADER.size + length + count * BLOCK.size
+    for ind in range(count):
+        turn, first, offset, size = BLOCK.unpack_from(content, HEADER.size + length + ind * BLOCK.size)
+        snapshot, actions = __decode_block(content[start + offset:start + offset + size])
+        replay.keyframes.append((turn, first, snapshot))
+        replay.actions += actions
+    return replay
+
+def main(arguments: list) -> None:
+    """Plays back a replay file. By default it is carried out without drawing anything as fast as possible, reporting the speed, the winner and the time to seek to the last turn.
+        With --watch it is shown on a window instead, the number after it speeds the playback up, e.g.: python replay.py Replays/match.swr --watch 4"""
+    replay = load(arguments[0])
+    if "--watch" in arguments:
+        import game
+        ind = arguments.index("--watch")
+        speed = float(arguments[ind + 1]) if len(arguments) > ind + 1 else 1
+        game.Start(replay.compiled.xrn, replay.compiled.yrn).watch(replay, speed)
+        return
+    started = time.perf_counter()
+    state = replay.run()
+    seconds = time.perf_counter() - started
+    print("{} actions in {} ms, {} actions/s".format(len(replay.actions), round(seconds * 1000, 1), round(len(replay.actions) / seconds) if seconds > 0 else "-"))
+    print("Winner: {} (recorded: {})".format(state.winner(), replay.winner))
+    started = time.perf_counter()
+    replay.seek(replay.turns())
+    print("Seeking to the last of {} turns: {} ms".format(replay.turns(), round((time.perf_counter() - started) * 1000, 1)))
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,74 @@
+import math
+import os
+import threading
+
+import pygame as py
+
+class Sheet:
+    """Class for packing every image of one folder onto a single texture, which hands out each image as a subsurface of itself."""
+    def __init__(self, kind: str, location: str, files: dict, alpha: bool, size: int = 32):
+        self.kind = kind
+        self.location = location
+        self.files = files
+        self.alpha = alpha
+        self.size = size
+        self.texture = None
+        self.converted = False
+
+    def build(self) -> None:
+        """Loads every image of the sheet and packs them onto the texture in a grid."""
+        columns = math.ceil(math.sqrt(len(self.files)))
+        rows = math.ceil(len(self.files) / columns)
+        self.texture = py.Surface((columns * self.size, rows * self.size), py.SRCALPHA)
+        for ind, file in enumerate(self.files.values()):
+            self.texture.blit(py.image.load(os.path.join(self.location, file)), self.position(ind))
+
+    def convert(self) -> None:
+        """Converts the texture to the pixel format of the display, so blitting from it needs no conversion. Needs the display mode to be set."""
+        self.texture = self.texture.convert_alpha() if self.alpha else self.texture.convert()
+        self.converted = True
+
+    def position(self, ind: int) -> tuple:
+        """Returns the location of the given image on the texture."""
+        columns = self.texture.get_width() // self.size
+        return (ind % columns) * self.size, (ind // columns) * self.size
+
+    def sprites(self) -> dict:
+        """Returns every image of the sheet as a subsurface of the texture, keyed by (kind, team, identifier)."""
+        return {(self.kind,) + key: self.texture.subsurface(py.Rect(self.position(ind), (self.size, self.size))) for ind, key in enumerate(self.files)}
+
+__sheets = {}                   #Every registered sheet, by the kind of images it holds.
+__sprites = {}                  #Every image of the registered sheets, keyed by (kind, team, identifier).
+__lock = threading.Lock()       #Makes sure a sheet isn't built by the warming thread and the game at the same time.
+
+def register(kind: str, location: str, files: dict, alpha: bool) -> None:
+    """Registers a sheet of images, where the files are keyed by (team, identifier). Nothing is loaded until the images are needed."""
+    __sheets[kind] = Sheet(kind, location, files, alpha)
+
+def build() -> None:
+    """Loads every sheet that hasn't been loaded yet, without converting them."""
+    with __lock:
+        for sheet in __sheets.values():
+            if sheet.texture is None:
+                sheet.build()
+
+def warm() -> threading.Thread:
+    """Starts loading the sheets on a background thread, so they are likely ready by the time the first game starts. Returns with the started thread."""
+    thread = threading.Thread(target=build, name="sprite-warming", daemon=True)
+    thread.start()
+    return thread
+
+def prepare() -> None:
+    """Builds every sheet that hasn't been built yet and converts them to the display format. Should be called once after the display mode is set."""
+    build()
+    with __lock:
+        for sheet in __sheets.values():
+            if not sheet.converted and py.display.get_surface() is not None:
+                sheet.convert()
+            __sprites.update(sheet.sprites())
+
+def get(kind: str, team: str, identifier: str) -> py.Surface:
+    """Returns the image of the given kind, team and identifier, preparing the sheets first if they aren't ready yet."""
+    if (kind, team, identifier) not in __sprites:
+        prepare()
+    return __sprites[(kind, team, identifier)]
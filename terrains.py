@@ -1,52 +1,157 @@
 import os
-import pygame as pg
-
-class __TerrainImages:
-    """Class for statically storing the location of terrain images."""
-    location = os.path.join("Images", "Terrains")
-    PLAINS = pg.image.load(os.path.join(location, "plains.png"))
-    SWAMP = pg.image.load(os.path.join(location, "swamp.png"))
-    FOREST = pg.image.load(os.path.join(location, "forest.png"))
-    MOUNTAIN = pg.image.load(os.path.join(location, "mountain.png"))
-    FRESHWATER = pg.image.load(os.path.join(location, "freshwater.png"))
-    SALTWATER = pg.image.load(os.path.join(location, "saltwater.png"))
-    ROAD_NORTHSOUTH = pg.image.load(os.path.join(location, "roadns.png"))
-    ROAD_WESTEAST = pg.image.load(os.path.join(location, "roadwe.png"))
-    ROAD_NORTHEAST = pg.image.load(os.path.join(location, "roadne.png"))
-    ROAD_NORTHWEST = pg.image.load(os.path.join(location, "roadnw.png"))
-    ROAD_SOUTHEAST = pg.image.load(os.path.join(location, "roadse.png"))
-    ROAD_SOUTHWEST = pg.image.load(os.path.join(location, "roadsw.png"))
-    ROAD_NORTHINTERSECTION = pg.image.load(os.path.join(location, "roadni.png"))
-    ROAD_EASTINTERSECTION = pg.image.load(os.path.join(location, "roadei.png"))
-    ROAD_SOUTHINTERSECTION = pg.image.load(os.path.join(location, "roadsi.png"))
-    ROAD_WESTINTERSECTION = pg.image.load(os.path.join(location, "roadwi.png"))
-    ROAD_FULLINTERSECTION = pg.image.load(os.path.join(location, "roadci.png"))
-    BRIDGE_FRESH_NORTHSOUTH = pg.image.load(os.path.join(location, "bridgefns.png"))
-    BRIDGE_FRESH_WESTEAST = pg.image.load(os.path.join(location, "bridgefwe.png"))
-    BRIDGE_SALT_NORTHSOUTH = pg.image.load(os.path.join(location, "bridgesns.png"))
-    BRIDGE_SALT_WESTEAST = pg.image.load(os.path.join(location, "bridgeswe.png"))
-    CITY_NEUTRAL = pg.image.load(os.path.join(location, "cityneutral.png"))
-    CITY_1 = pg.image.load(os.path.join(location, "city1.png"))
-    CITY_2 = pg.image.load(os.path.join(location, "city2.png"))
-    WORKSHOP_NEUTRAL = pg.image.load(os.path.join(location, "workshopneutral.png"))
-    WORKSHOP_1 = pg.image.load(os.path.join(location, "workshop1.png"))
-    WORKSHOP_2 = pg.image.load(os.path.join(location, "workshop2.png"))
-    HQ_1 = pg.image.load(os.path.join(location, "hq1.png"))
-    HQ_2 = pg.image.load(os.path.join(location, "hq2.png"))
-    DEBRIS = pg.image.load(os.path.join(location, "debris.png"))
-    ABANDONED_CITY = pg.image.load(os.path.join(location, "abandonedcity.png"))
+import re
+from array import array
+from collections import OrderedDict
+from types import MappingProxyType
+from typing import NamedTuple
+
+import sprites
+import zobrist
+
+IMAGES = {(None, "O"): "saltwater.png",                 #Image files of every terrain, by the team owning it and its identifier.
+        (None, "L"): "freshwater.png",
+        (None, "P"): "plains.png",
+        (None, "S"): "swamp.png",
+        (None, "F"): "forest.png",
+        (None, "M"): "mountain.png",
+        (None, "D"): "debris.png",
+        (None, "A"): "abandonedcity.png",
+        (None, "C"): "cityneutral.png",
+        (None, "W"): "workshopneutral.png",
+        (None, "RNS"): "roadns.png",
+        (None, "RWE"): "roadwe.png",
+        (None, "RNE"): "roadne.png",
+        (None, "RNW"): "roadnw.png",
+        (None, "RSE"): "roadse.png",
+        (None, "RSW"): "roadsw.png",
+        (None, "RNI"): "roadni.png",
+        (None, "REI"): "roadei.png",
+        (None, "RSI"): "roadsi.png",
+        (None, "RWI"): "roadwi.png",
+        (None, "RCI"): "roadci.png",
+        (None, "BSNS"): "bridgesns.png",
+        (None, "BSWE"): "bridgeswe.png",
+        (None, "BFNS"): "bridgefns.png",
+        (None, "BFWE"): "bridgefwe.png",
+        ("Red", "H"): "hq1.png",
+        ("Red", "W"): "workshop1.png",
+        ("Red", "C"): "city1.png",
+        ("Blue", "H"): "hq2.png",
+        ("Blue", "W"): "workshop2.png",
+        ("Blue", "C"): "city2.png"}
+sprites.register("Terrain", os.path.join("Images", "Terrains"), IMAGES, False)
+
+class TerrainKind(NamedTuple):
+    """Class for the data every tile of the same kind of terrain shares. Each kind is stored only once and never changes."""
+    identifier: str
+    type: str
+    defense: float
+    transports: MappingProxyType
+    capturable: bool
+    health: float = 200
+
+def __kind(identifier: str, type: str, defense: float, transports: dict, capturable: bool) -> TerrainKind:
+    """Creates a terrain kind with read-only movement costs."""
+    return TerrainKind(identifier, type, defense, MappingProxyType(transports), capturable)
+
+KINDS = [__kind("O", "Saltwater", 0, {"Foot": 0, "Wheels": 0, "Tracks": 0}, False),     #Every kind of terrain, the position is its id.
+        __kind("L", "Freshwater", 0, {"Foot": 2, "Wheels": 0, "Tracks": 0}, False),
+        __kind("P", "Plains", 1, {"Foot": 1, "Wheels": 2, "Tracks": 1}, False),
+        __kind("S", "Swamp", 1, {"Foot": 2, "Wheels": 3, "Tracks": 1}, False),
+        __kind("F", "Forest", 2, {"Foot": 1, "Wheels": 3, "Tracks": 2}, False),
+        __kind("M", "Mountain", 4, {"Foot": 2, "Wheels": 0, "Tracks": 0}, False),
+        __kind("D", "Wreckage", 2, {"Foot": 2, "Wheels": 2, "Tracks": 1}, False),
+        __kind("A", "Ghost Town", 3, {"Foot": 1, "Wheels": 2, "Tracks": 1}, False),
+        __kind("C", "City", 3, {"Foot": 1, "Wheels": 1, "Tracks": 1}, True),
+        __kind("W", "Factory", 3, {"Foot": 1, "Wheels": 1, "Tracks": 1}, True),
+        __kind("H", "Headquarters", 3, {"Foot": 1, "Wheels": 1, "Tracks": 1}, True),
+        __kind("RNS", "Road", 0, {"Foot": 1, "Wheels": 1, "Tracks": 1}, False),
+        __kind("RWE", "Road", 0, {"Foot": 1, "Wheels": 1, "Tracks": 1}, False),
+        __kind("RNE", "Road", 0, {"Foot": 1, "Wheels": 1, "Tracks": 1}, False),
+        __kind("RNW", "Road", 0, {"Foot": 1, "Wheels": 1, "Tracks": 1}, False),
+        __kind("RSE", "Road", 0, {"Foot": 1, "Wheels": 1, "Tracks": 1}, False),
+        __kind("RSW", "Road", 0, {"Foot": 1, "Wheels": 1, "Tracks": 1}, False),
+        __kind("RNI", "Road", 0, {"Foot": 1, "Wheels": 1, "Tracks": 1}, False),
+        __kind("REI", "Road", 0, {"Foot": 1, "Wheels": 1, "Tracks": 1}, False),
+        __kind("RSI", "Road", 0, {"Foot": 1, "Wheels": 1, "Tracks": 1}, False),
+        __kind("RWI", "Road", 0, {"Foot": 1, "Wheels": 1, "Tracks": 1}, False),
+        __kind("RCI", "Road", 0, {"Foot": 1, "Wheels": 1, "Tracks": 1}, False),
+        __kind("BSNS", "Bridge", 0, {"Foot": 1, "Wheels": 1, "Tracks": 1}, False),
+        __kind("BSWE", "Bridge", 0, {"Foot": 1, "Wheels": 1, "Tracks": 1}, False),
+        __kind("BFNS", "Bridge", 0, {"Foot": 1, "Wheels": 1, "Tracks": 1}, False),
+        __kind("BFWE", "Bridge", 0, {"Foot": 1, "Wheels": 1, "Tracks": 1}, False)]
+KIND_IDS = {kind.identifier: ind for ind, kind in enumerate(KINDS)}     #Id of every kind of terrain, by its identifier.
+OWNERS = [None, "Red", "Blue"]                                          #Every possible owner of a terrain, the position is its id.
+
+CHUNK = 32                      #Width and height of the regions the changing state of the terrain grid is stored in.
 
 class Terrain:
-    """Class for representing all terrain and handling any actions taken on them."""
-    def __init__(self, identifier: str, type: str, defense: float, transports: dict, capturable: bool, team: str, health: float = 200):
-        self.identifier = identifier
-        self.type = type
-        self.defense = defense
-        self.transports = transports
-        self.capturable = capturable
-        self.default_health = health
-        self.health = health
-        self.team = team
+    """Class for representing a single tile of terrain and handling any actions taken on it.
+        It is only a view on the terrain grid, so it can be created and thrown away freely, all changes are written back to the grid."""
+    __slots__ = ("grid", "x", "y", "ind")
+
+    def __init__(self, grid: object, x: int, y: int):
+        self.grid = grid
+        self.x = x
+        self.y = y
+        self.ind = x * grid.yrn + y
+
+    @property
+    def kind(self) -> TerrainKind:
+        """The kind of the terrain, holding all its unchanging data."""
+        return KINDS[self.grid.kinds[self.ind]]
+
+    @property
+    def identifier(self) -> str:
+        """Identifier of the kind of the terrain, also used for drawing it."""
+        return self.kind.identifier
+
+    @property
+    def type(self) -> str:
+        """Displayed name of the kind of the terrain."""
+        return self.kind.type
+
+    @property
+    def defense(self) -> float:
+        """Defense the terrain gives to the unit standing on it."""
+        return self.kind.defense
+
+    @property
+    def transports(self) -> MappingProxyType:
+        """Movement costs of the terrain for every movement type."""
+        return self.kind.transports
+
+    @property
+    def capturable(self) -> bool:
+        """Whether the terrain can be captured."""
+        return self.kind.capturable
+
+    @property
+    def default_health(self) -> float:
+        """Capture health of the terrain when nobody is capturing it."""
+        return self.kind.health
+
+    @property
+    def health(self) -> float:
+        """Remaining capture health of the terrain."""
+        return self.grid.chunk(self.x, self.y).health[self.__local()]
+
+    @health.setter
+    def health(self, value: float) -> None:
+        self.grid.change(self.x, self.y, "health", value)
+
+    @property
+    def team(self) -> str:
+        """Name of the team owning the terrain, or None if it has no owner."""
+        return OWNERS[self.grid.chunk(self.x, self.y).owners[self.__local()]]
+
+    @team.setter
+    def team(self, value: str) -> None:
+        self.grid.change(self.x, self.y, "owners", OWNERS.index(value))
+
+    def __local(self) -> int:
+        """Returns the position of the terrain inside its chunk."""
+        return (self.x % CHUNK) * CHUNK + self.y % CHUNK
 
     def can_move_on(self, movement: str) -> bool:
         """Function that checks if a certain movment type can move on the given terrain."""
@@ -78,389 +183,234 @@ class Terrain:
         """Returns true if it's a HQ."""
         return self.identifier == 'H'
 
-def __complete_intersection(rawmap: list[list], row: int, column: int, connectors: list) -> bool:
-    """Checks to see if the current tile is completely surrounded by road connecting terrain."""
-    return rawmap[column - 1][row].upper() in connectors and rawmap[column][row - 1].upper() in connectors and rawmap[column + 1][row].upper() in connectors and rawmap[column][row + 1].upper() in connectors
-
-def __north_intersection(rawmap: list[list], row: int, column: int, connectors: list) -> bool:
-    """Checks to see if the current tile is surrounded by road connecting terrain, except on its south side."""
-    return rawmap[column - 1][row].upper() in connectors and rawmap[column][row + 1].upper() in connectors and rawmap[column][row - 1].upper() in connectors
-
-def __east_intersection(rawmap: list[list], row: int, column: int, connectors: list) -> bool:
-    """Checks to see if the current tile is surrounded by road connecting terrain, except on its west side."""
-    return rawmap[column][row - 1].upper() in connectors and rawmap[column + 1][row].upper() in connectors and rawmap[column - 1][row].upper() in connectors
-
-def __south_intersection(rawmap: list[list], row: int, column: int, connectors: list) -> bool:
-    """Checks to see if the current tile is surrounded by road connecting terrain, except on its north side."""
-    return rawmap[column + 1][row].upper() in connectors and rawmap[column][row + 1].upper() in connectors and rawmap[column][row - 1].upper() in connectors
-
-def __west_intersection(rawmap: list[list], row: int, column: int, connectors: list) -> bool:
-    """Checks to see if the current tile is surrounded by road connecting terrain, except on its east side."""
-    return rawmap[column][row + 1].upper() in connectors and rawmap[column + 1][row].upper() in connectors and rawmap[column - 1][row].upper() in connectors
-
-def __north_east_turn(rawmap: list[list], row: int, column: int, connectors: list) -> bool:
-    """Checks to see if the current tile has road connecting terrain on its north and east sides."""
-    return rawmap[column - 1][row].upper() in connectors and rawmap[column][row + 1].upper() in connectors
-
-def __north_west_turn(rawmap: list[list], row: int, column: int, connectors: list) -> bool:
-    """Checks to see if the current tile has road connecting terrain on its north and west sides."""
-    return rawmap[column - 1][row].upper() in connectors and rawmap[column][row - 1].upper() in connectors
-
-def __south_east_turn(rawmap: list[list], row: int, column: int, connectors: list) -> bool:
-    """Checks to see if the current tile has road connecting terrain on its south and east sides."""
-    return rawmap[column + 1][row].upper() in connectors and rawmap[column][row + 1].upper() in connectors
-
-def __south_west_turn(rawmap: list[list], row: int, column: int, connectors: list) -> bool:
-    """Checks to see if the current tile has road connecting terrain on its south and west sides."""
-    return rawmap[column + 1][row].upper() in connectors and rawmap[column][row - 1].upper() in connectors
-
-def __bridge_salt_ns(rawmap: list[list], row: int, column: int) -> bool:
-    """Checks to see if the current tile has salt water on its east and west sides."""
-    return rawmap[column][row - 1].upper() == 'O' and rawmap[column][row + 1].upper() == 'O'
-
-def __bridge_salt_we(rawmap: list[list], row: int, column: int) -> bool:
-    """Checks to see if the current tile has salt water on its south and north sides."""
-    return rawmap[column - 1][row].upper() == 'O' and rawmap[column + 1][row].upper() == 'O'
-
-def __bridge_fresh_ns(rawmap: list[list], row: int, column: int) -> bool:
-    """Checks to see if the current tile has fresh water on its east and west sides."""
-    return rawmap[column][row - 1].upper() == 'L' and rawmap[column][row + 1].upper() == 'L'
-
-def __bridge_fresh_we(rawmap: list[list], row: int, column: int) -> bool:
-    """Checks to see if the current tile has fresh water on its south and north sides."""
-    return rawmap[column - 1][row].upper() == 'L' and rawmap[column + 1][row].upper() == 'L'
-
-def __horizontal_line(rawmap: list[list], row: int, column: int, connectors: list) -> bool:
-    """Checks to see if the current tile has road connecting terrain on its east and west sides."""
-    return rawmap[column - 1][row].upper() in connectors or rawmap[column + 1][row].upper() in connectors
-
-def __vertical_line(rawmap: list[list], row: int, column: int, connectors: list) -> bool:
-    """Checks to see if the current tile has road connecting terrain on its north and south sides."""
-    return rawmap[column][row - 1].upper() in connectors or rawmap[column][row + 1].upper() in connectors
-
-def __top_left_corner(rawmap: list[list], row: int, column: int, roadconnectors: list) -> str:
-    """Returns appropriate road type, without looking into non-existing locations compared to the top left corner of the map."""
-    if __south_east_turn(rawmap, row, column, roadconnectors):
-        return 'RSE'
-    elif rawmap[column][row + 1].upper() in roadconnectors:
-        return 'RWE'
-    return 'RNS'
-
-def __bottom_left_corner(rawmap: list[list], row: int, column: int, roadconnectors: list) -> str:
-    """Returns appropriate road type, without looking into non-existing locations compared to the bottom left corner of the map."""
-    if __north_east_turn(rawmap, row, column, roadconnectors):
-        return 'RNE'
-    elif rawmap[column][row + 1].upper() in roadconnectors:
-        return 'RWE'
-    return 'RNS'
-
-def __left_column(rawmap: list[list], row: int, column: int, roadconnectors: list) -> str:
-    """Returns appropriate road type, based on what can be found on the left-most column of the map."""
-    if __west_intersection(rawmap, row, column, roadconnectors):
-        return 'RWI'
-    elif __north_east_turn(rawmap, row, column, roadconnectors):
-        return 'RNE'
-    elif __south_east_turn(rawmap, row, column, roadconnectors):
-        return 'RSE'
-    elif __bridge_salt_we(rawmap, row, column):
-        return 'BSWE'
-    elif __bridge_fresh_we(rawmap, row, column):
-        return 'BFWE'
-    elif __horizontal_line(rawmap, row, column, roadconnectors):
-        return 'RNS'
-    return 'RWE'
-
-def __top_right_corner(rawmap: list[list], row: int, column: int, roadconnectors: list) -> str:
-    """Returns appropriate road type, without looking into non-existing locations compared to the top right corner of the map."""
-    if __south_west_turn(rawmap, row, column, roadconnectors):
-        return 'RSW'
-    elif rawmap[column][row - 1].upper() in roadconnectors:
-        return 'RWE'
-    return 'RNS'
-
-def __bottom_right_corner(rawmap: list[list], row: int, column: int, roadconnectors: list) -> str:
-    """Returns appropriate road type, without looking into non-existing locations compared to the bottom right corner of the map."""
-    if __north_west_turn(rawmap, row, column, roadconnectors):
-        return 'RNW'
-    elif rawmap[column][row - 1].upper() in roadconnectors:
-        return 'RWE'
-    return 'RNS'
-
-def __right_column(rawmap: list[list], row: int, column: int, roadconnectors: list) -> str:
-    """Returns appropriate road type, based on what can be found on the right-most column of the map."""
-    if __east_intersection(rawmap, row, column, roadconnectors):
-        return 'REI'
-    elif __north_west_turn(rawmap, row, column, roadconnectors):
-        return 'RNW'
-    elif __south_west_turn(rawmap, row, column, roadconnectors):
-        return 'RSW'
-    elif __bridge_salt_we(rawmap, row, column):
-        return 'BSWE'
-    elif __bridge_fresh_we(rawmap, row, column):
-        return 'BFWE'
-    elif __horizontal_line(rawmap, row, column, roadconnectors):
-        return 'RNS'
-    return 'RWE'
-
-def __top_row(rawmap: list[list], row: int, column: int, roadconnectors: list) -> str:
-    """Returns appropriate road type, based on what can be found on the top-most column of the map."""
-    if __south_intersection(rawmap, row, column, roadconnectors):
-        return 'RSI'
-    elif __south_east_turn(rawmap, row, column, roadconnectors):
-        return 'RSE'
-    elif __south_west_turn(rawmap, row, column, roadconnectors):
-        return 'RSW'
-    elif __bridge_salt_ns(rawmap, row, column):
-        return 'BSNS'
-    elif __bridge_fresh_ns(rawmap, row, column):
-        return 'BFNS'
-    elif __vertical_line(rawmap, row, column, roadconnectors):
-        return 'RWE'
-    return 'RNS'
-
-def __bottom_row(rawmap: list[list], row: int, column: int, roadconnectors: list) -> str:
-    """Returns appropriate road type, based on what can be found on the bottom-most column of the map."""
-    if __north_intersection(rawmap, row, column, roadconnectors):
-        return 'RNI'
-    elif __north_east_turn(rawmap, row, column, roadconnectors):
-        return 'RNE'
-    elif __north_west_turn(rawmap, row, column, roadconnectors):
-        return 'RNW'
-    elif __bridge_salt_ns(rawmap, row, column):
-        return 'BSNS'
-    elif __bridge_fresh_ns(rawmap, row, column):
-        return 'BFNS'
-    elif __vertical_line(rawmap, row, column, roadconnectors):
-        return 'RWE'
-    return 'RNS'
-
-def __center_roads(rawmap: list[list], row: int, column: int, roadconnectors: list) -> str:
-    """Returns appropriate road type, without any precautions for overflow or out of bounds issues."""
-    if __complete_intersection(rawmap, row, column, roadconnectors):
-        return 'RCI'
-    elif __north_intersection(rawmap, row, column, roadconnectors):
-        return 'RNI'
-    elif __east_intersection(rawmap, row, column, roadconnectors):
-        return 'REI'
-    elif __south_intersection(rawmap, row, column, roadconnectors):
-        return 'RSI'
-    elif __west_intersection(rawmap, row, column, roadconnectors):
-        return 'RWI'
-    elif __north_east_turn(rawmap, row, column, roadconnectors):
-        return 'RNE'
-    elif __north_west_turn(rawmap, row, column, roadconnectors):
-        return 'RNW'
-    elif __south_east_turn(rawmap, row, column, roadconnectors):
-        return 'RSE'
-    elif __south_west_turn(rawmap, row, column, roadconnectors):
-        return 'RSW'
-    elif __bridge_salt_ns(rawmap, row, column):
-        return 'BSNS'
-    elif __bridge_salt_we(rawmap, row, column):
-        return 'BSWE'
-    elif __bridge_fresh_ns(rawmap, row, column):
-        return 'BFNS'
-    elif __bridge_fresh_we(rawmap, row, column):
-        return 'BFWE'
-    elif __horizontal_line(rawmap, row, column, roadconnectors):
+class TerrainColumn:
+    """Class for a single column of the terrain grid, so tiles can be reached as terrainmap[x][y]."""
+    def __init__(self, grid: object, x: int):
+        self.grid = grid
+        self.x = x
+
+    def __getitem__(self, y: int) -> Terrain:
+        """Returns a view on the terrain of the given row of the column."""
+        return Terrain(self.grid, self.x, y)
+
+    def __len__(self) -> int:
+        """Returns the height of the column."""
+        return self.grid.yrn
+
+class TerrainChunk:
+    """Class for the changing state of a CHUNK by CHUNK region of the terrain grid: the owner and capture health of its tiles.
+        It starts out as a copy of the original owners of the grid, and is marked dirty once anything on it really changes."""
+    def __init__(self, grid: object, cx: int, cy: int):
+        self.owners = array('B', bytes(CHUNK * CHUNK))
+        self.health = array('d', bytes(8 * CHUNK * CHUNK))
+        self.dirty = False
+        height = min(CHUNK, grid.yrn - cy * CHUNK)
+        for lx in range(min(CHUNK, grid.xrn - cx * CHUNK)):
+            start = (cx * CHUNK + lx) * grid.yrn + cy * CHUNK
+            self.owners[lx * CHUNK:lx * CHUNK + height] = array('B', grid.owners[start:start + height])
+            self.health[lx * CHUNK:lx * CHUNK + height] = array('d', [KINDS[kind].health for kind in grid.kinds[start:start + height]])
+
+    def copy(self) -> object:
+        """Returns an independent copy of the chunk."""
+        chunk = TerrainChunk.__new__(TerrainChunk)
+        chunk.owners, chunk.health, chunk.dirty = array('B', self.owners), array('d', self.health), self.dirty
+        return chunk
+
+    def change(self, values: str, local: int, value: object) -> None:
+        """Sets a value of the tile on the given position of the chunk, marking the chunk dirty if the value differs from the current one."""
+        values = getattr(self, values)
+        if values[local] != value:
+            values[local] = value
+            self.dirty = True
+
+class TerrainGrid:
+    """Class for storing the terrain of the whole map: the id of the kind and the original owner of every tile, stored column by column the same way they are indexed as terrainmap[x][y].
+        These can be read straight out of a memory mapped compiled map, since they never change. The owners and capture health that do change are only
+        set up chunk by chunk, once a tile of the chunk is looked at. Chunks nothing has changed on are dropped again when they were the least recently used,
+        so only the part of the map in use is kept in memory."""
+    CAPACITY = 64                   #Number of unchanged chunks kept before the least recently used ones are dropped.
+
+    def __init__(self, xrn: int, yrn: int, kinds: array, owners: array):
+        self.xrn = xrn
+        self.yrn = yrn
+        self.kinds = kinds
+        self.owners = owners
+        self.chunks = OrderedDict()     #Chunks that are set up, by their location, from the least to the most recently used.
+        self.hash = 0                   #Zobrist hash of the tiles that differ from how the map started.
+        self.changed = {}               #Owner id and capture health of every tile that differs from how the map started, by its location.
+        self.columns = [TerrainColumn(self, x) for x in range(xrn)]
+
+    def __getitem__(self, x: int) -> TerrainColumn:
+        """Returns the given column of the grid."""
+        return self.columns[x]
+
+    def __len__(self) -> int:
+        """Returns the width of the grid."""
+        return self.xrn
+
+    def copy(self) -> object:
+        """Returns an independent copy of the grid, which shares the unchanging kinds and original owners, but only copies the chunks something has changed on."""
+        grid = TerrainGrid(self.xrn, self.yrn, self.kinds, self.owners)
+        grid.chunks = OrderedDict((key, chunk.copy()) for key, chunk in self.chunks.items() if chunk.dirty)
+        grid.hash, grid.changed = self.hash, dict(self.changed)
+        return grid
+
+    def changes(self) -> tuple:
+        """Returns every tile whose owner or capture health differs from how the map started, as (x, y, owner id, health) tuples."""
+        return tuple((x, y, owner, health) for (x, y), (owner, health) in self.changed.items())
+
+    def restore(self, changes: tuple) -> None:
+        """Sets the grid to the given changes from how the map started, in the same form as the changes function returns them.
+            Only the tiles that differ between the grid and the changes are written, every other chunk is kept as it is."""
+        target = {(x, y): (owner, health) for x, y, owner, health in changes}
+        for x, y in [position for position in self.changed if position not in target]:
+            ind = x * self.yrn + y
+            self.set_tile(x, y, self.owners[ind], KINDS[self.kinds[ind]].health)
+        for (x, y), values in target.items():
+            if self.changed.get((x, y)) != values:
+                self.set_tile(x, y, *values)
+
+    def change(self, x: int, y: int, values: str, value: object) -> None:
+        """Sets the owner id or the capture health of the tile on the given location, keeping the hash of the grid up to date."""
+        chunk, local = self.chunk(x, y), (x % CHUNK) * CHUNK + y % CHUNK
+        before = (chunk.owners[local], chunk.health[local])
+        chunk.change(values, local, value)
+        self.rehash(x, y, before, (chunk.owners[local], chunk.health[local]))
+
+    def set_tile(self, x: int, y: int, owner: int, health: float) -> None:
+        """Sets both the owner id and the capture health of the tile on the given location, keeping the hash of the grid up to date."""
+        chunk, local = self.chunk(x, y), (x % CHUNK) * CHUNK + y % CHUNK
+        before = (chunk.owners[local], chunk.health[local])
+        chunk.change("owners", local, owner)
+        chunk.change("health", local, health)
+        self.rehash(x, y, before, (owner, health))
+
+    def rehash(self, x: int, y: int, before: tuple, after: tuple) -> None:
+        """Swaps the key of the tile with its owner id and capture health before a change for the one after it, and keeps track of the changed tiles."""
+        if before != after:
+            key = self.tile_key(x, y, *after)
+            self.hash ^= self.tile_key(x, y, *before) ^ key
+            if key == 0:
+                self.changed.pop((x, y), None)
+            else:
+                self.changed[(x, y)] = after
+
+    def tile_key(self, x: int, y: int, owner: int, health: float) -> int:
+        """Returns the Zobrist key of the tile with the given owner id and capture health, or 0 if that is how the map started."""
+        ind = x * self.yrn + y
+        if owner == self.owners[ind] and health == KINDS[self.kinds[ind]].health:
+            return 0
+        return zobrist.key("terrain", x, y, owner, health)
+
+    def chunk(self, x: int, y: int) -> TerrainChunk:
+        """Returns the chunk the given location is in, setting it up if it isn't yet."""
+        key = (x // CHUNK, y // CHUNK)
+        chunk = self.chunks.get(key)
+        if chunk is None:
+            chunk = self.chunks[key] = TerrainChunk(self, *key)
+            self.evict()
+        else:
+            self.chunks.move_to_end(key)
+        return chunk
+
+    def evict(self) -> None:
+        """Drops the least recently used chunks that nothing has changed on, until only as many of them are kept as the capacity allows."""
+        clean = [key for key, chunk in self.chunks.items() if not chunk.dirty]
+        for key in clean[:len(clean) - self.CAPACITY]:
+            del self.chunks[key]
+
+    def kind_at(self, x: int, y: int) -> TerrainKind:
+        """Returns the kind of the terrain on the given location, without creating a view for it."""
+        return KINDS[self.kinds[x * self.yrn + y]]
+
+    def locations(self, identifier: str, team: str = "any") -> list:
+        """Returns every location with the given kind of terrain, optionally only the ones owned by the given team."""
+        kind, kinds = KIND_IDS[identifier], bytes(self.kinds)
+        found, ind = [], kinds.find(kind)
+        while ind != -1:
+            if team == "any" or self[ind // self.yrn][ind % self.yrn].team == team:
+                found.append((ind // self.yrn, ind % self.yrn))
+            ind = kinds.find(kind, ind + 1)
+        return found
+
+NORTH, EAST, SOUTH, WEST = 1, 2, 4, 8          #Bits of the neighbour masks.
+ROAD_DEFAULTS = ["RCI", "RWE", "RNS"]           #Road used when nothing connects to it: inside the map, on its left or right edge, anywhere else on its border.
+ROAD_TURNS = [(NORTH | EAST | SOUTH | WEST, "RCI"), (NORTH | EAST | WEST, "RNI"), (NORTH | SOUTH | WEST, "REI"), (EAST | SOUTH | WEST, "RSI"),
+        (NORTH | EAST | SOUTH, "RWI"), (NORTH | EAST, "RNE"), (NORTH | WEST, "RNW"), (SOUTH | EAST, "RSE"), (SOUTH | WEST, "RSW")]
+SALT_WE, SALT_NS, FRESH_WE, FRESH_NS = 1, 2, 4, 8                                       #Bits of the bridge masks, for water on both opposite sides.
+BRIDGES = [(SALT_WE, "BSNS"), (SALT_NS, "BSWE"), (FRESH_WE, "BFNS"), (FRESH_NS, "BFWE")]
+__NOT_CONNECTOR = re.compile("[^R12CAWHrcawh]")     #Everything but the valid road connecting terrain types.
+__NOT_SALT = re.compile("[^Oo]")
+__NOT_FRESH = re.compile("[^Ll]")
+__CONNECTOR_BITS = str.maketrans("R12CAWHrcawh", "111111111111")
+__WATER_BITS = str.maketrans("OoLl", "1111")
+
+def __road_rule(connections: int, bridges: int, default: str) -> str:
+    """Returns the road or bridge for the given neighbour and bridge masks: intersections and turns come first, then bridges, then straight roads."""
+    for needed, road in ROAD_TURNS:
+        if connections & needed == needed:
+            return road
+    for needed, bridge in BRIDGES:
+        if bridges & needed:
+            return bridge
+    if connections & (NORTH | SOUTH):
         return 'RNS'
-    elif __vertical_line(rawmap, row, column, roadconnectors):
+    elif connections & (EAST | WEST):
         return 'RWE'
-    return 'RCI'
-
-def __road_connections(rawmap: list[list], row: int, column: int, x: int, y: int) -> str:
-    """Returns appropriate road type, based on row and column numbers and exact positions of the current road."""
-    roadconnectors = ['R', '1', '2', 'C', 'A', 'W', 'H'] #VALID ROAD CONNECTING TERRAIN TYPES
-    if row == 0:
-        if column == 0:
-            return __top_left_corner(rawmap, row, column, roadconnectors)
-        elif column == y - 1:
-            return __bottom_left_corner(rawmap, row, column, roadconnectors)
-        else:
-            return __left_column(rawmap, row, column, roadconnectors)
-    elif row == x - 1:
-        if column == 0:
-            return __top_right_corner(rawmap, row, column, roadconnectors)
-        elif column == y - 1:
-            return __bottom_right_corner(rawmap, row, column, roadconnectors)
-        else:
-            return __right_column(rawmap, row, column, roadconnectors)
-    else:
-        if column == 0:
-            return __top_row(rawmap, row, column, roadconnectors)
-        elif column == y - 1:
-            return __bottom_row(rawmap, row, column, roadconnectors)
-        else:
-            return __center_roads(rawmap, row, column, roadconnectors)
+    return default
+
+ROAD_TABLE = [__road_rule(connections, bridges, default) for default in ROAD_DEFAULTS for connections in range(16) for bridges in range(16)]  #Road for every (default, neighbour mask, bridge mask).
+
+def __row_bits(line: str, pattern: object, bits: dict) -> int:
+    """Turns a line of the raw map into a number, where the bit of each column is set if the tile there matches."""
+    return int("0" + pattern.sub("0", line).translate(bits)[::-1], 2)
+
+def __road_connections(rawmap: list[list], xrn: int, yrn: int) -> dict:
+    """Picks the road or bridge for every road tile of the map at once, and returns them by location.
+        Every line is turned into bit masks of connecting terrain and water, so the neighbours of a tile are just shifted bits of the lines around it."""
+    connectors = [__row_bits(line, __NOT_CONNECTOR, __CONNECTOR_BITS) for line in rawmap] + [0]
+    salt = [__row_bits(line, __NOT_SALT, __WATER_BITS) for line in rawmap] + [0]
+    fresh = [__row_bits(line, __NOT_FRESH, __WATER_BITS) for line in rawmap] + [0]
+    roads = {}
+    for column in range(yrn):
+        north, south = connectors[column - 1] if column > 0 else 0, connectors[column + 1]
+        salt_ns = salt[column - 1] & salt[column + 1] if column > 0 else 0
+        fresh_ns = fresh[column - 1] & fresh[column + 1] if column > 0 else 0
+        salt_we, fresh_we = (salt[column] << 1) & (salt[column] >> 1), (fresh[column] << 1) & (fresh[column] >> 1)
+        for found in re.finditer("[Rr]", rawmap[column]):
+            row = found.start()
+            connections = (north >> row & 1) * NORTH | (connectors[column] >> (row + 1) & 1) * EAST | (south >> row & 1) * SOUTH | (connectors[column] << 1 >> row & 1) * WEST
+            bridges = (salt_we >> row & 1) * SALT_WE | (salt_ns >> row & 1) * SALT_NS | (fresh_we >> row & 1) * FRESH_WE | (fresh_ns >> row & 1) * FRESH_NS
+            if row == 0 or row == xrn - 1:
+                default = 1 if 0 < column < yrn - 1 else 2
+            else:
+                default = 0 if 0 < column < yrn - 1 else 2
+            roads[(row, column)] = ROAD_TABLE[(default * 16 + connections) * 16 + bridges]
+    return roads
 
-def __block_translator(onblock: str, window: object, onwindow: tuple) -> Terrain:
-    """Function that takes processed terrain map data and returns with its appropriate version after drawing it on the displayed map.
+def __block_translator(onblock: str) -> tuple:
+    """Function that takes processed terrain map data and returns with the id of its kind and the id of its owner.
         Safely retuns with salt water terrain type, if it couldn't detect any type of valid terrain data."""
-    images = __TerrainImages()
-    if onblock == "O":
-        window.blit(images.SALTWATER, onwindow)
-        return Terrain(onblock, "Saltwater", 0, {"Foot": 0, "Wheels": 0, "Tracks": 0}, False, None)
-    elif onblock == "L":
-        window.blit(images.FRESHWATER, onwindow)
-        return Terrain(onblock, "Freshwater", 0, {"Foot": 2, "Wheels": 0, "Tracks": 0}, False, None)
-    elif onblock == "P":
-        window.blit(images.PLAINS, onwindow)
-        return Terrain(onblock, "Plains", 1, {"Foot": 1, "Wheels": 2, "Tracks": 1}, False, None)
-    elif onblock == "S":
-        window.blit(images.SWAMP, onwindow)
-        return Terrain(onblock, "Swamp", 1, {"Foot": 2, "Wheels": 3, "Tracks": 1}, False, None)
-    elif onblock == "F":
-        window.blit(images.FOREST, onwindow)
-        return Terrain(onblock, "Forest", 2, {"Foot": 1, "Wheels": 3, "Tracks": 2}, False, None)
-    elif onblock == "M":
-        window.blit(images.MOUNTAIN, onwindow)
-        return Terrain(onblock, "Mountain", 4, {"Foot": 2, "Wheels": 0, "Tracks": 0}, False, None)
-    elif onblock == "D":
-        window.blit(images.DEBRIS, onwindow)
-        return Terrain(onblock, "Wreckage", 2, {"Foot": 2, "Wheels": 2, "Tracks": 1}, False, None)
-    elif onblock == "A":
-        window.blit(images.ABANDONED_CITY, onwindow)
-        return Terrain(onblock, "Ghost Town", 3, {"Foot": 1, "Wheels": 2, "Tracks": 1}, False, None)
-    elif onblock == "C":
-        window.blit(images.CITY_NEUTRAL, onwindow)
-        return Terrain(onblock, "City", 3, {"Foot": 1, "Wheels": 1, "Tracks": 1}, True, None)
-    elif onblock == "1":
-        window.blit(images.CITY_1, onwindow)
-        return Terrain('C', "City", 3, {"Foot": 1, "Wheels": 1, "Tracks": 1}, True, "Red")
+    if onblock == "1":
+        return KIND_IDS["C"], OWNERS.index("Red")
     elif onblock == "2":
-        window.blit(images.CITY_2, onwindow)
-        return Terrain('C', "City", 3, {"Foot": 1, "Wheels": 1, "Tracks": 1}, True, "Blue")
-    elif onblock == "W":
-        window.blit(images.WORKSHOP_NEUTRAL, onwindow)
-        return Terrain(onblock, "Factory", 3, {"Foot": 1, "Wheels": 1, "Tracks": 1}, True, None)
+        return KIND_IDS["C"], OWNERS.index("Blue")
     elif onblock == "HQ1":
-        window.blit(images.HQ_1, onwindow)
-        return Terrain('H', "Headquarters", 3,{"Foot": 1, "Wheels": 1, "Tracks": 1}, True, "Red")
+        return KIND_IDS["H"], OWNERS.index("Red")
     elif onblock == "HQ2":
-        window.blit(images.HQ_2, onwindow)
-        return Terrain('H', "Headquarters", 3, {"Foot": 1, "Wheels": 1, "Tracks": 1}, True, "Blue")
-    elif onblock == "RNS":
-        window.blit(images.ROAD_NORTHSOUTH, onwindow)
-        return Terrain(onblock, "Road", 0, {"Foot": 1, "Wheels": 1, "Tracks": 1}, False, None)
-    elif onblock == "RWE":
-        window.blit(images.ROAD_WESTEAST, onwindow)
-        return Terrain(onblock, "Road", 0, {"Foot": 1, "Wheels": 1, "Tracks": 1}, False, None)
-    elif onblock == "RNE":
-        window.blit(images.ROAD_NORTHEAST, onwindow)
-        return Terrain(onblock, "Road", 0, {"Foot": 1, "Wheels": 1, "Tracks": 1}, False, None)
-    elif onblock == "RNW":
-        window.blit(images.ROAD_NORTHWEST, onwindow)
-        return Terrain(onblock, "Road", 0, {"Foot": 1, "Wheels": 1, "Tracks": 1}, False, None)
-    elif onblock == "RSE":
-        window.blit(images.ROAD_SOUTHEAST, onwindow)
-        return Terrain(onblock, "Road", 0, {"Foot": 1, "Wheels": 1, "Tracks": 1}, False, None)
-    elif onblock == "RSW":
-        window.blit(images.ROAD_SOUTHWEST, onwindow)
-        return Terrain(onblock, "Road", 0, {"Foot": 1, "Wheels": 1, "Tracks": 1}, False, None)
-    elif onblock == "RNI":
-        window.blit(images.ROAD_NORTHINTERSECTION, onwindow)
-        return Terrain(onblock, "Road", 0, {"Foot": 1, "Wheels": 1, "Tracks": 1}, False, None)
-    elif onblock == "REI":
-        window.blit(images.ROAD_EASTINTERSECTION, onwindow)
-        return Terrain(onblock, "Road", 0, {"Foot": 1, "Wheels": 1, "Tracks": 1}, False, None)
-    elif onblock == "RSI":
-        window.blit(images.ROAD_SOUTHINTERSECTION, onwindow)
-        return Terrain(onblock, "Road", 0, {"Foot": 1, "Wheels": 1, "Tracks": 1}, False, None)
-    elif onblock == "RWI":
-        window.blit(images.ROAD_WESTINTERSECTION, onwindow)
-        return Terrain(onblock, "Road", 0, {"Foot": 1, "Wheels": 1, "Tracks": 1}, False, None)
-    elif onblock == "RCI":
-        window.blit(images.ROAD_FULLINTERSECTION, onwindow)
-        return Terrain(onblock, "Road", 0, {"Foot": 1, "Wheels": 1, "Tracks": 1}, False, None)
-    elif onblock == "BSNS":
-        window.blit(images.BRIDGE_SALT_NORTHSOUTH, onwindow)
-        return Terrain(onblock, "Bridge", 0, {"Foot": 1, "Wheels": 1, "Tracks": 1}, False, None)
-    elif onblock == "BSWE":
-        window.blit(images.BRIDGE_SALT_WESTEAST, onwindow)
-        return Terrain(onblock, "Bridge", 0, {"Foot": 1, "Wheels": 1, "Tracks": 1}, False, None)
-    elif onblock == "BFNS":
-        window.blit(images.BRIDGE_FRESH_NORTHSOUTH, onwindow)
-        return Terrain(onblock, "Bridge", 0, {"Foot": 1, "Wheels": 1, "Tracks": 1}, False, None)
-    elif onblock == "BFWE":
-        window.blit(images.BRIDGE_FRESH_WESTEAST, onwindow)
-        return Terrain(onblock, "Bridge", 0, {"Foot": 1, "Wheels": 1, "Tracks": 1}, False, None)
-    window.blit(images.SALTWATER, onwindow)
-    return Terrain('O', "Saltwater", 0, {"Foot": 0, "Wheels": 0, "Tracks": 0}, False, None)
-
-def block_draw(onblock: str, window: object, onwindow: tuple) -> None:
+        return KIND_IDS["H"], OWNERS.index("Blue")
+    return KIND_IDS.get(onblock, KIND_IDS["O"]), OWNERS.index(None)
+
+def block_draw(onblock: Terrain, window: object, onwindow: tuple) -> None:
     """Function that takes processed terrain map data, and draws it on the displayed windows."""
-    images = __TerrainImages()
-    if onblock.team == None:
-        if onblock.identifier == "O":
-            window.blit(images.SALTWATER, onwindow)
-        elif onblock.identifier == "L":
-            window.blit(images.FRESHWATER, onwindow)
-        elif onblock.identifier == "P":
-            window.blit(images.PLAINS, onwindow)
-        elif onblock.identifier == "S":
-            window.blit(images.SWAMP, onwindow)
-        elif onblock.identifier == "F":
-            window.blit(images.FOREST, onwindow)
-        elif onblock.identifier == "M":
-            window.blit(images.MOUNTAIN, onwindow)
-        elif onblock.identifier == "D":
-            window.blit(images.DEBRIS, onwindow)
-        elif onblock.identifier == "A":
-            window.blit(images.ABANDONED_CITY, onwindow)
-        elif onblock.identifier == "C":
-            window.blit(images.CITY_NEUTRAL, onwindow)
-        elif onblock.identifier == "W":
-            window.blit(images.WORKSHOP_NEUTRAL, onwindow)
-        elif onblock.identifier == "RNS":
-            window.blit(images.ROAD_NORTHSOUTH, onwindow)
-        elif onblock.identifier == "RWE":
-            window.blit(images.ROAD_WESTEAST, onwindow)
-        elif onblock.identifier == "RNE":
-            window.blit(images.ROAD_NORTHEAST, onwindow)
-        elif onblock.identifier == "RNW":
-            window.blit(images.ROAD_NORTHWEST, onwindow)
-        elif onblock.identifier == "RSE":
-            window.blit(images.ROAD_SOUTHEAST, onwindow)
-        elif onblock.identifier == "RSW":
-            window.blit(images.ROAD_SOUTHWEST, onwindow)
-        elif onblock.identifier == "RNI":
-            window.blit(images.ROAD_NORTHINTERSECTION, onwindow)
-        elif onblock.identifier == "REI":
-            window.blit(images.ROAD_EASTINTERSECTION, onwindow)
-        elif onblock.identifier == "RSI":
-            window.blit(images.ROAD_SOUTHINTERSECTION, onwindow)
-        elif onblock.identifier == "RWI":
-            window.blit(images.ROAD_WESTINTERSECTION, onwindow)
-        elif onblock.identifier == "RCI":
-            window.blit(images.ROAD_FULLINTERSECTION, onwindow)
-        elif onblock.identifier == "BSNS":
-            window.blit(images.BRIDGE_SALT_NORTHSOUTH, onwindow)
-        elif onblock.identifier == "BSWE":
-            window.blit(images.BRIDGE_SALT_WESTEAST, onwindow)
-        elif onblock.identifier == "BFNS":
-            window.blit(images.BRIDGE_FRESH_NORTHSOUTH, onwindow)
-        elif onblock.identifier == "BFWE":
-            window.blit(images.BRIDGE_FRESH_WESTEAST, onwindow)
-    elif onblock.team == "Red":
-        if onblock.identifier == "H":
-            window.blit(images.HQ_1, onwindow)
-        elif onblock.identifier == "W":
-            window.blit(images.WORKSHOP_1, onwindow)
-        elif onblock.identifier == "C":
-            window.blit(images.CITY_1, onwindow)
-    elif onblock.team == "Blue":
-        if onblock.identifier == "H":
-            window.blit(images.HQ_2, onwindow)
-        elif onblock.identifier == "W":
-            window.blit(images.WORKSHOP_2, onwindow)
-        elif onblock.identifier == "C":
-            window.blit(images.CITY_2, onwindow)
+    window.blit(sprites.get("Terrain", onblock.team, onblock.identifier), onwindow)
 
 def __map_processor(rawmap: list[list], xrn: int, yrn: int) -> tuple:
     """Function that takes in the raw terrain map data, then returns with the number of allied buildings a team has and with the processed map datas."""
     procmap = [['O' for i in range(yrn)] for j in range(xrn)]
     team_buildings = [1, 1]
     hqnum = 0
+    roads = __road_connections(rawmap, xrn, yrn)
     for row in range(xrn):
         for column in range(yrn):
             tile = rawmap[column][row].upper()
@@ -474,12 +424,31 @@ def __map_processor(rawmap: list[list], xrn: int, yrn: int) -> tuple:
                 team_buildings[1] += 1
                 procmap[row][column] = '2'
             elif tile == 'R':
-                procmap[row][column] = __road_connections(rawmap, row, column, xrn, yrn)
+                procmap[row][column] = roads[(row, column)]
             else:
                 procmap[row][column] = tile
     return team_buildings, procmap
 
-def drawadd(window: object, BLOCK: int, rawmap: list[list], xrn: int, yrn: int) -> tuple:
-    """Function that takes in all the raw terrain data and returns with the number of allied buildings a team has and with the processed map datas."""
+def construct(rawmap: list[list], xrn: int, yrn: int) -> tuple:
+    """Function that takes in all the raw terrain data and returns with the number of allied buildings a team has and with the terrain map, without drawing anything."""
     team_buildings, procmap = __map_processor(rawmap, xrn, yrn)
-    return team_buildings, [[__block_translator(procmap[xon][yon], window, (xon * BLOCK, yon * BLOCK)) for yon in range(yrn)] for xon in range(xrn)]
\ No newline at end of file
+    kinds, owners = array('B'), array('B')
+    for xon in range(xrn):
+        for yon in range(yrn):
+            kind, owner = __block_translator(procmap[xon][yon])
+            kinds.append(kind)
+            owners.append(owner)
+    return team_buildings, TerrainGrid(xrn, yrn, kinds, owners)
+
+def from_compiled(compiled: object) -> tuple:
+    """Function that takes in a compiled map and returns with the number of allied buildings a team has and with the terrain map, skipping all processing.
+        The kinds and owners of the terrain are used as they are, every change is kept in the chunks of the terrain map."""
+    return list(compiled.team_buildings), TerrainGrid(compiled.xrn, compiled.yrn, compiled.kinds, compiled.owners)
+
+def map_draw(window: object, BLOCK: int, terrainmap: list[list], area: tuple = None) -> None:
+    """Function that draws every terrain of the terrain map on the displayed window.
+        If an area is given as (x, y, width, height), only its terrains are drawn, with its top left corner drawn on the top left of the window."""
+    xstart, ystart, width, height = (0, 0, len(terrainmap), len(terrainmap[0])) if area is None else area
+    for xon in range(max(xstart, 0), min(xstart + width, len(terrainmap))):
+        for yon in range(max(ystart, 0), min(ystart + height, len(terrainmap[xon]))):
+            block_draw(terrainmap[xon][yon], window, ((xon - xstart) * BLOCK, (yon - ystart) * BLOCK))
\ No newline at end of file
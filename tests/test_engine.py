@@ -0,0 +1,163 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import engine
+import pathing
+import units
+from engine import Index
+
+#Red HQ on the top left, Blue HQ on the bottom right and a mountain ridge in the middle that wheels can't cross.
+RAWMAP = ["HPPPPP",
+          "PPMMPP",
+          "PPPMPP",
+          "PPPPPH"]
+
+def new_game(seed: int = 0) -> engine.GameState:
+    """Returns with a fresh match on the test map."""
+    return engine.new_game(RAWMAP, len(RAWMAP[0]), len(RAWMAP), seed)
+
+def put(state: engine.GameState, on: tuple, team: str, type: str = "Gunner") -> units.Unit:
+    """Places a ready unit of the given team on the location, taking off the unit that was there."""
+    if state.unit_at(Index(*on)) is not None:
+        state.remove_unit(Index(*on))
+    unit = units.spawn_unit(team, type)
+    unit.reset_actions()
+    state.place_unit(Index(*on), unit)
+    return unit
+
+def set_health(state: engine.GameState, on: tuple, health: float) -> None:
+    """Changes the health of the unit on the location, keeping the hash of the units in sync."""
+    state.toggle_unit(Index(*on))
+    state.unit_at(Index(*on)).health = health
+    state.toggle_unit(Index(*on))
+
+class CaptureTest(unittest.TestCase):
+    """Checks that capturing the enemy HQ takes two turns of a full health unit and wins the match."""
+    def test_hq_capture_wins(self):
+        state = new_game()
+        state.remove_unit(Index(5, 3))
+        put(state, (0, 3), "Blue")
+        put(state, (5, 2), "Red")
+        self.assertTrue(state.apply_action(("move", (5, 2), (5, 3))))
+        self.assertTrue(state.apply_action(("capture", (5, 3))))
+        self.assertIsNone(state.winner())
+        self.assertEqual(state.terrain_at(Index(5, 3)).health, 100)
+        self.assertFalse(state.apply_action(("capture", (5, 3))))
+        state.apply_action(("end",))
+        state.apply_action(("end",))
+        self.assertTrue(state.apply_action(("capture", (5, 3))))
+        self.assertEqual(state.winner(), "Red")
+        self.assertEqual(state.terrain_at(Index(5, 3)).team, "Red")
+        self.assertEqual(state.team_buildings, [2, 0])
+        self.assertEqual(state.actions(), [])
+        self.assertFalse(state.apply_action(("end",)))
+
+class AttackTest(unittest.TestCase):
+    """Checks attacks, including a counterattack killing the attacker."""
+    def test_counterattack_kills_attacker(self):
+        state = new_game()
+        state.remove_unit(Index(5, 3))
+        put(state, (1, 0), "Blue")
+        set_health(state, (0, 0), 5)
+        self.assertTrue(state.apply_action(("attack", (0, 0), (1, 0))))
+        self.assertIsNone(state.unit_at(Index(0, 0)))
+        self.assertEqual(state.rosters["Red"], {})
+        self.assertGreater(state.unit_at(Index(1, 0)).health, 90)
+        self.assertEqual(state.winner(), "Blue")
+
+    def test_attack_matches_forecast(self):
+        state = new_game(seed=7)
+        put(state, (1, 0), "Blue")
+        forecast = state.forecast_attack(Index(0, 0), Index(1, 0))
+        self.assertTrue(state.apply_action(("attack", (0, 0), (1, 0))))
+        dealt = 100 - state.unit_at(Index(1, 0)).health
+        self.assertAlmostEqual(min(forecast.damage, key=lambda damage: abs(damage - dealt)), dealt)
+        self.assertFalse(state.apply_action(("attack", (0, 0), (1, 0))))
+
+    def test_same_seed_same_outcome(self):
+        healths = []
+        for ind in range(2):
+            state = new_game(seed=42)
+            put(state, (1, 0), "Blue", "Tank")
+            state.apply_action(("attack", (0, 0), (1, 0)))
+            healths.append((state.unit_at(Index(0, 0)).health, state.unit_at(Index(1, 0)).health))
+        self.assertEqual(healths[0], healths[1])
+
+class SnapshotTest(unittest.TestCase):
+    """Checks that snapshots, clones and the Zobrist hash agree on what a match is."""
+    def setUp(self):
+        self.state = new_game(seed=3)
+        put(self.state, (3, 0), "Red", "Biker")
+
+    def test_restore_gives_same_hash(self):
+        snapshot, hash = self.state.snapshot(), self.state.zobrist()
+        for action in [("move", (0, 0), (0, 2)), ("move", (3, 0), (4, 1)), ("end",), ("move", (5, 3), (4, 3)), ("end",)]:
+            self.assertTrue(self.state.apply_action(action))
+        self.assertNotEqual(self.state.zobrist(), hash)
+        self.state.restore(snapshot)
+        self.assertEqual(self.state.zobrist(), hash)
+        self.assertEqual(sorted(self.state.snapshot()[5]), sorted(snapshot[5]))
+        self.assertEqual(self.state.snapshot()[:5], snapshot[:5])
+
+    def test_restore_undoes_capture(self):
+        put(self.state, (5, 2), "Red")
+        snapshot, hash = self.state.snapshot(), self.state.zobrist()
+        self.state.apply_action(("move", (5, 2), (5, 3)))
+        self.state.remove_unit(Index(5, 3))
+        put(self.state, (5, 3), "Red")
+        self.state.apply_action(("capture", (5, 3)))
+        self.state.restore(snapshot)
+        self.assertEqual(self.state.zobrist(), hash)
+        self.assertEqual(self.state.terrain_at(Index(5, 3)).health, 200)
+
+    def test_move_order_gives_same_hash(self):
+        clone = self.state.clone()
+        self.state.apply_action(("move", (0, 0), (0, 2)))
+        self.state.apply_action(("move", (3, 0), (4, 1)))
+        clone.apply_action(("move", (3, 0), (4, 1)))
+        clone.apply_action(("move", (0, 0), (0, 2)))
+        self.assertEqual(self.state.zobrist(), clone.zobrist())
+
+    def test_clone_is_independent(self):
+        hash = self.state.zobrist()
+        clone = self.state.clone()
+        clone.apply_action(("move", (0, 0), (0, 2)))
+        clone.apply_action(("end",))
+        self.assertEqual(self.state.zobrist(), hash)
+        self.assertIsNotNone(self.state.unit_at(Index(0, 0)))
+        self.assertEqual(self.state.current_team(), "Red")
+
+class PathingTest(unittest.TestCase):
+    """Checks that units move along the cheapest legal path and units block each other."""
+    def setUp(self):
+        self.state = new_game()
+        put(self.state, (1, 2), "Red", "Biker")
+
+    def test_wheels_go_around_mountains(self):
+        reach = self.state.reachable(Index(1, 2))
+        self.assertNotIn((2, 1), reach)
+        self.assertNotIn((3, 2), reach)
+        self.assertNotIn((3, 3), reach)
+        self.assertEqual(reach[(2, 2)], (2, [(2, 2)]))
+        self.assertEqual(reach[(2, 3)][0], 4)
+
+    def test_find_path_matches_reach(self):
+        for goal, (cost, path) in self.state.reachable(Index(1, 2)).items():
+            found = pathing.find_path(self.state.unitmap, self.state.terrainmap, (1, 2), goal)
+            self.assertEqual(sum(self.state.terrainmap.kind_at(*step).transports["Wheels"] for step in found), cost)
+
+    def test_units_block(self):
+        put(self.state, (1, 3), "Blue")
+        put(self.state, (2, 2), "Red")
+        self.assertNotIn((2, 3), self.state.reachable(Index(1, 2)))
+        self.assertFalse(self.state.apply_action(("move", (1, 2), (2, 3))))
+        self.state.remove_unit(Index(2, 2))
+        self.assertIn((2, 3), self.state.reachable(Index(1, 2)))
+
+    def test_move_spends_path_cost(self):
+        self.assertTrue(self.state.apply_action(("move", (1, 2), (2, 3))))
+        self.assertEqual(self.state.unit_at(Index(2, 3)).moved, 4)
+        self.assertEqual(self.state.reachable(Index(2, 3)), {})
@@ -0,0 +1,47 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import history
+
+PLAYERS = [("Red", "Ann"), ("Blue", "Computer")]
+
+class HistoryTest(unittest.TestCase):
+    """Checks recording matches, the retention of the oldest ones and the win rates counted from them."""
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.history = history.History(os.path.join(self.directory, "history.db"), retention=3)
+
+    def tearDown(self):
+        self.history.close()
+        shutil.rmtree(self.directory)
+
+    def count(self, table: str) -> int:
+        """Returns the number of rows of the given table."""
+        return self.history.connection.execute("SELECT COUNT(*) FROM {}".format(table)).fetchone()[0]
+
+    def test_retention(self):
+        for turns in range(1, 6):
+            self.history.record("map{}".format(turns), PLAYERS, "Red" if turns % 2 else "Blue", turns, 1.5, [turns, 0])
+        self.assertEqual(self.count("matches"), 3)
+        self.assertEqual(self.count("players"), 6)
+        self.assertEqual([turns for victor, loser, turns, mapname in self.history.recent()], [5, 4, 3])
+
+    def test_win_rates(self):
+        for winner in ["Red", "Red", "Blue"]:
+            self.history.record("island", PLAYERS, winner, 10, 1.5, [2, 3])
+        self.assertEqual(self.history.win_rates("Ann"), [("Ann", 3, 2, 2 / 3)])
+        self.assertEqual(self.history.recent(1), [("Computer", "Ann", 10, "island")])
+        self.assertEqual(self.history.map_win_rates("island")[0][:4], ("island", "Ann", 3, 2))
+        self.assertEqual(self.history.lines()[-1], "Computer: won 1 of 3 matches (33%)")
+
+    def test_import_text(self):
+        legacy = os.path.join(self.directory, "matchhistory.txt")
+        with open(legacy, "wt", encoding="utf-8") as file:
+            file.write("Ann took 12 turns to defeat Bob on the lost river map.\nBob took 7 turns to defeat Ann on the island map.\nnot a match\n")
+        self.history.import_text(legacy)
+        self.assertEqual(self.history.recent(), [("Ann", "Bob", 12, "lost river"), ("Bob", "Ann", 7, "island")])
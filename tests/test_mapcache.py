@@ -0,0 +1,89 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import mapcache
+
+MAP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Maps", "spann_island.txt")
+
+class TruncatedCacheTest(unittest.TestCase):
+    """Checks that a damaged cache file is compiled and written again instead of being used."""
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.location = mapcache.CACHE_LOCATION
+        mapcache.CACHE_LOCATION = os.path.join(self.directory, "Cache")
+        self.path = shutil.copy(MAP, self.directory)
+
+    def tearDown(self):
+        mapcache.CACHE_LOCATION = self.location
+        shutil.rmtree(self.directory)
+
+    def test_truncated_cache_is_rewritten(self):
+        expected = mapcache.load(self.path)
+        cache = mapcache.cache_path(self.path)
+        size = os.path.getsize(cache)
+        with open(cache, "r+b") as file:
+            file.truncate(size // 2)
+        with self.assertRaises(ValueError):
+            mapcache.read(cache)
+        compiled = mapcache.load(self.path)
+        self.assertEqual(bytes(compiled.kinds), bytes(expected.kinds))
+        self.assertEqual(bytes(compiled.owners), bytes(expected.owners))
+        self.assertEqual(compiled.hqs + compiled.workshops, expected.hqs + expected.workshops)
+        self.assertEqual(os.path.getsize(cache), size)
+
+class EditedMapTest(unittest.TestCase):
+    """Checks that a map changed after it was cached is cached again, with the stale cache file closed before it is replaced."""
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.location = mapcache.CACHE_LOCATION
+        mapcache.CACHE_LOCATION = os.path.join(self.directory, "Cache")
+        self.path = shutil.copy(MAP, self.directory)
+        self.reads = []
+        self.read = mapcache.read
+        def read(location):
+            cached = self.read(location)
+            self.reads.append(cached[1])
+            return cached
+        mapcache.read = read
+
+    def tearDown(self):
+        mapcache.read = self.read
+        mapcache.CACHE_LOCATION = self.location
+        for compiled in self.reads:
+            compiled.close()
+        shutil.rmtree(self.directory)
+
+    def test_edited_map_is_cached_again(self):
+        mapcache.load(self.path)
+        with open(self.path, "rt", encoding="utf-8") as file:
+            lines = file.read().split("\n")
+        lines[1] = "OP" + lines[1][2:]
+        with open(self.path, "wt", encoding="utf-8") as file:
+            file.write("\n".join(lines))
+        compiled = mapcache.load(self.path)
+        self.assertTrue(all(cached.mapping is None for cached in self.reads))
+        expected = mapcache.compile_rawmap(*mapcache.read_rawmap(self.path))
+        self.assertEqual(bytes(compiled.kinds), bytes(expected.kinds))
+        cached = mapcache.load(self.path)
+        self.assertIsNotNone(cached.mapping)
+        self.assertEqual(bytes(cached.kinds), bytes(expected.kinds))
+
+    def test_touched_map_keeps_its_data(self):
+        expected = mapcache.load(self.path)
+        stat = os.stat(self.path)
+        os.utime(self.path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        mapcache.load(self.path)
+        compiled = mapcache.load(self.path)
+        self.assertIsNone(self.reads[0].mapping)
+        self.assertIsNotNone(compiled.mapping)
+        self.assertEqual(mapcache.read(mapcache.cache_path(self.path))[0][1], os.stat(self.path).st_mtime_ns)
+        self.assertEqual(bytes(compiled.kinds), bytes(expected.kinds))
+        self.assertEqual(bytes(compiled.owners), bytes(expected.owners))
+
+if __name__ == "__main__":
+    unittest.main()
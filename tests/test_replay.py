@@ -0,0 +1,67 @@
+import os
+import random
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import engine
+import mapcache
+import replay
+
+MAP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Maps", "spann_island.txt")
+
+def play(state: engine.GameState, turns: int, seed: int) -> list:
+    """Plays random legal actions for the given number of turns, a few of them every turn. Returns with the Zobrist hash of the match at the start of every turn."""
+    picker, hashes = random.Random(seed), [state.zobrist()]
+    for turn in range(turns):
+        for ind in range(5):
+            actions = [action for action in state.actions() if action[0] != "end"]
+            if not actions:
+                break
+            state.apply_action(picker.choice(actions))
+        if not state.apply_action(("end",)):
+            break
+        hashes.append(state.zobrist())
+    return hashes
+
+class ReplayTest(unittest.TestCase):
+    """Checks that a saved replay loads back with the same actions and plays out the same match, and that seeking reaches the same turns."""
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        compiled = mapcache.compile_rawmap(*mapcache.read_rawmap(MAP))
+        self.state = engine.load_game(compiled, seed=11)
+        self.recording = replay.from_game(self.state, "spann_island", ["Red player", "Blue player"])
+        self.hashes = play(self.state, 25, seed=5)
+        self.recording.winner = self.state.winner()
+        self.path = os.path.join(self.directory, "match.swr")
+        replay.save(self.recording, self.path, interval=4)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_round_trip(self):
+        loaded = replay.load(self.path)
+        self.assertEqual(loaded.actions, self.recording.actions)
+        self.assertEqual((loaded.mapname, loaded.seed, loaded.players, loaded.winner), ("spann_island", 11, ["Red player", "Blue player"], self.state.winner()))
+        self.assertEqual([keyframe[:2] for keyframe in loaded.keyframes], [keyframe[:2] for keyframe in self.recording.keyframes])
+        self.assertEqual(loaded.run().zobrist(), self.state.zobrist())
+        self.assertEqual(loaded.units_built(), self.recording.units_built())
+
+    def test_seek(self):
+        loaded = replay.load(self.path)
+        self.assertEqual(loaded.turns(), len(self.hashes) - 1)
+        state = loaded.new_game()
+        for turn in [len(self.hashes) - 1, 0, 9, 8, 13, 4]:
+            seeked, position = loaded.seek(turn, state)
+            self.assertIs(seeked, state)
+            self.assertEqual(state.zobrist(), self.hashes[turn], turn)
+            self.assertEqual(sum(action[0] == "end" for action in loaded.actions[:position]), turn)
+
+    def test_rejects_other_files(self):
+        with open(self.path, "r+b") as file:
+            file.write(b"OTHER")
+        with self.assertRaises(ValueError):
+            replay.load(self.path)
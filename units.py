@@ -1,46 +1,47 @@
 import os
-import pygame as pg
 from random import randint
-
-class __UnitImages:
-    """Class for statically storing the location of unit images."""
-    location = os.path.join("Images", "Units")
-    INF_1 = pg.image.load(os.path.join(location, "infantry1.png"))
-    INF_2 = pg.image.load(os.path.join(location, "infantry2.png"))
-    SNP_1 = pg.image.load(os.path.join(location, "sniper1.png"))
-    SNP_2 = pg.image.load(os.path.join(location, "sniper2.png"))
-    BZK_1 = pg.image.load(os.path.join(location, "bazooka1.png"))
-    BZK_2 = pg.image.load(os.path.join(location, "bazooka2.png"))
-    MRT_1 = pg.image.load(os.path.join(location, "mortar1.png"))
-    MRT_2 = pg.image.load(os.path.join(location, "mortar2.png"))
-    BKR_1 = pg.image.load(os.path.join(location, "biker1.png"))
-    BKR_2 = pg.image.load(os.path.join(location, "biker2.png"))
-    JEP_1 = pg.image.load(os.path.join(location, "jeep1.png"))
-    JEP_2 = pg.image.load(os.path.join(location, "jeep2.png"))
-    LTK_1 = pg.image.load(os.path.join(location, "lighttank1.png"))
-    LTK_2 = pg.image.load(os.path.join(location, "lighttank2.png"))
-    TNK_1 = pg.image.load(os.path.join(location, "tank1.png"))
-    TNK_2 = pg.image.load(os.path.join(location, "tank2.png"))
-    HVT_1 = pg.image.load(os.path.join(location, "heavytank1.png"))
-    HVT_2 = pg.image.load(os.path.join(location, "heavytank2.png"))
-    FMT_1 = pg.image.load(os.path.join(location, "flamethrower1.png"))
-    FMT_2 = pg.image.load(os.path.join(location, "flamethrower2.png"))
-    ATY_1 = pg.image.load(os.path.join(location, "artillery1.png"))
-    ATY_2 = pg.image.load(os.path.join(location, "artillery2.png"))
-    RKL_1 = pg.image.load(os.path.join(location, "rocketlauncher1.png"))
-    RKL_2 = pg.image.load(os.path.join(location, "rocketlauncher2.png"))
+from typing import NamedTuple
+
+import sprites
+
+IMAGES = {("Red", "Gunner"): "infantry1.png",            #Image files of every unit, by its team and type.
+        ("Red", "Sniper"): "sniper1.png",
+        ("Red", "Bazooka"): "bazooka1.png",
+        ("Red", "Mortar"): "mortar1.png",
+        ("Red", "Biker"): "biker1.png",
+        ("Red", "Jeep"): "jeep1.png",
+        ("Red", "Light tank"): "lighttank1.png",
+        ("Red", "Tank"): "tank1.png",
+        ("Red", "Heavy tank"): "heavytank1.png",
+        ("Red", "Flamethrower"): "flamethrower1.png",
+        ("Red", "Artilery"): "artillery1.png",
+        ("Red", "Rocket"): "rocketlauncher1.png",
+        ("Blue", "Gunner"): "infantry2.png",
+        ("Blue", "Sniper"): "sniper2.png",
+        ("Blue", "Bazooka"): "bazooka2.png",
+        ("Blue", "Mortar"): "mortar2.png",
+        ("Blue", "Biker"): "biker2.png",
+        ("Blue", "Jeep"): "jeep2.png",
+        ("Blue", "Light tank"): "lighttank2.png",
+        ("Blue", "Tank"): "tank2.png",
+        ("Blue", "Heavy tank"): "heavytank2.png",
+        ("Blue", "Flamethrower"): "flamethrower2.png",
+        ("Blue", "Artilery"): "artillery2.png",
+        ("Blue", "Rocket"): "rocketlauncher2.png"}
+sprites.register("Unit", os.path.join("Images", "Units"), IMAGES, True)
+ROLL = 5                #Largest random bonus of an attack, every bonus from 0 up to it is equally likely.
 
 class Unit:
-    """Class for representing a unit and handling any actions taken on it."""
-    moved = 0
-    attacked = True
-    health = 100
+    """Class for representing a unit and handling any actions taken on it. Its attributes are slots, so units are small and quick to copy."""
+    __slots__ = ("type", "team", "health", "moved", "attacked", "movement", "speed", "capture", "defense", "armor", "ammunition", "attack", "maxrange", "minrange")
 
     def __init__(self, type: str, team: str, movement: str, speed: int, capture: bool, 
                  defense: float, armor: float, ammunition: str, attack: float, maxrange: int = 1, minrange: int = 1):
         #IDENTIFIER
         self.type = type
         self.team = team
+        self.health = 100
+        self.attacked = True
         #MOVEMENT PROPETIES
         self.moved = speed
         self.movement = movement
@@ -54,9 +55,17 @@ class Unit:
         self.maxrange = maxrange
         self.minrange = minrange
 
-    def attack_value(self, range: float = 5) -> float:
-        """Returns the amount of damage the unit deals, with small randomness."""
-        return (self.health / 100) * (self.attack * range + randint(0, range))
+    def copy(self) -> object:
+        """Returns an independent copy of the unit."""
+        unit = Unit.__new__(Unit)
+        unit.type, unit.team, unit.health, unit.moved, unit.attacked = self.type, self.team, self.health, self.moved, self.attacked
+        unit.movement, unit.speed, unit.capture, unit.defense, unit.armor = self.movement, self.speed, self.capture, self.defense, self.armor
+        unit.ammunition, unit.attack, unit.maxrange, unit.minrange = self.ammunition, self.attack, self.maxrange, self.minrange
+        return unit
+
+    def attack_value(self, range: int = ROLL, roll: int = None) -> float:
+        """Returns the amount of damage the unit deals, with small randomness. The random bonus can be given as the roll, to get the damage of a known outcome."""
+        return (self.health / 100) * (self.attack * range + (randint(0, range) if roll is None else roll))
 
     def defense_value(self, terrain: object) -> float:
         """Returns with the defense of the unit based on terrain."""
@@ -65,17 +74,21 @@ class Unit:
             return 0
         return defense
 
-    def getting_attacked(self, attacking: object, terrain: object) -> None:
-        """Takes the attacking unit and terrain as parameters and handles how much damage the unit takes."""
-        damage = attacking.attack_value() *  self.defense_value(terrain)
+    def damage_taken(self, attacking: object, terrain: object, roll: int = None) -> float:
+        """Takes the attacking unit and terrain as parameters and returns how much damage the unit would take, without taking it.
+            The random bonus of the attack can be given as the roll."""
+        damage = attacking.attack_value(roll=roll) *  self.defense_value(terrain)
         if attacking.ammunition == "Bullets":
-            self.health -= damage / self.armor
+            return damage / self.armor
         elif attacking.ammunition == "Piercing":
-            self.health -= damage / (1 + self.armor / 10)
+            return damage / (1 + self.armor / 10)
         elif attacking.ammunition == "Explosives":
-            self.health -= damage / (self.armor / 2)
-        else:
-            self.health -= damage
+            return damage / (self.armor / 2)
+        return damage
+
+    def getting_attacked(self, attacking: object, terrain: object, roll: int = None) -> None:
+        """Takes the attacking unit and terrain as parameters and handles how much damage the unit takes. The random bonus of the attack can be given as the roll."""
+        self.health -= self.damage_taken(attacking, terrain, roll)
     
     def can_attack(self, turn_team: str, target: object, terrain: object) -> bool:
         """Checks if a unit can attack in the current turn and returns it in a boolean."""
@@ -115,6 +128,49 @@ class Unit:
         self.moved = 0
         self.attacked = False
 
+class AttackForecast(NamedTuple):
+    """Class for the exact outcome of an attack, worked out over every possible roll instead of a single random one.
+        Damages are stored with the probability of taking them, no counterattack counts as taking 0 damage."""
+    damage: dict                #Probability of every damage the defender can take.
+    counter: dict               #Probability of every damage the attacker can take from the counterattack.
+    kill_chance: float          #Probability of the defender dying.
+    counter_kill_chance: float  #Probability of the attacker dying from the counterattack.
+
+    def expected_damage(self) -> float:
+        """Returns the damage the defender takes on average."""
+        return sum(damage * chance for damage, chance in self.damage.items())
+
+    def expected_counter(self) -> float:
+        """Returns the damage the attacker takes from the counterattack on average."""
+        return sum(damage * chance for damage, chance in self.counter.items())
+
+def damage_distribution(attacking: Unit, defending: Unit, terrain: object) -> dict:
+    """Returns the probability of every damage the defending unit can take from the attacking one on the given terrain, going through every possible roll."""
+    distribution = {}
+    for roll in range(ROLL + 1):
+        damage = defending.damage_taken(attacking, terrain, roll)
+        distribution[damage] = distribution.get(damage, 0) + 1 / (ROLL + 1)
+    return distribution
+
+def forecast(attacking: Unit, defending: Unit, attacking_terrain: object, defending_terrain: object, counters: bool) -> AttackForecast:
+    """Works out the exact outcome of the attacking unit attacking the defending one, where counters tells if the defender can strike back if it lives.
+        The counterattack is worked out for every damage the defender can survive, with the health it has left after it."""
+    damage = damage_distribution(attacking, defending, defending_terrain)
+    counter, kill_chance, counter_kill_chance = {}, 0, 0
+    for dealt, chance in damage.items():
+        if defending.health - dealt <= 0:
+            kill_chance += chance
+        if defending.health - dealt <= 0 or not counters:
+            counter[0] = counter.get(0, 0) + chance
+            continue
+        wounded = defending.copy()
+        wounded.health -= dealt
+        for taken, counter_chance in damage_distribution(wounded, attacking, attacking_terrain).items():
+            counter[taken] = counter.get(taken, 0) + chance * counter_chance
+            if attacking.health - taken <= 0:
+                counter_kill_chance += chance * counter_chance
+    return AttackForecast(damage, counter, kill_chance, counter_kill_chance)
+
 def get_units() -> list:
     """Function for statically storing the names of all of the units."""
     return ["Gunner", "Sniper", "Bazooka", "Mortar", "Biker", "Jeep", "Light tank", "Tank", "Heavy tank", "Flamethrower", "Artilery", "Rocket"]
@@ -163,81 +219,28 @@ def spawn_unit(team: str, type: str = "Gunner") -> Unit:
         # UNIT 12 - ROCKET LAUNCHER
         return Unit(type, team, "Wheels", 5, True, 6, 1.6, "Explosives", 7, 5, 2)
 
-def __block_translator(onblock: object, window: object, onwindow: tuple) -> Unit:
+def __block_translator(onblock: object) -> Unit:
     """Private Terrain handler function that automatically places Gunner units on both HQs."""
-    images = __UnitImages()
     if onblock.identifier == 'H':
         if onblock.team == 'Red':
-            window.blit(images.INF_1, onwindow)
             return spawn_unit('Red')
         elif onblock.team == 'Blue':
-            window.blit(images.INF_2, onwindow)
             return spawn_unit('Blue')
     return None
 
 def block_draw(onblock: Unit, window: object, onwindow: tuple) -> None:
     """Function that takes in placement data and draws the unit on the game window."""
-    images = __UnitImages()
-    unit_types = get_units()
-    if onblock.team == "Red":
-        if onblock.type == unit_types[0]:
-            window.blit(images.INF_1, onwindow)
-        elif onblock.type == unit_types[1]:
-            window.blit(images.SNP_1, onwindow)
-        elif onblock.type == unit_types[2]:
-            window.blit(images.BZK_1, onwindow)
-        elif onblock.type == unit_types[3]:
-            window.blit(images.MRT_1, onwindow)
-        elif onblock.type == unit_types[4]:
-            window.blit(images.BKR_1, onwindow)
-        elif onblock.type == unit_types[5]:
-            window.blit(images.JEP_1, onwindow)
-        elif onblock.type == unit_types[6]:
-            window.blit(images.LTK_1, onwindow)
-        elif onblock.type == unit_types[7]:
-            window.blit(images.TNK_1, onwindow)
-        elif onblock.type == unit_types[8]:
-            window.blit(images.HVT_1, onwindow)
-        elif onblock.type == unit_types[9]:
-            window.blit(images.FMT_1, onwindow)
-        elif onblock.type == unit_types[10]:
-            window.blit(images.ATY_1, onwindow)
-        elif onblock.type == unit_types[11]:
-            window.blit(images.RKL_1, onwindow)
-    elif onblock.team == "Blue":
-        if onblock.type == unit_types[0]:
-            window.blit(images.INF_2, onwindow)
-        elif onblock.type == unit_types[1]:
-            window.blit(images.SNP_2, onwindow)
-        elif onblock.type == unit_types[2]:
-            window.blit(images.BZK_2, onwindow)
-        elif onblock.type == unit_types[3]:
-            window.blit(images.MRT_2, onwindow)
-        elif onblock.type == unit_types[4]:
-            window.blit(images.BKR_2, onwindow)
-        elif onblock.type == unit_types[5]:
-            window.blit(images.JEP_2, onwindow)
-        elif onblock.type == unit_types[6]:
-            window.blit(images.LTK_2, onwindow)
-        elif onblock.type == unit_types[7]:
-            window.blit(images.TNK_2, onwindow)
-        elif onblock.type == unit_types[8]:
-            window.blit(images.HVT_2, onwindow)
-        elif onblock.type == unit_types[9]:
-            window.blit(images.FMT_2, onwindow)
-        elif onblock.type == unit_types[10]:
-            window.blit(images.ATY_2, onwindow)
-        elif onblock.type == unit_types[11]:
-            window.blit(images.RKL_2, onwindow)
-
-def drawadd(window: object, BLOCK: int, terrainmap: list[list], xrn: int, yrn: int) -> list[list]:
-    """Function that initializes the basic unit map and adds the default units to it."""
-    unitmap = [[None  for i in range(yrn)] for j in range(xrn)]
-    row = 0
-    for xon in range(0, xrn * BLOCK, BLOCK):
-        column = 0
-        for yon in range(0, yrn * BLOCK, BLOCK):
-            unitmap[row][column] = __block_translator(terrainmap[row][column], window, (xon, yon))
-            column += 1
-        row += 1
-    return unitmap
\ No newline at end of file
+    window.blit(sprites.get("Unit", onblock.team, onblock.type), onwindow)
+
+def construct(terrainmap: list[list], xrn: int, yrn: int) -> list[list]:
+    """Function that initializes the basic unit map and adds the default units to it, without drawing anything."""
+    return [[__block_translator(terrainmap[row][column]) for column in range(yrn)] for row in range(xrn)]
+
+def map_draw(window: object, BLOCK: int, unitmap: list[list], area: tuple = None) -> None:
+    """Function that draws every unit of the unit map on the displayed window.
+        If an area is given as (x, y, width, height), only its units are drawn, with its top left corner drawn on the top left of the window."""
+    xstart, ystart, width, height = (0, 0, len(unitmap), len(unitmap[0])) if area is None else area
+    for row in range(max(xstart, 0), min(xstart + width, len(unitmap))):
+        for column in range(max(ystart, 0), min(ystart + height, len(unitmap[row]))):
+            if unitmap[row][column] is not None:
+                block_draw(unitmap[row][column], window, ((row - xstart) * BLOCK, (column - ystart) * BLOCK))
\ No newline at end of file
@@ -0,0 +1,47 @@
+import hashlib
+from array import array
+
+SEED = b"SimpleWars"        #Key of the hashing the Zobrist keys are derived from.
+
+__keys = {}                 #Key of every feature that has been hashed, by the feature.
+
+def key(*feature) -> int:
+    """Returns the 64 bit Zobrist key of a feature of a match, like ("unit", x, y, type, team, health bucket, moved, attacked).
+        Keys are derived from hashing the description of the feature, so they are the same in every process and every run."""
+    found = __keys.get(feature)
+    if found is None:
+        found = __keys[feature] = int.from_bytes(hashlib.blake2b(repr(feature).encode(), digest_size=8, key=SEED).digest(), "little")
+    return found
+
+class TranspositionTable:
+    """Class for a fixed size table of search statistics keyed by the Zobrist hash of the match, so positions reached through a different order of actions share them.
+        Every hash has a single slot, which a new entry takes over if it is empty, holds the same position, was stored before the current generation,
+        or doesn't have more visits than the new entry."""
+    SIZE = 1 << 16          #Number of slots of the table.
+
+    def __init__(self, size: int = SIZE):
+        self.size = size
+        self.hashes = array('Q', bytes(8 * size))
+        self.visits = array('I', bytes(4 * size))       #Visits of the stored position, 0 for empty slots.
+        self.wins = array('d', bytes(8 * size))
+        self.generations = array('I', bytes(4 * size))
+        self.generation = 0
+        self.hits = 0
+
+    def new_generation(self) -> None:
+        """Marks every stored entry as old, so new entries replace them regardless of their visits."""
+        self.generation += 1
+
+    def get(self, hash: int) -> tuple:
+        """Returns the visits and wins stored for the given hash, or None if it isn't stored."""
+        slot = hash % self.size
+        if self.visits[slot] == 0 or self.hashes[slot] != hash:
+            return None
+        self.hits += 1
+        return self.visits[slot], self.wins[slot]
+
+    def store(self, hash: int, visits: int, wins: float) -> None:
+        """Stores the visits and wins of the given hash, if the replacement policy lets it take over its slot."""
+        slot = hash % self.size
+        if self.visits[slot] == 0 or self.hashes[slot] == hash or self.generations[slot] != self.generation or self.visits[slot] <= visits:
+            self.hashes[slot], self.visits[slot], self.wins[slot], self.generations[slot] = hash, visits, wins, self.generation